@@ -0,0 +1,77 @@
+"""
+Offline benchmark suite: trade ingest, StockUtils metrics at scale, the trade journal, trade ids,
+stock universe loading, the multi-horizon VWAP and the Flask endpoints.
+
+Usage:
+    python -m ssmts.benchmarks --output baseline.json
+    python -m ssmts.benchmarks --compare baseline.json [--threshold 0.1] [--output current.json]
+
+With --compare the exit status is 1 when any metric regressed beyond the threshold, so the suite
+can gate a change. Use --quick for a short run that skips the 100k stock universe.
+"""
+
+import argparse
+import sys
+
+from ssmts.benchmarks import (bench_api, bench_ids, bench_ingest, bench_journal, bench_loader, bench_stock_utils,
+                              bench_vwap_horizons, results)
+
+
+def run_suite(quick: bool = False) -> dict:
+    """
+    Run every benchmark and return their metrics keyed by name.
+    """
+    metrics = {}
+    for codec in ("binary", "text"):
+        ingest = bench_ingest.run(trades=10_000 if quick else 50_000, codec=codec)
+        metrics[f"ingest.{codec}.trades_per_sec"] = results.metric(ingest["trades_per_sec"], "trades/s", True)
+    sizes = bench_stock_utils.SIZES[:-1] if quick else bench_stock_utils.SIZES
+    for row in bench_stock_utils.run(sizes):
+        metrics[f"stock_utils.{row['case']}.{row['stocks']}"] = results.metric(row["latency_us"], "us")
+    for row in bench_journal.run(trades=200_000 if quick else 1_000_000):
+        metrics[f"journal.{row['case']}.trades_per_sec"] = results.metric(row["trades_per_sec"], "trades/s", True)
+    for row in bench_ids.run(count=50_000 if quick else 200_000):
+        metrics[f"ids.{row['case']}.generate"] = results.metric(row["generate_ns"], "ns")
+        metrics[f"ids.{row['case']}.dict_insert"] = results.metric(row["insert_ns"], "ns")
+    for row in bench_loader.run(sizes=(10_000,) if quick else (100_000,)):
+        metrics[f"loader.{row['case']}.{row['stocks']}"] = results.metric(row["per_sec"], "stocks/s", True)
+    for row in bench_vwap_horizons.run(rates=(10,) if quick else (10, 100)):
+        metrics[f"vwap_horizons.{row['rate']}.add"] = results.metric(row["add_ns"], "ns")
+        metrics[f"vwap_horizons.{row['rate']}.read"] = results.metric(row["read_us"], "us")
+    for row in bench_api.run(stocks=1_000, requests=100 if quick else 500):
+        metrics[f"api.{row['case']}.mean"] = results.metric(row["mean_us"], "us")
+        metrics[f"api.{row['case']}.p99"] = results.metric(row["p99_us"], "us")
+    return metrics
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against this result file")
+    parser.add_argument("--threshold", type=float, default=results.DEFAULT_THRESHOLD,
+                        help="relative slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="smaller runs, without the 100k stock universe")
+    args = parser.parse_args(argv)
+
+    metrics = run_suite(args.quick)
+    if args.output:
+        results.save(metrics, args.output)
+
+    if not args.compare:
+        print(f"{'metric':<58}{'value':>14}  unit")
+        for name, value in sorted(metrics.items()):
+            print(f"{name:<58}{value['value']:>14.2f}  {value['unit']}")
+        return 0
+
+    rows = results.compare(metrics, results.load(args.compare), args.threshold)
+    print(f"{'metric':<58}{'baseline':>14}{'current':>14}{'change':>9}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<58}{row['baseline']:>14.2f}{row['current']:>14.2f}{row['slowdown']:>+9.1%}{flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"{len(regressions)} of {len(rows)} metrics regressed by more than {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
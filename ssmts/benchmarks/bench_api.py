@@ -0,0 +1,68 @@
+"""
+Latency of the market metrics Flask endpoints, through the Flask test client.
+
+Covers the full request path (routing, hooks, StockUtils, JSON serialisation) without a network
+socket or a running consumer; the registries are filled with synthetic stocks and trades.
+
+Usage: python -m ssmts.benchmarks.bench_api [--stocks N] [--requests N]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from ssmts.benchmarks.bench_stock_utils import populate
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.market_metrics import app
+
+
+def endpoints(stock_id: str) -> dict[str, str]:
+    return {
+        "/stock": f"/stock/{stock_id}",
+        "/stocks": "/stocks",
+        "/gbce-all-share-index": "/gbce-all-share-index",
+        "/trade/volume-weighted-stock-price": f"/trade/volume-weighted-stock-price/{stock_id}",
+        "/calculate/peRatio": f"/calculate/peRatio/{stock_id}/120.5",
+    }
+
+
+def run(stocks: int = 1_000, requests: int = 500) -> list[dict]:
+    """
+    Mean and p99 latency per endpoint over ``requests`` requests (fewer for the full stock list).
+    """
+    stock_ids = populate(stocks)
+    client = app.test_client()
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):  # the request hooks print per request
+        for name, url in endpoints(stock_ids[0]).items():
+            count = max(10, requests // 10) if name == "/stocks" else requests
+            client.get(url)  # warm up
+            samples = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(url)
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+            samples.sort()
+            results.append({
+                "case": name,
+                "stocks": stocks,
+                "mean_us": sum(samples) / count * 1e6,
+                "p99_us": samples[min(count - 1, int(count * 0.99))] * 1e6,
+            })
+    StockRegistry.register()
+    TradeSnapShotRegistry.register()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stocks", type=int, default=1_000, help="size of the stock universe")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    args = parser.parse_args()
+    print(f"{'endpoint':<38}{'mean (us)':>12}{'p99 (us)':>12}")
+    for result in run(args.stocks, args.requests):
+        print(f"{result['case']:<38}{result['mean_us']:>12.1f}{result['p99_us']:>12.1f}")
@@ -0,0 +1,55 @@
+"""
+Trade id generation: the former time + uuid4 string ids against snowflake ids (integer and
+19 digit string form), and the cost of using each as a dict key (as TradeRegistry does).
+
+Usage: python -m ssmts.benchmarks.bench_ids [--count N]
+"""
+
+import argparse
+import sys
+import time
+import timeit
+import uuid
+
+from ssmts.utility.trade_utils import SnowflakeIdGenerator, format_id
+
+
+def legacy_id() -> str:
+    return str(int(time.time())) + '-' + str(uuid.uuid4())
+
+
+def run(count: int = 200_000) -> list[dict]:
+    generator = SnowflakeIdGenerator(node_id=1)
+    cases = [
+        ("uuid_str", legacy_id),
+        ("snowflake_int", generator.next_id),
+        ("snowflake_str", lambda: format_id(generator.next_id())),
+    ]
+    results = []
+    for name, factory in cases:
+        generate_ns = min(timeit.repeat(factory, number=count, repeat=3)) / count * 1e9
+        keys = [factory() for _ in range(count)]
+        # fresh copies, as ids arrive off the wire: str hashes are cached per object
+        keys = [type(key)(str(key)) if isinstance(key, str) else key for key in keys]
+        start = time.perf_counter()
+        store = {}
+        for key in keys:
+            store[key] = None
+        insert_ns = (time.perf_counter() - start) / count * 1e9
+        start = time.perf_counter()
+        for key in keys:
+            store[key]
+        lookup_ns = (time.perf_counter() - start) / count * 1e9
+        results.append({"case": name, "generate_ns": generate_ns, "insert_ns": insert_ns, "lookup_ns": lookup_ns,
+                        "key_bytes": sum(map(sys.getsizeof, keys)) / count})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200_000, help="ids generated and inserted per case")
+    args = parser.parse_args()
+    print(f"{'case':<18}{'generate ns':>13}{'dict insert ns':>16}{'lookup ns':>11}{'key bytes':>11}")
+    for result in run(args.count):
+        print(f"{result['case']:<18}{result['generate_ns']:>13.0f}{result['insert_ns']:>16.0f}"
+              f"{result['lookup_ns']:>11.0f}{result['key_bytes']:>11.0f}")
@@ -0,0 +1,110 @@
+"""
+TradeSubscriber ingest throughput over an in-process zmq transport.
+
+A TradePublisher style PUB socket and the TradeSubscriber share one zmq context and talk over
+inproc://, so the numbers cover decode, validation, storage and snapshot publication without any
+network in the way. The publisher runs in its own thread while the subscriber drains batches.
+With --symbols the subscriber only subscribes to some stocks and zmq drops the rest at the
+publisher, before anything is decoded.
+
+Usage: python -m ssmts.benchmarks.bench_ingest [--trades N] [--codec binary|text] [--symbols STK1 ...]
+"""
+
+import argparse
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+
+import zmq
+
+from ssmts.config.constants import DEFAULT_STOCKS
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.consumer.trade_sub import TradeSubscriber
+from ssmts.utility.codec import get_codec, subscriptions, topic
+
+TRADE_ADDRESS = "inproc://bench-trades"
+
+
+def make_messages(count: int, codec, stock_ids=None) -> list[list[bytes]]:
+    """
+    Pre-encode ``count`` trades as [topic, payload] frames, spread over ``stock_ids`` (default: the default stocks).
+    """
+    stock_ids = itertools.cycle(stock_ids or [stock["stockId"] for stock in DEFAULT_STOCKS])
+    now = datetime.now().isoformat()
+    messages = []
+    for i in range(count):
+        trade = {
+            "tradeId": f"BENCH-{i}",
+            "stockId": next(stock_ids),
+            "timestamp": now,
+            "indicator": "BUY" if i % 2 else "SELL",
+            "price": 100.0 + i % 50,
+            "quantity": 1 + i % 100,
+        }
+        messages.append([topic(trade["stockId"]), codec.encode_trade(trade)])
+    return messages
+
+
+def run(trades: int = 50_000, codec: str = "binary", batch_size: int = None, symbols=None) -> dict:
+    """
+    Publish ``trades`` pre-encoded trades and time until the subscriber has ingested all it subscribed to.
+
+    :param symbols: Subscribe to these stocks only (default: all).
+    :return: trades ingested, published trades/s and the elapsed time.
+    """
+    logging.getLogger("ssmts").setLevel(logging.WARNING)
+    wire = get_codec(codec)
+    messages = make_messages(trades, wire)
+    filters = subscriptions(symbols)
+    expected = sum(1 for message in messages if message[0].startswith(tuple(filters)))
+    context = zmq.Context()
+    publisher = context.socket(zmq.PUB)
+    publisher.setsockopt(zmq.SNDHWM, 0)
+    publisher.bind(TRADE_ADDRESS)
+    subscriber = TradeSubscriber(address=TRADE_ADDRESS, snapShotPubAddress="inproc://bench-snapshots",
+                                 snapShotSyncAddress="inproc://bench-sync", codec=codec, drain=True,
+                                 batch_size=batch_size, context=context, symbols=symbols)
+    subscriber.socket.setsockopt(zmq.RCVHWM, 0)
+    # wait for the subscription to reach the publisher, or the first trades are dropped
+    while not subscriber.socket.poll(10):
+        publisher.send_multipart([filters[0], b""])
+    while subscriber.socket.poll(0):
+        subscriber.socket.recv_multipart()
+
+    def publish():
+        for message in messages:
+            publisher.send_multipart(message)
+
+    sender = threading.Thread(target=publish)
+    ingested = 0
+    start = time.perf_counter()
+    sender.start()
+    while ingested < expected:
+        if subscriber.socket.poll(1000):
+            ingested += subscriber.process_batch(subscriber.receive_batch())
+            subscriber.flush_updates()
+        elif not sender.is_alive():
+            break  # the rest was dropped; report what made it
+    sender.join()
+    elapsed = time.perf_counter() - start
+
+    subscriber.shutdown()
+    publisher.close(linger=0)
+    context.term()
+    subscriber.trade_store.register()
+    TradeSnapShotRegistry.register()
+    return {"trades": ingested, "seconds": elapsed, "trades_per_sec": trades / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=50_000, help="trades to publish")
+    parser.add_argument("--codec", default="binary", help="wire codec (binary or text)")
+    parser.add_argument("--batch-size", type=int, default=None, help="subscriber drain batch size")
+    parser.add_argument("--symbols", nargs="+", default=None, help="only subscribe to these stocks")
+    args = parser.parse_args()
+    result = run(args.trades, args.codec, args.batch_size, args.symbols)
+    print(f"{args.trades} trades published, {result['trades']} ingested in {result['seconds']:.3f}s: "
+          f"{result['trades_per_sec']:.0f} trades/s")
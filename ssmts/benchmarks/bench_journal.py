@@ -0,0 +1,77 @@
+"""
+Trade journal: append throughput per fsync policy, and recovery (replay) speed per trade store.
+
+Trades are journaled in batches, as the drain mode consumer does. Recovery is measured twice:
+with trades older than the VWSP window (only the snapshots are rebuilt from the newest trades)
+and with every trade inside the window (each one also goes back into a VWSP window).
+
+Usage: python -m ssmts.benchmarks.bench_journal [--trades N] [--batch-size N] [--stocks N]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from ssmts.data.store.columnar_trade_registry import ColumnarTradeRegistry
+from ssmts.data.store.trade_journal import FSYNC_POLICIES, TradeJournal
+from ssmts.data.store.trade_registry import TradeRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.trade import Trade
+
+
+def make_batch(batch_size: int, stocks: int, timestamp: datetime) -> list[Trade]:
+    return [Trade(f"{i:012d}-BENCH", f"STK{i % stocks}", timestamp, 1 + i % 50, 100.0 + i % 7,
+                  "BUY" if i % 2 else "SELL") for i in range(batch_size)]
+
+
+def append(directory: str, trades: int, batch: list, fsync: str) -> dict:
+    journal = TradeJournal(directory, fsync=fsync)
+    start = time.perf_counter()
+    for _ in range(trades // len(batch)):
+        journal.append(batch)
+    journal.close()
+    seconds = time.perf_counter() - start
+    return {"case": f"append.{fsync}", "trades_per_sec": journal.stats["trades"] / seconds,
+            "fsyncs": journal.stats["fsyncs"], "bytes_per_trade": journal.stats["bytes"] / journal.stats["trades"]}
+
+
+def recover(directory: str, store) -> dict:
+    store.register()
+    TradeSnapShotRegistry.register()
+    stats = TradeJournal(directory).recover(store)
+    store.register()
+    TradeSnapShotRegistry.register()
+    return stats
+
+
+def run(trades: int = 1_000_000, batch_size: int = 1_000, stocks: int = 100) -> list[dict]:
+    results = []
+    for age, label in ((timedelta(days=1), "old"), (timedelta(), "in_window")):
+        directory = tempfile.mkdtemp(prefix="ssmts-journal-")
+        try:
+            batch = make_batch(batch_size, stocks, datetime.now() - age)
+            for fsync in FSYNC_POLICIES if label == "old" else ("never",):
+                shutil.rmtree(directory)
+                appended = append(directory, trades, batch, fsync)
+                if label == "old":
+                    results.append(appended)
+            for store in (ColumnarTradeRegistry, TradeRegistry):
+                stats = recover(directory, store)
+                results.append({"case": f"recover.{store.__name__}.{label}", "trades_per_sec": stats["trades_per_sec"]})
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=1_000_000, help="trades journaled")
+    parser.add_argument("--batch-size", type=int, default=1_000, help="trades per journal frame")
+    parser.add_argument("--stocks", type=int, default=100, help="distinct stocks")
+    args = parser.parse_args()
+    print(f"{'case':<42}{'trades/s':>14}")
+    for result in run(args.trades, args.batch_size, args.stocks):
+        extra = f"  ({result['fsyncs']} fsyncs, {result['bytes_per_trade']:.1f} bytes/trade)" if "fsyncs" in result else ""
+        print(f"{result['case']:<42}{result['trades_per_sec']:>14.0f}{extra}")
@@ -0,0 +1,94 @@
+"""
+Stock universe loading: StockLoader.load streaming CSV and JSON Lines files of 100k and 1M
+instruments in chunks with bulk inserts, against adding the same records one StockRegistry.add
+at a time.
+
+Usage: python -m ssmts.benchmarks.bench_loader [--sizes 100000 1000000]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from ssmts.data.loaders.stock_loader import StockLoader
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.models.stock import Stock
+
+SIZES = (100_000, 1_000_000)
+FIELDS = ("stockId", "symbol", "stockType", "lastDivident", "fixedDivident", "parValue", "currentPrice")
+
+
+def universe(size: int, seed: int = 7):
+    """
+    Synthetic stock reference records.
+    """
+    rng = random.Random(seed)
+    for idx in range(size):
+        preferred = rng.random() < 0.2
+        par = rng.choice((50.0, 100.0, 250.0))
+        yield {"stockId": f"S{idx:07d}", "symbol": f"SY{idx:07d}", "stockType": "preferred" if preferred else "common",
+               "lastDivident": round(rng.uniform(0, 25), 2), "fixedDivident": 0.02 if preferred else 0.0,
+               "parValue": par, "currentPrice": round(par * rng.uniform(0.5, 2), 2)}
+
+
+def write_universe(directory: str, size: int) -> dict:
+    """
+    Write the universe as CSV and JSON Lines; returns {format: path}.
+    """
+    paths = {"csv": os.path.join(directory, f"universe_{size}.csv"),
+             "jsonl": os.path.join(directory, f"universe_{size}.jsonl")}
+    with open(paths["csv"], "w", newline="") as csv_file, open(paths["jsonl"], "w") as jsonl_file:
+        writer = csv.DictWriter(csv_file, FIELDS)
+        writer.writeheader()
+        for record in universe(size):
+            writer.writerow(record)
+            jsonl_file.write(json.dumps(record) + "\n")
+    return paths
+
+
+def _timed(load) -> float:
+    StockRegistry.register()
+    start = time.perf_counter()
+    load()
+    return time.perf_counter() - start
+
+
+def run(sizes=SIZES) -> list[dict]:
+    logging.getLogger("ssmts.data.loaders.base_loader").setLevel(logging.WARNING)
+    directory = tempfile.mkdtemp(prefix="ssmts-bench-loader-")
+    results = []
+    try:
+        for size in sizes:
+            paths = write_universe(directory, size)
+            for name, path in paths.items():
+                seconds = _timed(lambda: StockLoader.load(path))
+                assert len(StockRegistry.get_all()) == size
+                results.append({"case": name, "stocks": size, "seconds": seconds, "per_sec": size / seconds})
+            records = list(universe(size))
+
+            def one_at_a_time():
+                for record in records:
+                    StockRegistry.add(record["stockId"], Stock.from_dict(record))
+
+            seconds = _timed(one_at_a_time)
+            results.append({"case": "add_per_record", "stocks": size, "seconds": seconds, "per_sec": size / seconds})
+            del records
+            StockRegistry.register()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="universe sizes to load")
+    args = parser.parse_args()
+    print(f"{'case':<18}{'stocks':>10}{'seconds':>10}{'stocks/s':>12}")
+    for result in run(args.sizes):
+        print(f"{result['case']:<18}{result['stocks']:>10}{result['seconds']:>10.2f}{result['per_sec']:>12,.0f}")
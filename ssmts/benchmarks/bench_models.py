@@ -0,0 +1,74 @@
+"""
+Microbenchmark of the regular models against their compact (slotted) variants.
+
+Measures construction cost from a wire dict (ISO string timestamps, as sent by the text codec)
+and memory per instance.
+
+Usage: python -m ssmts.benchmarks.bench_models [--count N]
+"""
+
+import argparse
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from ssmts.models.compact import CompactStock, CompactTrade
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+
+TRADE_DATA = {
+    "tradeId": "1714552215-6f1c9d52-7a0e-4b8e-9d0b-3f0c2a1f5e77",
+    "stockId": "STK1",
+    "timestamp": datetime(2024, 5, 1, 9, 30, 15, 123456).isoformat(),
+    "indicator": "BUY",
+    "price": 101.25,
+    "quantity": 40,
+}
+STOCK_DATA = {"stockId": "STK1", "symbol": "TEA", "stockType": "common", "lastDivident": 0.0,
+              "fixedDivident": 0.0, "parValue": 100.0, "currentPrice": 100.0}
+
+
+def construction_ns(factory, data, number: int) -> float:
+    """
+    Mean nanoseconds to build one instance with ``factory(data)``.
+    """
+    timer = timeit.Timer(lambda: factory(data))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e9
+
+
+def bytes_per_instance(factory, data, count: int) -> float:
+    """
+    Mean bytes allocated per live instance built with ``factory(data)``.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [factory(data) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instances
+    return (after - before) / count - 8  # minus the list slot
+
+
+def run(count: int = 100_000) -> list[dict]:
+    cases = [
+        ("Trade.from_dict", Trade.from_dict, TRADE_DATA),
+        ("CompactTrade.from_dict", CompactTrade.from_dict, TRADE_DATA),
+        ("Stock.from_dict", Stock.from_dict, STOCK_DATA),
+        ("CompactStock.from_dict", CompactStock.from_dict, STOCK_DATA),
+    ]
+    return [{
+        "case": name,
+        "construct_ns": construction_ns(factory, data, count),
+        "bytes_per_instance": bytes_per_instance(factory, data, count),
+    } for name, factory, data in cases]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000, help="instances per measurement")
+    args = parser.parse_args()
+    print(f"{'case':<26}{'construct (ns)':>16}{'bytes/instance':>16}")
+    for result in run(args.count):
+        print(f"{result['case']:<26}{result['construct_ns']:>16.0f}{result['bytes_per_instance']:>16.0f}")
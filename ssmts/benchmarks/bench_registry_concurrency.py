@@ -0,0 +1,87 @@
+"""
+Multi-threaded stress benchmark of the registries.
+
+Reader threads look stocks up, read the All Share Index and the VWSP (what the Flask request
+threads do) while a writer thread applies trades and price updates (what the snapshot consumer
+does). Reports read and write throughput.
+
+Usage: python -m ssmts.benchmarks.bench_registry_concurrency [--readers N] [--seconds S] [--stocks N]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+from datetime import datetime
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.utility.stock_utils import StockUtils
+
+
+def setup(stocks: int) -> list[str]:
+    StockRegistry.register()
+    TradeSnapShotRegistry.register()
+    stock_ids = [f"STK{i}" for i in range(stocks)]
+    for stock_id in stock_ids:
+        StockRegistry.add(stock_id, Stock(stockId=stock_id, stockType="common", lastDivident=5.0, parValue=100.0, currentPrice=100.0))
+        TradeSnapShotRegistry.update_trade(stock_id, Trade(f"{stock_id}-0", stock_id, datetime.now(), 10, 100.0, "BUY"))
+    return stock_ids
+
+
+def run(readers: int = 4, seconds: float = 2.0, stocks: int = 1000) -> dict:
+    stock_ids = setup(stocks)
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def reader(slot):
+        count, i = 0, slot
+        while not stop.is_set():
+            stock_id = stock_ids[i % len(stock_ids)]
+            StockUtils.get_stock_details(stock_id)
+            StockUtils.calculate_all_share_index()
+            StockUtils.calculate_vwsp(stock_id)
+            count += 3
+            i += 7
+        reads[slot] = count
+
+    def writer():
+        count = 0
+        while not stop.is_set():
+            stock_id = stock_ids[count % len(stock_ids)]
+            TradeSnapShotRegistry.update_trade(stock_id, Trade(f"{stock_id}-{count}", stock_id, datetime.now(), 10, 100.0 + count % 7, "BUY"))
+            StockRegistry.update_stock_price(stock_id, StockUtils.calculate_vwsp(stock_id))
+            count += 1
+        writes[0] = count
+
+    threads = [threading.Thread(target=reader, args=(slot,)) for slot in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    with contextlib.redirect_stdout(io.StringIO()):  # update_stock_price prints every update
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {
+        "readers": readers,
+        "stocks": stocks,
+        "reads_per_sec": sum(reads) / seconds,
+        "writes_per_sec": writes[0] / seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4, 8], help="reader thread counts to try")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each run")
+    parser.add_argument("--stocks", type=int, default=1000, help="size of the stock universe")
+    args = parser.parse_args()
+    print(f"{'readers':>8}{'reads/s':>14}{'writes/s':>14}")
+    for readers in args.readers:
+        result = run(readers, args.seconds, args.stocks)
+        print(f"{readers:>8}{result['reads_per_sec']:>14.0f}{result['writes_per_sec']:>14.0f}")
@@ -0,0 +1,88 @@
+"""
+Historical replay: achieved against target throughput of TradeReplayer, at max speed and at a
+fixed target rate, with one subscriber counting what arrives over TCP.
+
+The recording is a synthetic JSON Lines file of evenly spaced trades, streamed from disk as a real
+recording would be.
+
+Usage: python -m ssmts.benchmarks.bench_replay [--trades N] [--rate TRADES_PER_SEC]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import zmq
+
+from ssmts.services.producer.trade_replay import TradeReplayer
+
+ADDRESS = "tcp://127.0.0.1:5595"
+
+
+def write_recording(path: str, trades: int, rate: float, stocks: int = 100) -> None:
+    start = datetime.now() - timedelta(days=1)
+    with open(path, "w") as file:
+        for i in range(trades):
+            file.write(json.dumps({"tradeId": f"{i:012d}-REPLAY", "stockId": f"STK{i % stocks}",
+                                   "timestamp": (start + timedelta(seconds=i / rate)).isoformat(),
+                                   "indicator": "BUY" if i % 2 else "SELL", "price": 100.0 + i % 7,
+                                   "quantity": 1 + i % 50}) + "\n")
+
+
+def _count(context, received: list, ready: threading.Event, done: threading.Event):
+    socket = context.socket(zmq.SUB)
+    socket.setsockopt(zmq.SUBSCRIBE, b"")
+    socket.setsockopt(zmq.RCVHWM, 0)
+    socket.setsockopt(zmq.RCVTIMEO, 100)
+    socket.connect(ADDRESS)
+    ready.set()
+    while not (done.is_set() and received[1]):
+        try:
+            socket.recv_multipart()
+            received[0] += 1
+        except zmq.Again:
+            received[1] = done.is_set()  # nothing left in flight once the replay is over
+    socket.close(linger=0)
+
+
+def replay(path: str, speed) -> dict:
+    context = zmq.Context()
+    received, ready, done = [0, False], threading.Event(), threading.Event()
+    replayer = TradeReplayer(path, address=ADDRESS, speed=speed, codec="binary", context=context, connect_wait=0)
+    counter = threading.Thread(target=_count, args=(context, received, ready, done))
+    counter.start()
+    ready.wait(5)
+    time.sleep(0.2)  # let the subscription reach the publisher
+    try:
+        stats = replayer.replay()
+    finally:
+        done.set()
+        counter.join(30)
+        replayer.close()
+        context.term()
+    stats["received"] = received[0]
+    return stats
+
+
+def run(trades: int = 200_000, rate: float = 20_000) -> list[dict]:
+    with tempfile.TemporaryDirectory(prefix="ssmts-replay-") as directory:
+        path = os.path.join(directory, "trades.jsonl")
+        write_recording(path, trades, rate)
+        return [dict(replay(path, speed), case=case) for case, speed in (("max", "max"), (f"{rate:.0f}/s", 1))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=200_000, help="trades in the recording")
+    parser.add_argument("--rate", type=float, default=20_000, help="recorded trades per second")
+    args = parser.parse_args()
+    print(f"{'case':<12}{'target/s':>12}{'achieved/s':>12}{'shortfall':>11}{'late':>9}{'received':>10}")
+    for result in run(args.trades, args.rate):
+        target = "n/a" if result["target_rate"] is None else f"{result['target_rate']:.0f}"
+        shortfall = "n/a" if result["shortfall"] is None else f"{result['shortfall']:.1%}"
+        print(f"{result['case']:<12}{target:>12}{result['achieved_rate']:>12.0f}{shortfall:>11}"
+              f"{result['late_trades']:>9}{result['received']:>10}")
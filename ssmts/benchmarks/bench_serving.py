@@ -0,0 +1,169 @@
+"""
+Requests/s and latency of the market metrics service, Flask mode against asyncio mode, while
+snapshots are being ingested.
+
+Each mode is started in its own process. A feeder process publishes snapshot deltas at a fixed
+rate on the snapshot channel, and client threads (one keep-alive connection each, reconnecting
+when the server closes it) request the metric endpoints as fast as they can.
+
+Usage: python -m ssmts.benchmarks.bench_serving [--seconds S] [--concurrency N] [--feed-rate MSG_PER_SEC]
+"""
+
+import argparse
+import http.client
+import itertools
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import zmq
+
+from ssmts.config.constants import DEFAULT_STOCKS
+from ssmts.utility.codec import get_codec, topic
+
+HOST = "127.0.0.1"
+HTTP_PORT = 5091
+SNAPSHOT_ADDRESS = "tcp://127.0.0.1:5693"
+SYNC_ADDRESS = "tcp://127.0.0.1:5694"
+STOCK_IDS = [stock["stockId"] for stock in DEFAULT_STOCKS]
+
+
+def _serve(mode: str):
+    """
+    Server process: the market metrics service in the given mode, with its output silenced.
+    """
+    sys.stdout = open(os.devnull, "w")  # the request hooks and price updates print
+    logging.disable(logging.WARNING)
+    if mode == "flask":
+        from ssmts.services.market_metrics import run_flask
+        run_flask(host=HOST, port=HTTP_PORT, snapshot_address=SNAPSHOT_ADDRESS, debug=False)
+    else:
+        from ssmts.services.async_market_metrics import run
+        run(HOST, HTTP_PORT, SNAPSHOT_ADDRESS, SYNC_ADDRESS)
+
+
+def _feed(rate: int, bound, start, stop):
+    """
+    Feeder process: a full snapshot of every stock, then deltas round robin at ``rate`` messages/s.
+    """
+    codec = get_codec("binary")
+    context = zmq.Context()
+    socket = context.socket(zmq.PUB)
+    socket.bind(SNAPSHOT_ADDRESS)
+    bound.set()
+    start.wait()
+    now = datetime.now()
+    trade = lambda stock_id, i: {"tradeId": f"F{i}", "stockId": stock_id, "timestamp": now,
+                                 "indicator": "BUY", "price": 100.0 + i % 10, "quantity": 10}
+    for stock_id in STOCK_IDS:
+        socket.send_multipart([topic(stock_id), codec.encode_snapshot(
+            {"stockId": stock_id, "snapshot_time": now, "seq": 1, "trades": [trade(stock_id, 0)]})])
+    sequences = dict.fromkeys(STOCK_IDS, 1)
+    interval = 1.0 / rate
+    next_send = time.perf_counter()
+    for i in itertools.count(1):
+        if stop.is_set():
+            break
+        stock_id = STOCK_IDS[i % len(STOCK_IDS)]
+        sequences[stock_id] += 1
+        socket.send_multipart([topic(stock_id), codec.encode_delta(
+            {"stockId": stock_id, "seq": sequences[stock_id], "trades": [trade(stock_id, i)]})])
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    socket.close(linger=0)
+    context.term()
+
+
+def _urls():
+    for i in itertools.count():
+        stock_id = STOCK_IDS[i % len(STOCK_IDS)]
+        yield from (f"/stock/{stock_id}", "/gbce-all-share-index", f"/trade/volume-weighted-stock-price/{stock_id}")
+
+
+def _wait_until_serving(timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(HOST, HTTP_PORT, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("market metrics service did not start")
+
+
+def _client(seconds: float, latencies: list, errors: list):
+    connection = http.client.HTTPConnection(HOST, HTTP_PORT, timeout=10)
+    deadline = time.perf_counter() + seconds
+    for url in _urls():
+        start = time.perf_counter()
+        if start > deadline:
+            break
+        try:
+            connection.request("GET", url)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run(mode: str, seconds: float = 5.0, concurrency: int = 8, feed_rate: int = 2000) -> dict:
+    bound, start, stop = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Event()
+    feeder = multiprocessing.Process(target=_feed, args=(feed_rate, bound, start, stop))
+    feeder.start()
+    bound.wait(5)
+    server = multiprocessing.Process(target=_serve, args=(mode,))
+    server.start()
+    try:
+        _wait_until_serving()
+        start.set()
+        time.sleep(0.5)  # let the initial snapshots land
+        latencies, errors = [], []
+        clients = [threading.Thread(target=_client, args=(seconds, latencies, errors)) for _ in range(concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    finally:
+        stop.set()
+        server.terminate()  # SIGTERM: graceful shutdown in asyncio mode
+        server.join(10)
+        feeder.join(5)
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "mode": mode,
+        "requests": count,
+        "errors": len(errors),
+        "requests_per_sec": count / seconds,
+        "p50_ms": latencies[count // 2] * 1e3 if count else 0.0,
+        "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1e3 if count else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["flask", "asyncio"], help="serving modes to compare")
+    parser.add_argument("--seconds", type=float, default=5.0, help="load duration per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent client connections")
+    parser.add_argument("--feed-rate", type=int, default=2000, help="snapshot messages published per second")
+    args = parser.parse_args()
+    print(f"{'mode':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for mode in args.modes:
+        result = run(mode, args.seconds, args.concurrency, args.feed_rate)
+        print(f"{result['mode']:<10}{result['requests']:>10}{result['errors']:>8}{result['requests_per_sec']:>10.0f}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
@@ -0,0 +1,66 @@
+"""
+Ingest throughput of the sharded trade consumer for a growing number of worker processes.
+
+Trades for 64 stocks are published over local tcp to a ShardedTradeSubscriber; throughput is the
+number of trades ingested by all workers over the time from the first trade sent to the last batch
+processed. With enough cores it should grow close to linearly with the number of shards, until the
+router process (or the publisher) becomes the bottleneck.
+
+Usage: python -m ssmts.benchmarks.bench_sharded [--shards 1 2 4] [--trades N]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import zmq
+
+from ssmts.benchmarks.bench_ingest import make_messages
+from ssmts.services.consumer.sharded_trade_sub import ShardedTradeSubscriber
+from ssmts.utility.codec import get_codec
+
+PUBLISH_ADDRESS = "tcp://127.0.0.1:5690"
+
+
+def run(shards: int, trades: int = 100_000) -> dict:
+    messages = make_messages(trades, get_codec("binary"), [f"SHARD{i}" for i in range(64)])
+    context = zmq.Context()
+    publisher = context.socket(zmq.XPUB)  # XPUB, to see when the router has subscribed
+    publisher.setsockopt(zmq.SNDHWM, 0)
+    publisher.bind(PUBLISH_ADDRESS)
+
+    results = multiprocessing.Queue()
+    consumer = ShardedTradeSubscriber(address=PUBLISH_ADDRESS, snapShotPubAddress="tcp://127.0.0.1:5691",
+                                      snapShotSyncAddress="tcp://127.0.0.1:5692", shards=shards,
+                                      base_port=5700, idle_timeout=1, results=results)
+    router = threading.Thread(target=consumer.consume_trades)
+    router.start()
+    publisher.recv()  # subscription from the router
+
+    start = time.time()
+    for message in messages:
+        publisher.send_multipart(message)
+    stats = [results.get(timeout=60) for _ in range(shards)]
+    router.join()
+    publisher.close(linger=0)
+    context.term()
+
+    ingested = sum(stat["trades"] for stat in stats)
+    elapsed = max(stat["last_batch_at"] for stat in stats if stat["last_batch_at"]) - start
+    return {"shards": shards, "trades": ingested, "seconds": elapsed, "trades_per_sec": ingested / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="worker counts to try")
+    parser.add_argument("--trades", type=int, default=100_000, help="trades to publish per run")
+    args = parser.parse_args()
+    logging.getLogger("ssmts").setLevel(logging.WARNING)
+    print(f"{os.cpu_count()} cores")
+    print(f"{'shards':>7}{'trades':>10}{'seconds':>10}{'trades/s':>12}")
+    for shards in args.shards:
+        result = run(shards, args.trades)
+        print(f"{result['shards']:>7}{result['trades']:>10}{result['seconds']:>10.2f}{result['trades_per_sec']:>12.0f}")
@@ -0,0 +1,83 @@
+"""
+Latency of the StockUtils metrics as the stock universe grows.
+
+For each universe size the StockRegistry is filled with synthetic stocks (each with one trade in
+the TradeSnapShotRegistry) and the mean latency of calculate_vwsp, calculate_vwap_horizons (every horizon of one
+stock), calculate_all_share_index and get_all_stocks is measured. The dividend yield, P/E ratio and VWSP of the whole universe are
+then calculated both with one call per stock and metric, and with calculate_metrics_bulk.
+
+Usage: python -m ssmts.benchmarks.bench_stock_utils [--sizes 5 1000 10000 100000]
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.utility.stock_utils import StockUtils
+
+SIZES = (5, 1_000, 10_000, 100_000)
+
+
+def populate(size: int) -> list[str]:
+    """
+    Reset the registries to ``size`` synthetic stocks, each with one trade.
+    """
+    StockRegistry.register()
+    TradeSnapShotRegistry.register()
+    now = datetime.now()
+    stock_ids = [f"STK{i}" for i in range(size)]
+    for i, stock_id in enumerate(stock_ids):
+        price = 50.0 + i % 100
+        StockRegistry.add(stock_id, Stock(stockId=stock_id, stockType="common", lastDivident=5.0, parValue=100.0,
+                                          currentPrice=price))
+        TradeSnapShotRegistry.update_trade(stock_id, Trade(f"T{i}", stock_id, now, 10, price, "BUY"))
+    return stock_ids
+
+
+def latency_us(func, repeat: int = 5) -> float:
+    """
+    Best mean latency of ``func()`` in microseconds, over ``repeat`` auto-ranged runs.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def per_item_metrics(stock_ids: list[str]) -> list:
+    """
+    What a dashboard does without the bulk API: one call per stock and metric.
+    """
+    return [(StockUtils.calculate_dividend_yield(stock_id, 120.0), StockUtils.calculate_pe_ratio(stock_id, 120.0),
+             StockUtils.calculate_vwsp(stock_id)) for stock_id in stock_ids]
+
+
+def run(sizes=SIZES) -> list[dict]:
+    results = []
+    for size in sizes:
+        stock_ids = populate(size)
+        stock_id = stock_ids[len(stock_ids) // 2]
+        for name, func in (
+            ("calculate_vwsp", lambda: StockUtils.calculate_vwsp(stock_id)),
+            ("calculate_vwap_horizons", lambda: StockUtils.calculate_vwap_horizons([stock_id])),
+            ("calculate_all_share_index", StockUtils.calculate_all_share_index),
+            ("get_all_stocks", StockUtils.get_all_stocks),
+            ("metrics_per_item", lambda: per_item_metrics(stock_ids)),
+            ("calculate_metrics_bulk", lambda: StockUtils.calculate_metrics_bulk([(s, 120.0) for s in stock_ids])),
+        ):
+            results.append({"case": name, "stocks": size, "latency_us": latency_us(func)})
+    StockRegistry.register()
+    TradeSnapShotRegistry.register()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="stock universe sizes")
+    args = parser.parse_args()
+    print(f"{'case':<28}{'stocks':>10}{'latency (us)':>16}")
+    for result in run(args.sizes):
+        print(f"{result['case']:<28}{result['stocks']:>10}{result['latency_us']:>16.2f}")
@@ -0,0 +1,90 @@
+"""
+Fan-out of the /stream endpoint (asyncio serving mode): many Server-Sent Events clients, each
+streaming every stock and the index, while snapshots are being ingested.
+
+The server and snapshot feeder processes are the ones of bench_serving. The clients run on one
+event loop in this process and count the update events they receive.
+
+Usage: python -m ssmts.benchmarks.bench_stream [--clients N] [--seconds S] [--interval SECONDS] [--feed-rate MSG_PER_SEC]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+from ssmts.benchmarks.bench_serving import HOST, HTTP_PORT, _feed, _serve, _wait_until_serving
+
+
+async def _client(url: str, seconds: float, counts: list, errors: list):
+    try:
+        reader, writer = await asyncio.open_connection(HOST, HTTP_PORT)
+    except OSError as e:
+        errors.append(str(e))
+        return
+    try:
+        writer.write(f"GET {url} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 200"):
+            errors.append(head.split(b"\r\n", 1)[0].decode())
+            return
+        events = 0
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                chunk = await asyncio.wait_for(reader.readuntil(b"\n\n"), remaining)
+            except asyncio.TimeoutError:
+                break
+            if chunk.startswith(b"event: update"):
+                events += 1
+        counts.append(events)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(str(e))
+    finally:
+        writer.close()
+
+
+async def _clients(clients: int, seconds: float, interval: float):
+    counts, errors = [], []
+    url = f"/stream?interval={interval}"
+    await asyncio.gather(*(_client(url, seconds, counts, errors) for _ in range(clients)))
+    return counts, errors
+
+
+def run(clients: int = 1_000, seconds: float = 5.0, interval: float = 0.25, feed_rate: int = 2000) -> dict:
+    bound, start, stop = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Event()
+    feeder = multiprocessing.Process(target=_feed, args=(feed_rate, bound, start, stop))
+    feeder.start()
+    bound.wait(5)
+    server = multiprocessing.Process(target=_serve, args=("asyncio",))
+    server.start()
+    try:
+        _wait_until_serving()
+        start.set()
+        counts, errors = asyncio.run(_clients(clients, seconds, interval))
+    finally:
+        stop.set()
+        server.terminate()
+        server.join(10)
+        feeder.join(5)
+    events = sum(counts)
+    return {
+        "clients": len(counts),
+        "errors": len(errors),
+        "events": events,
+        "events_per_sec": events / seconds,
+        "events_per_client_per_sec": events / seconds / len(counts) if counts else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1_000, help="concurrent streaming clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="streaming duration")
+    parser.add_argument("--interval", type=float, default=0.25, help="update interval requested by each client")
+    parser.add_argument("--feed-rate", type=int, default=2000, help="snapshot messages published per second")
+    args = parser.parse_args()
+    result = run(args.clients, args.seconds, args.interval, args.feed_rate)
+    print(f"{'clients':>8}{'errors':>8}{'events':>10}{'events/s':>10}{'per client/s':>14}")
+    print(f"{result['clients']:>8}{result['errors']:>8}{result['events']:>10}{result['events_per_sec']:>10.0f}"
+          f"{result['events_per_client_per_sec']:>14.2f}")
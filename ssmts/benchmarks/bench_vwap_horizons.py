@@ -0,0 +1,76 @@
+"""
+Multi-horizon VWAP (1m, 5m, 15m and 1h) of one stock trading at several rates: the cost per trade
+of feeding VwapHorizons, and of reading every horizon from it, against recomputing every horizon
+from the raw trades of the last hour, which is what a query costs without the bucket rings.
+
+Usage: python -m ssmts.benchmarks.bench_vwap_horizons [--rates 1 10 100]
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+from ssmts.config.constants import VWAP_HORIZONS
+from ssmts.data.store.vwap_horizons import VwapHorizons, horizon_label
+
+RATES = (1, 10, 100)  # trades per second
+
+
+def trades(rate: int, start: float, seconds: int, seed: int = 11) -> list:
+    """
+    (epoch seconds, price, quantity) of ``seconds`` of trading at ``rate`` trades per second.
+    """
+    rng = random.Random(seed)
+    return [(start + idx / rate, rng.uniform(90, 110), rng.randint(1, 500)) for idx in range(seconds * rate)]
+
+
+def rescan(raw: list, now: float) -> dict:
+    """
+    Every horizon recomputed from the raw trades, O(trades in the longest horizon).
+    """
+    vwaps = {}
+    for horizon in VWAP_HORIZONS:
+        cutoff = now - horizon
+        notional = volume = 0
+        for timestamp, price, quantity in raw:
+            if timestamp > cutoff:
+                notional += price * quantity
+                volume += quantity
+        vwaps[horizon_label(horizon)] = notional / volume if volume else None
+    return vwaps
+
+
+def run(rates=RATES) -> list[dict]:
+    results = []
+    seconds = max(VWAP_HORIZONS)
+    for rate in rates:
+        start = time.time() - seconds
+        raw = trades(rate, start, seconds)
+        clock = [start]
+        horizons = VwapHorizons(clock=lambda: clock[0])  # replayed as if live: trades arrive at their time
+        add_start = time.perf_counter()
+        for timestamp, price, quantity in raw:
+            clock[0] = timestamp
+            horizons.add(timestamp, price, quantity)
+        add_ns = (time.perf_counter() - add_start) / len(raw) * 1e9
+        horizons.clock = time.time
+        timer = timeit.Timer(horizons.vwaps)
+        number, _ = timer.autorange()
+        read_us = min(timer.repeat(repeat=3, number=number)) / number * 1e6
+        now = time.time()
+        timer = timeit.Timer(lambda: rescan(raw, now))
+        number, _ = timer.autorange()
+        rescan_us = min(timer.repeat(repeat=3, number=number)) / number * 1e6
+        results.append({"rate": rate, "trades": len(raw), "add_ns": add_ns, "read_us": read_us, "rescan_us": rescan_us})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=int, nargs="+", default=list(RATES), help="trades per second")
+    args = parser.parse_args()
+    print(f"{'trades/s':>10}{'trades':>10}{'add (ns)':>12}{'read (us)':>12}{'rescan (us)':>14}")
+    for result in run(args.rates):
+        print(f"{result['rate']:>10}{result['trades']:>10}{result['add_ns']:>12.0f}{result['read_us']:>12.2f}"
+              f"{result['rescan_us']:>14.1f}")
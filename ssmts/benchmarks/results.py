@@ -0,0 +1,68 @@
+"""
+Saving benchmark results as JSON and comparing them against a saved baseline.
+
+A result file looks like::
+
+    {"meta": {"python": "3.11.4", "platform": "...", "created": "2024-05-01T09:30:15"},
+     "metrics": {"stock_utils.get_all_stocks.1000": {"value": 594.3, "unit": "us", "higher_is_better": false}}}
+"""
+
+import json
+import platform
+from datetime import datetime
+
+DEFAULT_THRESHOLD = 0.10  # relative slowdown beyond which a metric is flagged as a regression
+
+
+def metric(value: float, unit: str, higher_is_better: bool = False) -> dict:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def save(metrics: dict, path: str) -> dict:
+    """
+    Write metrics to ``path`` along with details of the machine they were measured on.
+    """
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "metrics": metrics,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+    return document
+
+
+def load(path: str) -> dict:
+    """
+    Read the metrics of a result file written by ``save``.
+    """
+    with open(path) as file:
+        return json.load(file)["metrics"]
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Compare metrics against a baseline.
+
+    :param threshold: Relative slowdown (0.10 = 10%) beyond which a metric is a regression.
+    :return: One row per metric present in both, with its ``slowdown`` (positive is worse) and
+        whether it is a ``regression``.
+    """
+    rows = []
+    for name in sorted(current.keys() & baseline.keys()):
+        new, old = current[name]["value"], baseline[name]["value"]
+        if old == 0:
+            continue
+        slowdown = (old - new) / old if current[name].get("higher_is_better") else (new - old) / old
+        rows.append({
+            "name": name,
+            "baseline": old,
+            "current": new,
+            "unit": current[name].get("unit", ""),
+            "slowdown": slowdown,
+            "regression": slowdown > threshold,
+        })
+    return rows
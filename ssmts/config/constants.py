@@ -1,4 +1,5 @@
 import enum
+import os
 
 
 class StockType(enum.Enum):
@@ -15,4 +16,94 @@ DEFAULT_STOCKS = [
 
 class TradeType(enum.Enum):
     BUY = "BUY"
-    SELL = "SELL"
\ No newline at end of file
+    SELL = "SELL"
+
+TRADE_INDICATORS = frozenset(t.value for t in TradeType)  # precomputed for per-trade validation
+# side codes of the binary formats (wire, journal, columnar store and spill): code -> indicator and back
+TRADE_SIDES = tuple(t.value for t in TradeType)
+TRADE_SIDE_INDEX = {side: code for code, side in enumerate(TRADE_SIDES)}
+
+# Wire format used on the trade and snapshot sockets ("binary" or "text")
+WIRE_CODEC = os.environ.get("SSMTS_WIRE_CODEC", "binary")
+
+# Length of the time window used for the Volume Weighted Stock Price, in seconds
+VWSP_WINDOW_SECONDS = float(os.environ.get("SSMTS_VWSP_WINDOW_SECONDS", 15 * 60))
+
+# Horizons of the multi-horizon VWAP, in seconds, and the length of its time buckets
+VWAP_HORIZONS = tuple(int(h) for h in os.environ.get("SSMTS_VWAP_HORIZONS", "60,300,900,3600").split(","))
+VWAP_BUCKET_SECONDS = int(os.environ.get("SSMTS_VWAP_BUCKET_SECONDS", 1))
+
+# Trade store used by the trade consumer ("dict" or "columnar")
+TRADE_STORE = os.environ.get("SSMTS_TRADE_STORE", "dict")
+
+# Trade consumer drain mode ("1"): read everything queued on the socket and process it as one batch.
+# Off by default, the consumer handles one trade per poll; the sharded consumer's workers always drain
+DRAIN_MODE = os.environ.get("SSMTS_DRAIN_MODE", "0") == "1"
+DRAIN_BATCH_SIZE = int(os.environ.get("SSMTS_DRAIN_BATCH_SIZE", 1000))
+
+# Snapshot channel: a full snapshot is sent every N delta updates of a stock
+SNAPSHOT_RESYNC_INTERVAL = int(os.environ.get("SSMTS_SNAPSHOT_RESYNC_INTERVAL", 100))
+
+# Snapshot conflation: publish dirty stocks at most every N seconds (0 = once at the end of each batch)
+CONFLATE_INTERVAL = float(os.environ.get("SSMTS_CONFLATE_INTERVAL", 0))
+
+# Sharded trade consumer: number of worker processes, and the first of the local ports they use
+# (three per worker: trades, snapshots and snapshot resync)
+CONSUMER_SHARDS = int(os.environ.get("SSMTS_CONSUMER_SHARDS", os.cpu_count() or 1))
+SHARD_BASE_PORT = int(os.environ.get("SSMTS_SHARD_BASE_PORT", 5600))
+
+# Market metrics serving mode: "flask" (snapshot consumer thread next to the Flask server) or
+# "asyncio" (consumer and REST API on one event loop, see ssmts.services.async_market_metrics)
+SERVING_MODE = os.environ.get("SSMTS_SERVING_MODE", "flask")
+
+# Market metrics read endpoints: cached responses kept (least recently used evicted first; 0 disables the cache)
+RESPONSE_CACHE_SIZE = int(os.environ.get("SSMTS_RESPONSE_CACHE_SIZE", 1024))
+
+# Market metrics bulk endpoints: most items per request (stock/price pairs, stocks x prices of a grid, stocks)
+MAX_BULK_ITEMS = int(os.environ.get("SSMTS_MAX_BULK_ITEMS", 100_000))
+
+# asyncio serving mode: largest request body accepted, in bytes (larger ones get a 413)
+MAX_REQUEST_BODY = int(os.environ.get("SSMTS_MAX_REQUEST_BODY", 16 * 1024 * 1024))
+
+# Streaming endpoint (/stream): shortest interval between two updates sent to one client (clients
+# may ask for a longer one), cap on the bytes queued for a client's socket, and concurrent clients
+STREAM_MIN_INTERVAL = float(os.environ.get("SSMTS_STREAM_MIN_INTERVAL", 0.25))
+STREAM_SEND_BUFFER = int(os.environ.get("SSMTS_STREAM_SEND_BUFFER", 64 * 1024))
+STREAM_MAX_CLIENTS = int(os.environ.get("SSMTS_STREAM_MAX_CLIENTS", 10_000))
+
+# Trade journal (write-ahead log of accepted trades, replayed on startup). Disabled unless a
+# directory is set. Fsync policy: "always" (every batch), "interval" (at most every
+# JOURNAL_FSYNC_INTERVAL seconds) or "never" (left to the OS)
+JOURNAL_DIR = os.environ.get("SSMTS_JOURNAL_DIR") or None
+JOURNAL_FSYNC = os.environ.get("SSMTS_JOURNAL_FSYNC", "interval")
+JOURNAL_FSYNC_INTERVAL = float(os.environ.get("SSMTS_JOURNAL_FSYNC_INTERVAL", 0.05))
+JOURNAL_SEGMENT_BYTES = int(os.environ.get("SSMTS_JOURNAL_SEGMENT_BYTES", 64 * 1024 * 1024))
+
+# Trade store retention ("dict" trade store): trades kept in memory at most TRADE_RETENTION_SECONDS
+# old (by trade timestamp), at most TRADE_RETENTION_COUNT of them, and at most
+# TRADE_RETENTION_BYTES (estimated); 0 is no limit. Trades past a limit are dropped, or spilled to
+# compressed segments of TRADE_SPILL_SEGMENT_TRADES trades in TRADE_SPILL_DIR (when set), where
+# they can still be looked up by id
+TRADE_RETENTION_SECONDS = float(os.environ.get("SSMTS_TRADE_RETENTION_SECONDS", 0))
+TRADE_RETENTION_COUNT = int(os.environ.get("SSMTS_TRADE_RETENTION_COUNT", 0))
+TRADE_RETENTION_BYTES = int(os.environ.get("SSMTS_TRADE_RETENTION_BYTES", 0))
+TRADE_SPILL_DIR = os.environ.get("SSMTS_TRADE_SPILL_DIR") or None
+TRADE_SPILL_SEGMENT_TRADES = int(os.environ.get("SSMTS_TRADE_SPILL_SEGMENT_TRADES", 65_536))
+
+# Trade id generator (ssmts.utility.trade_utils): node id (0-1023) packed into every id. Processes
+# generating ids at the same time need different node ids; trade producers refuse to start without
+# one, other processes derive it from the pid
+TRADE_ID_NODE = os.environ.get("SSMTS_TRADE_ID_NODE")
+
+# Latency histograms and counters (ssmts.utility.metrics): "0" switches the instrumentation off.
+# The trade consumer serves its /metrics on METRICS_PORT (0: not served)
+METRICS_ENABLED = os.environ.get("SSMTS_METRICS", "1") != "0"
+METRICS_PORT = int(os.environ.get("SSMTS_METRICS_PORT", 0))
+
+# End-to-end tracing (ssmts.utility.tracing): producers trace one trade in TRACE_SAMPLE (0: none)
+TRACE_SAMPLE = int(os.environ.get("SSMTS_TRACE_SAMPLE", 100))
+
+# Stock universe: a CSV (with a header row) or JSON Lines file of stock reference data, optionally
+# gzipped, loaded instead of DEFAULT_STOCKS; loaders insert LOAD_CHUNK_SIZE records at a time
+STOCK_UNIVERSE = os.environ.get("SSMTS_STOCK_UNIVERSE") or None
+LOAD_CHUNK_SIZE = int(os.environ.get("SSMTS_LOAD_CHUNK_SIZE", 10_000))
@@ -0,0 +1,84 @@
+"""
+Streaming readers of reference data files, one dict per record, never loading the file whole:
+    * CSV with a header row (``.csv``),
+    * JSON Lines, one object per line (any other suffix, e.g. ``.jsonl``).
+Files ending in .gz are decompressed on the fly.
+"""
+
+import csv
+import gzip
+import json
+from itertools import islice
+
+
+def open_text(path: str):
+    """
+    Open a text file for reading, decompressing it if it ends in .gz.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_csv(path: str, field_types: dict = None):
+    """
+    Stream the rows of a CSV file with a header row as dicts.
+
+    :param field_types: Column name -> type (e.g. float) to convert the values of that column
+        with; other columns stay strings. Empty values become None.
+    """
+    field_types = field_types or {}
+    with open_text(path) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        typed = [(idx, name, field_types[name]) for idx, name in enumerate(header) if name in field_types]
+        for row in reader:
+            if not row:
+                continue
+            record = dict(zip(header, row))
+            try:
+                for idx, name, convert in typed:
+                    value = row[idx]
+                    record[name] = convert(value) if value != "" else None
+            except (ValueError, IndexError) as e:
+                raise ValueError(f"{path}, line {reader.line_num}: {e}") from None
+            yield record
+
+
+def read_jsonl(path: str):
+    """
+    Stream the objects of a JSON Lines file. Blank lines are skipped.
+    """
+    with open_text(path) as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}, line {line_number}: {e}") from None
+
+
+def read_records(path: str, field_types: dict = None):
+    """
+    Stream the records of a CSV or JSON Lines file, picking the reader from the suffix.
+
+    :param field_types: Column types for CSV files, see read_csv.
+    """
+    if path.removesuffix(".gz").endswith(".csv"):
+        return read_csv(path, field_types)
+    return read_jsonl(path)
+
+
+def chunked(records, size: int):
+    """
+    Group a stream of records into lists of up to ``size`` records.
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
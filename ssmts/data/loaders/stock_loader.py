@@ -1,6 +1,7 @@
 
-from ssmts.config.constants import DEFAULT_STOCKS
+from ssmts.config.constants import DEFAULT_STOCKS, STOCK_UNIVERSE
 from ssmts.data.loaders.base_loader import BaseLoader
+from ssmts.data.loaders.record_reader import read_records
 from ssmts.data.store.stock_registry import StockRegistry
 from ssmts.models.stock import Stock
 import logging
@@ -17,10 +18,14 @@ class StockLoader(BaseLoader[Stock]):
     PRIMARY_KEY = "stockId"
     ENTITY: Stock = Stock
     ENTITY_STORE = StockRegistry  # The registry where the stock entities will be stored
+    FIELD_TYPES = {"lastDivident": float, "fixedDivident": float, "parValue": float, "currentPrice": float}
     
     @classmethod
     def getEntities(cls):
         """
-        Returns a list of stock entities. This can be replaced with a database call or any other data source.
+        Returns the stock entities: a stream of the records of the STOCK_UNIVERSE file
+        (SSMTS_STOCK_UNIVERSE) when set, else DEFAULT_STOCKS.
         """
-        return DEFAULT_STOCKS  # Replace with actual data source if needed
+        if STOCK_UNIVERSE:
+            return read_records(STOCK_UNIVERSE, cls.FIELD_TYPES)
+        return DEFAULT_STOCKS
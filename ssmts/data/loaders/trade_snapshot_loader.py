@@ -19,6 +19,7 @@ class TradeSnapshotLoader(BaseLoader):
     ENTITY_STORE = TradeSnapShotRegistry  # Assuming TradeSnapshotRegistry is defined in ssmts.data.store.trade_snapshot_registry
     
     SNAPSHOTS = {}
+    _lock = Lock()
                 
 
     @classmethod
@@ -26,7 +27,7 @@ class TradeSnapshotLoader(BaseLoader):
         """
         Returns a list of trade snapshot entities. This can be replaced with a database call or any other data source.
         """
-        with Lock():
+        with cls._lock:
             # Return the list of snapshots
             return cls.SNAPSHOTS  # Replace with actual data source if needed
       
\ No newline at end of file
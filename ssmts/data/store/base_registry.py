@@ -1,61 +1,91 @@
 from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
 from ssmts.models.base import BaseModel
+from ssmts.utility.rwlock import ReadWriteLock
 import threading
 
 T = TypeVar("T", bound="BaseModel")
 
+_locks_guard = threading.Lock()  # only guards the creation of the per store locks
+
+
 class BaseRegistry(ABC, Generic[T]):
     """
     Base class for a registry that stores and manages instances of a entities.
+
+    Each store has its own reader/writer lock: lookups from any number of threads (e.g. the
+    Flask request threads) run concurrently, while updates (e.g. the snapshot consumer) are exclusive.
     """
     _store: dict[str, dict[str,T]] = {} # for e.g. {"STOCKS" : {"STK1": StockObj, "STK2": StockObj}}
+    _locks: dict[str, ReadWriteLock] = {} # one lock per store name
 
     STORE_NAME: str = None # Default store name
 
+    @classmethod
+    def lock(cls) -> ReadWriteLock:
+        """
+        The reader/writer lock guarding this registry's store.
+        """
+        lock = cls._locks.get(cls.STORE_NAME)
+        if lock is None:
+            with _locks_guard:
+                lock = cls._locks.setdefault(cls.STORE_NAME, ReadWriteLock())
+        return lock
+
     @classmethod
     def register(cls) -> None:
         """
         Register an instance with a name.
         """
-        cls._store[cls.STORE_NAME] = {}
+        with cls.lock().write:
+            cls._store[cls.STORE_NAME] = {}
 
     @classmethod
     def add(cls, entityId: str, instance: T) -> None:
         """
         Add an instance to the registry.
         """
-        with threading.Lock():
+        with cls.lock().write:
             if cls.STORE_NAME not in cls._store:
                 cls.register()
             cls._store[cls.STORE_NAME][entityId] = instance
 
+    @classmethod
+    def add_many(cls, items) -> None:
+        """
+        Add (entity id, instance) pairs under one lock acquisition.
+        """
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            cls._store[cls.STORE_NAME].update(items)
+
     @classmethod
     def get(cls, entityId: str) -> T:
         """
         Retrieve an entity instance by its ID.
         """
-        with threading.Lock():
-            if cls.STORE_NAME not in cls._store:
-                cls._store[cls.STORE_NAME] = {}
-            if entityId not in cls._store[cls.STORE_NAME]:
+        with cls.lock().read:
+            store = cls._store.get(cls.STORE_NAME, {})
+            if entityId not in store:
                 raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
-            return cls._store[cls.STORE_NAME][entityId]
+            return store[entityId]
 
     @classmethod
     def get_all(cls) -> dict[str,T]:
         """
         Retrieve all entities.
+        Returns a point in time copy, so callers can iterate it while the store is being updated.
         """
-        with threading.Lock():
-            return cls._store.get(cls.STORE_NAME, {})
+        with cls.lock().read:
+            return dict(cls._store.get(cls.STORE_NAME, {}))
 
     @classmethod
     def unregister(cls, entityId: str) -> None:
         """
         Unregister an entity instance by its ID.
         """
-        with threading.Lock():
+        with cls.lock().write:
             if entityId not in cls._store[cls.STORE_NAME]:
                 raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
             del cls._store[cls.STORE_NAME][entityId]
@@ -65,7 +95,8 @@ class BaseRegistry(ABC, Generic[T]):
         """
         Unregister all entities in the registry.
         """
-        with threading.Lock():
+        with cls.lock().write:
             if cls.STORE_NAME not in cls._store:
                 raise ValueError(f"Store {cls.STORE_NAME} does not exist.")
-        # Clear the store for the specific store name
\ No newline at end of file
+            # Clear the store for the specific store name
+            cls._store[cls.STORE_NAME].clear()
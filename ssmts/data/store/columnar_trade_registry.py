@@ -0,0 +1,208 @@
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+from ssmts.config.constants import TRADE_SIDE_INDEX, TRADE_SIDES
+from ssmts.data.store.base_registry import BaseRegistry
+from ssmts.models.trade import Trade
+from ssmts.utility.codec import from_epoch_ns, to_epoch_ns
+
+
+
+class ColumnarTradeView(Mapping):
+    """
+    Read-only mapping of trade id to Trade over the columnar store.
+    Trades are materialized one at a time, only when they are looked up.
+    """
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    def __getitem__(self, entityId):
+        with self._registry.lock().read:
+            row = self._registry._rows.get(entityId)
+            if row is None:
+                raise KeyError(entityId)
+            return self._registry._materialize(row)
+
+    def __iter__(self):
+        with self._registry.lock().read:
+            return iter(list(self._registry._rows))
+
+    def __len__(self):
+        return len(self._registry._rows)
+
+    def __repr__(self):
+        return f"ColumnarTradeView({len(self)} trades)"
+
+
+class ColumnarTradeRegistry(BaseRegistry[Trade]):
+    """
+    Array backed trade registry for large sessions.
+
+    Instead of one Trade object per trade, trades are kept in parallel typed arrays
+    (timestamp ns, stock index, quantity, price, side) plus a trade id -> row index. It keeps the
+    BaseRegistry add/get/get_all contract; Trade objects are only built when asked for.
+    """
+    STORE_NAME = "TRADES"
+
+    _rows: dict[str, int] = {}  # trade id -> row
+    _trade_ids: list = []  # row -> trade id (None once unregistered)
+    _timestamps = array('q')
+    _stocks = array('I')
+    _quantities = array('I')
+    _prices = array('d')
+    _sides = array('b')
+    _stock_ids: list[str] = []  # stock index -> stock id
+    _stock_index: dict[str, int] = {}
+
+    @classmethod
+    def register(cls) -> None:
+        """
+        Create (or reset) the columns.
+        """
+        with cls.lock().write:
+            cls._rows = {}
+            cls._trade_ids = []
+            cls._timestamps = array('q')
+            cls._stocks = array('I')
+            cls._quantities = array('I')
+            cls._prices = array('d')
+            cls._sides = array('b')
+            cls._stock_ids = []
+            cls._stock_index = {}
+
+    @classmethod
+    def _stock_idx(cls, stock_id: str) -> int:
+        idx = cls._stock_index.get(stock_id)
+        if idx is None:
+            idx = cls._stock_index[stock_id] = len(cls._stock_ids)
+            cls._stock_ids.append(stock_id)
+        return idx
+
+    @classmethod
+    def _materialize(cls, row: int) -> Trade:
+        return Trade(
+            tradeId=cls._trade_ids[row],
+            stockId=cls._stock_ids[cls._stocks[row]],
+            timeStamp=from_epoch_ns(cls._timestamps[row]),
+            quantity=cls._quantities[row],
+            price=cls._prices[row],
+            indicator=TRADE_SIDES[cls._sides[row]],
+        )
+
+    @classmethod
+    def add(cls, entityId: str, instance: Trade) -> None:
+        """
+        Add a trade to the columns. Adding an existing trade id overwrites its row.
+        """
+        with cls.lock().write:
+            timestamp = to_epoch_ns(instance.timeStamp)
+            stock = cls._stock_idx(instance.stockId)
+            side = TRADE_SIDE_INDEX[instance.indicator]
+            row = cls._rows.get(entityId)
+            if row is None:
+                cls._rows[entityId] = len(cls._trade_ids)
+                cls._trade_ids.append(entityId)
+                cls._timestamps.append(timestamp)
+                cls._stocks.append(stock)
+                cls._quantities.append(instance.quantity)
+                cls._prices.append(instance.price)
+                cls._sides.append(side)
+            else:
+                cls._timestamps[row] = timestamp
+                cls._stocks[row] = stock
+                cls._quantities[row] = instance.quantity
+                cls._prices[row] = instance.price
+                cls._sides[row] = side
+
+    @classmethod
+    def add_columns(cls, trade_ids, stock_ids, timestamps, stocks, quantities, prices, sides) -> None:
+        """
+        Append trades given as columns (e.g. replayed from the trade journal), without building a
+        Trade per trade: the typed columns are appended as they are. A trade id that is already
+        stored points to its new row from then on.
+
+        :param stock_ids: Stock ids the values of ``stocks`` index into; may hold many more stocks
+            than the batch uses (a journal segment's whole table), only the used ones are looked up.
+        :param timestamps: Epoch nanoseconds, array('q').
+        :param stocks: array('I'); quantities array('I'), prices array('d'), sides array('b') (codes of TRADE_SIDES).
+        """
+        with cls.lock().write:
+            translate = {stock: cls._stock_idx(stock_ids[stock]) for stock in set(stocks)}
+            if any(stock != idx for stock, idx in translate.items()):
+                stocks = array('I', map(translate.__getitem__, stocks))
+            start = len(cls._trade_ids)
+            cls._trade_ids.extend(trade_ids)
+            cls._rows.update(zip(trade_ids, range(start, start + len(trade_ids))))
+            cls._timestamps.extend(timestamps)
+            cls._stocks.extend(stocks)
+            cls._quantities.extend(quantities)
+            cls._prices.extend(prices)
+            cls._sides.extend(sides)
+
+    @classmethod
+    def get(cls, entityId: str) -> Trade:
+        """
+        Materialize a trade by its ID.
+        """
+        with cls.lock().read:
+            row = cls._rows.get(entityId)
+            if row is None:
+                raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
+            return cls._materialize(row)
+
+    @classmethod
+    def get_all(cls) -> ColumnarTradeView:
+        """
+        Lazy mapping over all trades.
+        """
+        return ColumnarTradeView(cls)
+
+    @classmethod
+    def unregister(cls, entityId: str) -> None:
+        """
+        Remove a trade. Its row is left behind as a tombstone, to keep row numbers stable.
+        """
+        with cls.lock().write:
+            if entityId not in cls._rows:
+                raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
+            cls._trade_ids[cls._rows.pop(entityId)] = None
+
+    @classmethod
+    def UnregisterAll(cls) -> None:
+        """
+        Unregister all trades.
+        """
+        cls.register()
+
+    @classmethod
+    def memory_usage(cls) -> dict:
+        """
+        Approximate memory held by the store, in bytes.
+        """
+        with cls.lock().read:
+            columns = sum(column.buffer_info()[1] * column.itemsize for column in
+                          (cls._timestamps, cls._stocks, cls._quantities, cls._prices, cls._sides))
+            index = sys.getsizeof(cls._rows) + sys.getsizeof(cls._trade_ids) + \
+                sum(sys.getsizeof(trade_id) for trade_id in cls._rows)
+            return {"trades": len(cls._rows), "columns": columns, "index": index, "total": columns + index}
+
+    @classmethod
+    def bytes_per_trade(cls) -> float:
+        """
+        Average bytes of memory used per stored trade.
+        """
+        usage = cls.memory_usage()
+        return usage["total"] / usage["trades"] if usage["trades"] else 0.0
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        The counters of TradeRegistry.stats(); the columnar store has no retention, so nothing is
+        ever evicted or spilled.
+        """
+        usage = cls.memory_usage()
+        return {"trades": usage["trades"], "bytes": usage["total"], "evicted": 0, "spilled": 0,
+                "spill_segments": 0, "spill_disk_bytes": 0, "spill_index_bytes": 0}
@@ -0,0 +1,32 @@
+import threading
+
+
+class DataVersion:
+    """
+    Monotonically increasing version of the market data held by the registries.
+
+    Every write that can change what the read endpoints return (stock prices, the stock universe,
+    trade snapshots) bumps it, so anything derived from the registries can be cached and reused
+    for as long as the version it was built at is current.
+    """
+    _version = 0
+    _lock = threading.Lock()  # registries have separate locks, so bumps can race each other
+
+    @classmethod
+    def bump(cls) -> int:
+        """
+        Move to a new version.
+
+        :return: The new version.
+        """
+        with cls._lock:
+            cls._version += 1
+            return cls._version
+
+    @classmethod
+    def current(cls) -> int:
+        """
+        The current version. Read it before reading the registries: data read afterwards is at
+        least as new as the version, never older.
+        """
+        return cls._version
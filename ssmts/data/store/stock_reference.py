@@ -0,0 +1,36 @@
+from array import array
+
+from ssmts.config.constants import StockType
+
+_MISSING = float("nan")  # dividend not set on the stock
+
+
+def _dividend(value) -> float:
+    return _MISSING if value is None else float(value)
+
+
+class StockReferenceData:
+    """
+    Column (array) view of the static stock attributes used by the bulk metrics.
+
+    Row ``i`` of every column belongs to ``stock_ids[i]``. The dividend used for the dividend yield
+    (last dividend for common stocks, fixed dividend * par value for preferred ones) and the one
+    used for the P/E ratio are read from every stock once, under one registry lock acquisition, so
+    the rest of a bulk calculation is plain doubles whatever the number of prices per stock.
+    Missing dividends are NaN. It is a point in time copy, see StockRegistry.reference_data.
+    """
+    __slots__ = ('stock_ids', 'index', 'yield_dividends', 'pe_dividends')
+
+    def __init__(self, stocks):
+        stocks = list(stocks)
+        self.stock_ids = [stock.stockId for stock in stocks]
+        self.index = {stock_id: row for row, stock_id in enumerate(self.stock_ids)}
+        self.yield_dividends = array('d', (
+            _dividend(stock.lastDivident) if stock.stockType == StockType.COMMON.value
+            else _MISSING if stock.fixedDivident is None or stock.parValue is None
+            else float(stock.fixedDivident * stock.parValue)
+            for stock in stocks))
+        self.pe_dividends = array('d', (_dividend(stock.lastDivident) for stock in stocks))
+
+    def __len__(self):
+        return len(self.stock_ids)
@@ -1,28 +1,194 @@
 
+import logging
+import math
+from time import monotonic_ns
 from ssmts.data.store.base_registry import BaseRegistry
-import threading
+from ssmts.data.store.data_version import DataVersion
+from ssmts.data.store.stock_reference import StockReferenceData
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
 
 class StockRegistry(BaseRegistry):
     """
     Registry for managing stock entities.
+
+    The registry also maintains the GBCE All Share Index incrementally: it keeps the sum of the
+    log prices of all registered stocks, so a price change costs O(1) and the index (the geometric
+    mean of all prices) is exp(log_sum / count). Working in log space keeps it numerically stable
+    whatever the size of the universe. Prices of registered stocks are changed with
+    update_stock_price: a price set on a Stock directly is not seen by the index.
     """
     STORE_NAME = "STOCKS"
-    
+    INDEX_RESYNC_INTERVAL = 100_000  # recompute the log sum from scratch every N price changes
+
+    _log_sum = 0.0
+    _priced_count = 0  # stocks contributing to the log sum
+    _non_positive_count = 0  # stocks whose price can not be part of a geometric mean
+    _changes_since_resync = 0
+    _traces = {}  # stock id -> (trace id, send ns, price updated ns) of its price, until a response serves it
+
+    @classmethod
+    def _apply_price(cls, price, sign: int) -> None:
+        """
+        Add (sign=1) or remove (sign=-1) a price from the running index sums.
+        """
+        if price is None or price <= 0:
+            cls._non_positive_count += sign
+        else:
+            cls._log_sum += sign * math.log(price)
+            cls._priced_count += sign
+
+    @classmethod
+    def _rebuild_index(cls) -> None:
+        """
+        Recompute the running index sums from the registered stocks.
+        """
+        cls._log_sum = 0.0
+        cls._priced_count = 0
+        cls._non_positive_count = 0
+        cls._changes_since_resync = 0
+        for stock in cls._store.get(cls.STORE_NAME, {}).values():
+            cls._apply_price(stock.currentPrice, 1)
+
+    @classmethod
+    def _index_price_change(cls, old_price, new_price) -> None:
+        """
+        Move a registered stock's price in the running index sums. The caller holds the write lock.
+        """
+        cls._apply_price(old_price, -1)
+        cls._apply_price(new_price, 1)
+        DataVersion.bump()
+        cls._changes_since_resync += 1
+        if cls._changes_since_resync >= cls.INDEX_RESYNC_INTERVAL:
+            cls._rebuild_index()  # bound the floating point drift of the running sum
+
+    @classmethod
+    def add(cls, entityId: str, instance) -> None:
+        """
+        Add a stock to the registry and to the All Share Index.
+        """
+        with cls.lock().write:
+            previous = cls._store.get(cls.STORE_NAME, {}).get(entityId)
+            super().add(entityId, instance)
+            DataVersion.bump()
+            if previous is not None:
+                cls._apply_price(previous.currentPrice, -1)
+            cls._apply_price(instance.currentPrice, 1)
 
     @classmethod
-    def update_stock_price(cls, stock_id: str, price: float) -> None:
+    def add_many(cls, items) -> None:
+        """
+        Add (stock id, stock) pairs under one lock acquisition, with one data version bump.
+        """
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            store = cls._store[cls.STORE_NAME]
+            apply_price = cls._apply_price
+            for stock_id, stock in items:
+                previous = store.get(stock_id)
+                if previous is not None:
+                    apply_price(previous.currentPrice, -1)
+                apply_price(stock.currentPrice, 1)
+                store[stock_id] = stock
+            DataVersion.bump()
+
+    @classmethod
+    def unregister(cls, entityId: str) -> None:
+        """
+        Remove a stock from the registry and from the All Share Index.
+        """
+        with cls.lock().write:
+            stock = cls._store.get(cls.STORE_NAME, {}).get(entityId)
+            super().unregister(entityId)
+            DataVersion.bump()
+            cls._apply_price(stock.currentPrice, -1)
+
+    @classmethod
+    def register(cls) -> None:
+        with cls.lock().write:
+            super().register()
+            cls._traces = {}
+            DataVersion.bump()
+            cls._rebuild_index()
+
+    @classmethod
+    def UnregisterAll(cls) -> None:
+        with cls.lock().write:
+            super().UnregisterAll()
+            DataVersion.bump()
+            cls._rebuild_index()
+
+    @classmethod
+    def all_share_index(cls) -> float:
+        """
+        The GBCE All Share Index (geometric mean of all stock prices), in O(1).
+        """
+        with cls.lock().read:
+            log_sum, priced_count, non_positive_count = cls._log_sum, cls._priced_count, cls._non_positive_count
+        if priced_count + non_positive_count == 0:
+            raise ValueError("Price list cannot be empty.")
+        if non_positive_count:
+            raise ValueError("All prices must be positive.")
+        return math.exp(log_sum / priced_count)
+
+    @classmethod
+    def count(cls) -> int:
+        """
+        Number of registered stocks.
+        """
+        with cls.lock().read:
+            return len(cls._store.get(cls.STORE_NAME, {}))
+
+    @classmethod
+    def reference_data(cls, stock_ids=None) -> StockReferenceData:
+        """
+        Array backed reference data (ids and dividends) of these stocks, all registered stocks if
+        None. It is read from the stocks on every call, not cached: their attributes can be changed
+        in place. Ids that are not registered (or not strings) are left out.
+        """
+        with cls.lock().read:
+            store = cls._store.get(cls.STORE_NAME, {})
+            if stock_ids is None:
+                return StockReferenceData(store.values())
+            stock_ids = dict.fromkeys(stock_id for stock_id in stock_ids if isinstance(stock_id, str))
+            return StockReferenceData([store[stock_id] for stock_id in stock_ids if stock_id in store])
+
+    @classmethod
+    def update_stock_price(cls, stock_id: str, price: float, trace=None) -> None:
         """
         Update the stock price for a given stock ID.
-        
+
         :param stock_id: The ID of the stock.
         :param price: The new price of the stock.
+        :param trace: (trace id, send ns, ...) of a traced trade the price includes, kept until
+            take_traces (see ssmts.utility.tracing).
         """
-        with threading.Lock():
-            if stock_id in cls._store[cls.STORE_NAME]:
-                cls._store[cls.STORE_NAME][stock_id].currentPrice = price
-                cls._store[cls.STORE_NAME][stock_id].lastTradeTime = datetime.now()
-                print(f"Stock {stock_id} price updated to {price}.")
+        with cls.lock().write:
+            stock = cls._store[cls.STORE_NAME].get(stock_id)
+            if stock is not None:
+                old_price = stock.currentPrice
+                stock.currentPrice = price
+                cls._index_price_change(old_price, price)
+                stock.lastTradeTime = datetime.now()
+                if trace is not None:
+                    cls._traces[stock_id] = (trace[0], trace[1], monotonic_ns())
+                logger.debug("Stock %s price updated to %s.", stock_id, price)  # formatted only if enabled
             else:
-                print(f"Stock {stock_id} not found in registry.")
+                logger.warning(f"Stock {stock_id} not found in registry.")
+
+    @classmethod
+    def take_traces(cls, stock_ids=None) -> list:
+        """
+        Remove and return the pending price traces of these stocks (all stocks if None), for a
+        response about to serve their prices.
+        """
+        if not cls._traces:
+            return []
+        with cls.lock().write:
+            if stock_ids is None:
+                traces, cls._traces = list(cls._traces.values()), {}
+                return traces
+            traces = (cls._traces.pop(stock_id, None) for stock_id in stock_ids)
+            return [trace for trace in traces if trace is not None]
@@ -0,0 +1,427 @@
+"""
+Append-only, segmented binary journal of the trades accepted by the trade consumer.
+
+Each batch of trades is one frame, written with a single write() call (group commit) and made
+durable according to the fsync policy: after every frame ("always"), at most every
+fsync_interval seconds ("interval") or when the OS gets to it ("never"; a crash of the process
+loses nothing, a crash of the machine may).
+
+Frames are column oriented, so replaying them does not parse trade by trade:
+
+    header  <IIIII  body length, crc32, trade count, new stock ids length, trade ids length
+    body    new stock ids (NUL separated), then the columns of the batch:
+            timestamps ns array('q'), stock indexes array('I'), quantities array('I'),
+            prices array('d'), sides array('b'), trade ids
+
+The trade ids of a frame are an array('q') when they are all integers (see
+ssmts.utility.trade_utils), flagged by the high bit of their length, and NUL separated strings
+otherwise. Version 1 segments, whose ids are always strings, are still read.
+
+A segment starts with ``<4sBxxxQ`` (magic, version, sequence number of its first trade) and its
+own stock table: a frame lists the stock ids first seen in that segment, and the stock indexes
+refer to the segment's table, so every segment can be read on its own. A segment is closed once
+it grows beyond segment_bytes; files are named after the sequence number of their first trade.
+
+Recovery memory-maps every segment, checks each frame's crc and appends the columns to the trade
+store in bulk. A frame cut short by a crash ends the journal: the file is truncated there.
+Frames are streamed, not collected: the frames of a segment share its stock table, and on the way
+the last trades of each stock (for its snapshot) and the trades inside the VWSP window or the
+longest VWAP horizon are kept, so memory and time stay proportional to the trades and the stocks
+seen, not to frames times the stock universe.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque, namedtuple
+from datetime import datetime
+
+from ssmts.config.constants import (JOURNAL_FSYNC, JOURNAL_FSYNC_INTERVAL, JOURNAL_SEGMENT_BYTES, TRADE_SIDE_INDEX,
+                                    TRADE_SIDES, VWAP_HORIZONS, VWSP_WINDOW_SECONDS)
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.data.store.vwap_horizons import VwapHorizons
+from ssmts.data.store.vwsp_window import VwspWindow
+from ssmts.models.compact import CompactTrade
+from ssmts.models.trade_snapshot import TradeSnapShot
+from ssmts.utility.codec import to_epoch_ns
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAGIC = b"SSMJ"
+JOURNAL_VERSION = 2
+_READABLE_VERSIONS = (1, JOURNAL_VERSION)
+SEGMENT_SUFFIX = ".journal"
+FSYNC_POLICIES = ("always", "interval", "never")
+
+_SEGMENT_HEADER = struct.Struct("<4sBxxxQ")  # magic, version, sequence number of the first trade
+_FRAME_HEADER = struct.Struct("<IIIII")  # body length, crc32, trade count, new stock ids length, trade ids length
+_COUNTS = struct.Struct("<III")  # the part of the header covered by the crc
+_COLUMNS = (('q', 8), ('I', 4), ('I', 4), ('d', 8), ('b', 1))  # timestamps, stocks, quantities, prices, sides
+_RECORD_BYTES = sum(size for _, size in _COLUMNS)
+_SWAP = sys.byteorder != "little"  # columns are stored little endian
+_SEP = b"\x00"
+_INT_IDS = 0x80000000  # trade ids length flag: the ids are an array('q') column
+
+# stock_ids is the table of the frame's segment, shared by all its frames: later frames append to it,
+# so only the indexes in ``stocks`` are meaningful for a frame
+JournalFrame = namedtuple("JournalFrame", "stock_ids trade_ids timestamps stocks quantities prices sides")
+
+
+def _column(typecode: str, data) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if _SWAP:
+        column.byteswap()
+    return column
+
+
+def _column_bytes(column: array) -> bytes:
+    if _SWAP:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _encode_trade_ids(trade_ids: list) -> tuple[bytes, int]:
+    """
+    The trade ids column of a frame and its length flag.
+    """
+    if all(type(trade_id) is int for trade_id in trade_ids):
+        try:
+            return _column_bytes(array('q', trade_ids)), _INT_IDS
+        except OverflowError:
+            pass  # beyond 64 bits: stored as strings
+    blob = _SEP.join(str(trade_id).encode("utf-8") for trade_id in trade_ids)
+    if blob.count(_SEP) != len(trade_ids) - 1:
+        raise ValueError("Trade and stock ids must not contain NUL characters.")
+    return blob, 0
+
+
+def _encode_frame(trades: list, table: dict) -> bytes:
+    """
+    Encode a batch of trades as a frame; stocks missing from ``table`` (stock id -> index) are added to it.
+    """
+    new_stocks = []
+    stocks = array('I')
+    for trade in trades:
+        idx = table.get(trade.stockId)
+        if idx is None:
+            idx = table[trade.stockId] = len(table)
+            new_stocks.append(trade.stockId)
+        stocks.append(idx)
+    new_stocks_blob = _SEP.join(stock_id.encode("utf-8") for stock_id in new_stocks)
+    if new_stocks_blob.count(_SEP) != max(len(new_stocks) - 1, 0):
+        raise ValueError("Trade and stock ids must not contain NUL characters.")
+    trade_ids_blob, ids_flag = _encode_trade_ids([trade.tradeId for trade in trades])
+    body = b"".join((
+        new_stocks_blob,
+        _column_bytes(array('q', [to_epoch_ns(trade.timeStamp) for trade in trades])),
+        _column_bytes(stocks),
+        _column_bytes(array('I', [trade.quantity for trade in trades])),
+        _column_bytes(array('d', [trade.price for trade in trades])),
+        _column_bytes(array('b', [TRADE_SIDE_INDEX[trade.indicator] for trade in trades])),
+        trade_ids_blob,
+    ))
+    counts = _COUNTS.pack(len(trades), len(new_stocks_blob), len(trade_ids_blob) | ids_flag)
+    return _FRAME_HEADER.pack(len(body), zlib.crc32(body, zlib.crc32(counts)), *_COUNTS.unpack(counts)) + body
+
+
+def encode_segment(trades: list, sequence: int = 0) -> bytes:
+    """
+    A complete segment holding the trades as one frame, e.g. to be stored elsewhere than in a journal
+    directory (see trade_spill).
+    """
+    return _SEGMENT_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, sequence) + _encode_frame(trades, {})
+
+
+def decode_segment(data: bytes) -> list[JournalFrame]:
+    """
+    The frames of a segment built by encode_segment (or read from a journal file).
+
+    :raises ValueError: When the data is not an intact segment.
+    """
+    magic, version, _ = _SEGMENT_HEADER.unpack_from(data, 0) if len(data) >= _SEGMENT_HEADER.size else (None, None, 0)
+    if magic != JOURNAL_MAGIC or version not in _READABLE_VERSIONS:
+        raise ValueError(f"Not a trade journal segment (version 1 or {JOURNAL_VERSION}).")
+    reader = TradeJournal._read_segment(data, len(data))
+    frames = []
+    while True:
+        try:
+            frames.append(next(reader))
+        except StopIteration as stop:
+            if stop.value != len(data):
+                raise ValueError(f"Torn or corrupt frame at byte {stop.value} of the segment.")
+            return frames
+
+
+class TradeJournal:
+    """
+    Write-ahead journal of accepted trades, replayed on startup to rebuild the registries.
+    """
+    def __init__(self, directory: str, fsync: str = JOURNAL_FSYNC, fsync_interval: float = JOURNAL_FSYNC_INTERVAL,
+                 segment_bytes: int = JOURNAL_SEGMENT_BYTES):
+        """
+        :param directory: Directory holding the segment files, created if missing.
+        :param fsync: "always", "interval" or "never", see the module docstring.
+        :param fsync_interval: Seconds between two fsyncs with the "interval" policy.
+        :param segment_bytes: Size beyond which a segment is closed and a new one started.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Available: {', '.join(FSYNC_POLICIES)}.")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.sequence = 0  # trades journaled so far, including the recovered ones
+        self.fd = None
+        self.segment_size = 0
+        self.stock_table = {}  # stock id -> index in the current segment
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+        self.stats = {"frames": 0, "trades": 0, "bytes": 0, "fsyncs": 0, "segments": 0}
+
+    def segments(self) -> list[str]:
+        """
+        Paths of the segment files, oldest first.
+        """
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open_segment(self) -> None:
+        path = os.path.join(self.directory, f"{self.sequence:020d}{SEGMENT_SUFFIX}")
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        header = _SEGMENT_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self.sequence)
+        os.write(self.fd, header)
+        self.segment_size = len(header)
+        self.stock_table = {}
+        self.stats["segments"] += 1
+
+    def _close_segment(self) -> None:
+        if self.fd is None:
+            return
+        if self.fsync != "never" and self.unsynced:
+            os.fsync(self.fd)
+            self.stats["fsyncs"] += 1
+        os.close(self.fd)
+        self.fd = None
+        self.unsynced = False
+
+    def encode_frame(self, trades: list) -> bytes:
+        """
+        Encode a batch of trades as a frame, adding new stocks to the current segment's table.
+        """
+        return _encode_frame(trades, self.stock_table)
+
+    def append(self, trades: list) -> None:
+        """
+        Journal a batch of accepted trades as one frame.
+        """
+        if not trades:
+            return
+        if self.fd is None:
+            self._open_segment()
+        table_size = len(self.stock_table)
+        try:
+            frame = self.encode_frame(trades)
+        except Exception:
+            for stock_id in list(self.stock_table)[table_size:]:
+                del self.stock_table[stock_id]  # nothing was written, forget the stocks it added
+            raise
+        os.write(self.fd, frame)
+        self.segment_size += len(frame)
+        self.sequence += len(trades)
+        self.unsynced = True
+        self.stats["frames"] += 1
+        self.stats["trades"] += len(trades)
+        self.stats["bytes"] += len(frame)
+        if self.fsync == "always":
+            self.sync()
+        elif self.fsync == "interval":
+            self.maybe_sync()
+        if self.segment_size >= self.segment_bytes:
+            self._close_segment()  # the next append starts a new segment
+
+    def sync(self) -> None:
+        """
+        Make everything journaled so far durable.
+        """
+        if self.fd is not None and self.unsynced:
+            os.fsync(self.fd)
+            self.stats["fsyncs"] += 1
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+    def maybe_sync(self) -> None:
+        """
+        fsync if the "interval" policy is due; call it while idle too, so the last trades of a burst
+        do not wait for the next one.
+        """
+        if self.unsynced and self.fsync == "interval" and time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def close(self) -> None:
+        self._close_segment()
+
+    def read_frames(self, truncate: bool = True):
+        """
+        Replay the journal: yield every intact frame, oldest first, as a JournalFrame.
+
+        :param truncate: Cut a torn or corrupt frame (and anything after it) off the segment it
+            was found in, and set any later segment aside (renamed to *.corrupt). Without it, the
+            journal stops at that frame but the files are left alone.
+        """
+        segments = self.segments()
+        for number, path in enumerate(segments):
+            with open(path, "r+b" if truncate else "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size < _SEGMENT_HEADER.size:
+                    logger.warning(f"Journal segment {path} has no header, skipping it.")
+                    continue
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    magic, version, _ = _SEGMENT_HEADER.unpack_from(view, 0)
+                    if magic != JOURNAL_MAGIC or version not in _READABLE_VERSIONS:
+                        raise ValueError(f"{path} is not a trade journal segment (version 1 or {JOURNAL_VERSION}).")
+                    end = yield from self._read_segment(view, size)
+                if end < size:
+                    logger.warning(f"Journal segment {path}: torn or corrupt frame at byte {end}, "
+                                   f"{size - end} bytes dropped.")
+                    if truncate:
+                        file.truncate(end)
+                        for later in segments[number + 1:]:
+                            os.rename(later, later + ".corrupt")
+                    return
+
+    @staticmethod
+    def _read_segment(view, size: int):
+        """
+        Yield the intact frames of one segment; returns the offset after the last one.
+        """
+        stock_ids = []
+        offset = _SEGMENT_HEADER.size
+        data = memoryview(view)
+        try:
+            while offset + _FRAME_HEADER.size <= size:
+                body_length, crc, count, stocks_length, ids_length = _FRAME_HEADER.unpack_from(view, offset)
+                start = offset + _FRAME_HEADER.size
+                end = start + body_length
+                if end > size or body_length != stocks_length + count * _RECORD_BYTES + (ids_length & ~_INT_IDS):
+                    break
+                body = data[start:end]
+                if zlib.crc32(body, zlib.crc32(_COUNTS.pack(count, stocks_length, ids_length))) != crc:
+                    break
+                if stocks_length:
+                    stock_ids.extend(bytes(body[:stocks_length]).decode("utf-8").split("\x00"))
+                columns = []
+                position = stocks_length
+                for typecode, item_size in _COLUMNS:
+                    columns.append(_column(typecode, body[position:position + count * item_size]))
+                    position += count * item_size
+                if ids_length & _INT_IDS:
+                    trade_ids = _column('q', body[position:]).tolist()
+                else:
+                    trade_ids = bytes(body[position:]).decode("utf-8").split("\x00")
+                yield JournalFrame(stock_ids, trade_ids, *columns)
+                offset = end
+            return offset
+        finally:
+            data.release()
+
+    def recover(self, trade_store) -> dict:
+        """
+        Rebuild the trade store, the snapshots, VWSP windows and VWAP horizons from the journal, and continue
+        journaling after the recovered trades (in a new segment).
+
+        :param trade_store: TradeRegistry or ColumnarTradeRegistry, receiving every journaled trade.
+        :return: Recovery stats: trades, stocks, seconds, trades_per_sec.
+        """
+        started = time.perf_counter()
+        trades = 0
+        restorer = _SnapshotRestorer()
+        for frame in self.read_frames():
+            trade_store.add_columns(frame.trade_ids, frame.stock_ids, frame.timestamps, frame.stocks,
+                                    frame.quantities, frame.prices, frame.sides)
+            restorer.add(frame)
+            trades += len(frame.trade_ids)
+        self.sequence = trades
+        stocks = restorer.restore()
+        seconds = time.perf_counter() - started
+        stats = {"trades": trades, "stocks": stocks, "seconds": seconds,
+                 "trades_per_sec": trades / seconds if seconds else 0.0}
+        logger.info(f"Recovered {trades} trades of {stocks} stocks from {self.directory} in {seconds:.3f}s.")
+        return stats
+
+
+class _SnapshotRestorer:
+    """
+    Collects, from the journal frames streamed oldest first, what the snapshot registry is rebuilt
+    from: each stock's last MAX_LENGTH trades and its trades inside the VWSP window or the longest
+    VWAP horizon.
+    """
+    def __init__(self):
+        self.cutoff_ns = int((time.time() - max(VWSP_WINDOW_SECONDS, *VWAP_HORIZONS)) * 1_000_000_000)
+        self.tails = {}  # stock id -> its newest trades (as column tuples), oldest first
+        self.windows = {}  # stock id -> (epoch seconds, notional, quantity) inside the window or horizons, oldest first
+        self.table = None  # stock table of the current segment ...
+        self.tail_of = {}  # ... and its stock indexes -> tail / window appenders, filled as they are used
+        self.append_to = {}
+
+    def add(self, frame: JournalFrame) -> None:
+        stock_ids = frame.stock_ids
+        if stock_ids is not self.table:  # a new segment, with its own stock indexes
+            self.table = stock_ids
+            self.tail_of = {}
+            self.append_to = {}
+        tails, tail_of = self.tails, self.tail_of
+        appender = tail_of.get
+        for row in zip(frame.trade_ids, frame.timestamps, frame.stocks, frame.quantities, frame.prices, frame.sides):
+            append = appender(row[2])
+            if append is None:
+                stock_id = stock_ids[row[2]]
+                tail = tails.get(stock_id)
+                if tail is None:
+                    tail = tails[stock_id] = deque(maxlen=TradeSnapShot.MAX_LENGTH)
+                append = tail_of[row[2]] = tail.append
+            append(row)
+
+        cutoff_ns = self.cutoff_ns
+        if not frame.trade_ids or max(frame.timestamps) <= cutoff_ns:
+            return
+        rows = zip(frame.stocks, frame.timestamps, frame.prices, frame.quantities)
+        if min(frame.timestamps) <= cutoff_ns:
+            rows = [row for row in rows if row[1] > cutoff_ns]  # the frame straddles the window start
+        append_to, windows = self.append_to, self.windows
+        for stock, timestamp, price, quantity in rows:
+            append = append_to.get(stock)
+            if append is None:
+                append = append_to[stock] = windows.setdefault(stock_ids[stock], []).append
+            append((timestamp * 1e-9, price * quantity, quantity))
+
+    def restore(self) -> int:
+        """
+        Restore the snapshot, VWSP window and VWAP horizons of every stock seen.
+
+        :return: The number of stocks restored.
+        """
+        TradeSnapShotRegistry.restore_many(self._restored(datetime.now()))
+        return len(self.tails)
+
+    def _restored(self, now: datetime):
+        windows = self.windows
+        for stock_id, tail in self.tails.items():
+            trades = [CompactTrade(trade_id, stock_id, timestamp, quantity, price, TRADE_SIDES[side])
+                      for trade_id, timestamp, _, quantity, price, side in tail]
+            entries = windows.get(stock_id, ())
+            window = VwspWindow()
+            window.extend(entries)  # expires the entries older than the window
+            horizons = None
+            if entries:
+                horizons = VwapHorizons()
+                for entry in entries:
+                    horizons.add_notional(*entry)
+            yield stock_id, TradeSnapShot(stock_id, now, trades), window, horizons
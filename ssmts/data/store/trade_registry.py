@@ -1,11 +1,255 @@
+import sys
+import time
+from collections import deque
 
-
+from ssmts.config.constants import (TRADE_RETENTION_BYTES, TRADE_RETENTION_COUNT, TRADE_RETENTION_SECONDS,
+                                    TRADE_SIDES, TRADE_SPILL_DIR, TRADE_SPILL_SEGMENT_TRADES)
 from ssmts.data.store.base_registry import BaseRegistry
+from ssmts.data.store.trade_spill import TradeSpill
+from ssmts.models.compact import CompactTrade
+from ssmts.utility.codec import to_epoch_ns
+
+# estimated bytes of a stored trade beyond the trade object and its id: the timestamp, price and
+# quantity objects, the store's dict entry and the retention queue entry
+_ENTRY_BYTES = 220
+# once past a limit, evict down to this fraction below it, so evictions (and spills) come in batches
+EVICTION_SLACK = 0.01
 
 
 class TradeRegistry(BaseRegistry):
     """
     Registry for managing trade entities.
+
+    With a retention limit set (see configure_retention) the registry keeps its trades in the
+    order they were stored and evicts the oldest ones past the limit: trades older than max_age
+    seconds (by trade timestamp), beyond max_trades, or beyond max_bytes of estimated memory.
+    Evicted trades are dropped, or spilled to compressed segments on disk when a spill directory
+    is set, where get() still finds them.
     """
     STORE_NAME = "TRADES"
-    # The STORE_NAME is used to identify the registry in the BaseRegistry class.
\ No newline at end of file
+    # The STORE_NAME is used to identify the registry in the BaseRegistry class.
+
+    max_age = TRADE_RETENTION_SECONDS  # 0 is no limit
+    max_trades = TRADE_RETENTION_COUNT
+    max_bytes = TRADE_RETENTION_BYTES
+    spill_dir = TRADE_SPILL_DIR
+    spill_segment_trades = TRADE_SPILL_SEGMENT_TRADES
+    _spill: TradeSpill = None  # created on first eviction, when spill_dir is set
+    _order = deque()  # (timestamp ns, trade id, trade, bytes) in the order trades were stored, while a limit is set
+    _bytes = 0  # estimated bytes of the trades in _order, or of every stored trade while no limit is set
+    _evicted = 0
+    _base_bytes = {}  # trade class -> estimated bytes of an instance, without its id
+
+    @classmethod
+    def configure_retention(cls, max_age: float = 0, max_trades: int = 0, max_bytes: int = 0, spill_dir: str = None,
+                            spill_segment_trades: int = TRADE_SPILL_SEGMENT_TRADES) -> None:
+        """
+        Set the retention limits (0 is no limit) and where evicted trades are spilled (None drops
+        them). The trades already stored are subject to the new limits from the next add.
+        """
+        with cls.lock().write:
+            cls.max_age, cls.max_trades, cls.max_bytes = max_age, max_trades, max_bytes
+            if cls._spill is not None:
+                cls._spill.clear()
+                cls._spill = None
+            cls.spill_dir = spill_dir
+            cls.spill_segment_trades = spill_segment_trades
+            cls._order = deque()
+            cls._bytes = 0
+            if cls._limited():
+                for trade_id, trade in cls._store.get(cls.STORE_NAME, {}).items():
+                    cls._track(trade_id, trade, to_epoch_ns(trade.timeStamp) if max_age else 0)
+            else:
+                cls._bytes = sum(map(cls._trade_bytes, cls._store.get(cls.STORE_NAME, {}).values()))
+
+    @classmethod
+    def _limited(cls) -> bool:
+        return bool(cls.max_age or cls.max_trades or cls.max_bytes)
+
+    @classmethod
+    def register(cls) -> None:
+        """
+        Create (or reset) the store, emptying the spill too.
+        """
+        with cls.lock().write:
+            cls._store[cls.STORE_NAME] = {}
+            cls._order = deque()
+            cls._bytes = 0
+            cls._evicted = 0
+            if cls._spill is not None:
+                cls._spill.clear()
+
+    @classmethod
+    def add(cls, entityId: str, instance) -> None:
+        """
+        Add a trade, then evict what is past the retention limits.
+        """
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            store = cls._store[cls.STORE_NAME]
+            if cls.max_age or cls.max_trades or cls.max_bytes:
+                store[entityId] = instance
+                cls._track(entityId, instance, to_epoch_ns(instance.timeStamp) if cls.max_age else 0)
+                cls._enforce(store)
+            else:
+                cls._store_unlimited(store, ((entityId, instance),))
+
+    @classmethod
+    def add_many(cls, items) -> None:
+        """
+        Add (trade id, trade) pairs under one lock acquisition, then evict what is past the retention limits.
+        """
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            store = cls._store[cls.STORE_NAME]
+            if not cls._limited():
+                cls._store_unlimited(store, items)
+                return
+            for entityId, instance in items:
+                store[entityId] = instance
+                cls._track(entityId, instance, to_epoch_ns(instance.timeStamp) if cls.max_age else 0)
+            cls._enforce(store)
+
+    @classmethod
+    def add_columns(cls, trade_ids, stock_ids, timestamps, stocks, quantities, prices, sides) -> None:
+        """
+        Add trades given as columns (e.g. replayed from the trade journal) under one lock acquisition.
+        The trades were validated when they were first accepted, and become CompactTrades with
+        lazily converted timestamps.
+
+        :param stock_ids: Stock ids the values of ``stocks`` index into.
+        :param timestamps: Epoch nanoseconds.
+        :param sides: Side codes, see TRADE_SIDES.
+        """
+        trades = {trade_id: CompactTrade(trade_id, stock_ids[stock], timestamp, quantity, price, TRADE_SIDES[side])
+                  for trade_id, timestamp, stock, quantity, price, side
+                  in zip(trade_ids, timestamps, stocks, quantities, prices, sides)}
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            store = cls._store[cls.STORE_NAME]
+            if not cls._limited():
+                cls._store_unlimited(store, trades.items())
+            else:
+                store.update(trades)
+                for trade_id, timestamp in zip(trade_ids, timestamps):
+                    cls._track(trade_id, trades[trade_id], timestamp)
+                cls._enforce(store)
+
+    @classmethod
+    def _trade_bytes(cls, trade) -> int:
+        base = cls._base_bytes.get(type(trade))
+        if base is None:
+            attributes = sys.getsizeof(vars(trade)) if hasattr(trade, "__dict__") else 0
+            base = cls._base_bytes[type(trade)] = sys.getsizeof(trade) + attributes + _ENTRY_BYTES
+        return base + sys.getsizeof(trade.tradeId)
+
+    @classmethod
+    def _store_unlimited(cls, store: dict, items) -> None:
+        """
+        Store (trade id, trade) pairs while no limit is set, keeping the running byte estimate.
+        """
+        trade_bytes = cls._trade_bytes
+        added = 0
+        for trade_id, trade in items:
+            previous = store.get(trade_id)
+            if previous is not None:
+                added -= trade_bytes(previous)
+            store[trade_id] = trade
+            added += trade_bytes(trade)
+        cls._bytes += added
+
+    @classmethod
+    def _track(cls, trade_id, trade, timestamp: int) -> None:
+        size = cls._trade_bytes(trade)
+        cls._order.append((timestamp, trade_id, trade, size))
+        cls._bytes += size
+
+    @classmethod
+    def _enforce(cls, store: dict) -> None:
+        """
+        Once a limit is exceeded, evict the oldest trades until the store is EVICTION_SLACK within
+        its limits. Queue entries of trades that were overwritten or unregistered since are
+        discarded on the way.
+        """
+        order = cls._order
+        if not order:
+            return
+        max_trades, max_bytes, max_age = cls.max_trades, cls.max_bytes, cls.max_age
+        now = time.time_ns() if max_age else 0
+        if not ((max_trades and len(store) > max_trades) or (max_bytes and cls._bytes > max_bytes)
+                or (max_age and order[0][0] < now - int(max_age * (1 + EVICTION_SLACK) * 1e9))):
+            return
+        max_trades -= int(max_trades * EVICTION_SLACK)
+        max_bytes -= int(max_bytes * EVICTION_SLACK)
+        cutoff = now - int(max_age * 1e9) if max_age else None
+        evicted = []
+        while order and ((max_trades and len(store) > max_trades) or (max_bytes and cls._bytes > max_bytes)
+                         or (cutoff is not None and order[0][0] < cutoff)):
+            _, trade_id, trade, size = order.popleft()
+            cls._bytes -= size
+            if store.get(trade_id) is trade:
+                del store[trade_id]
+                evicted.append(trade)
+        if evicted:
+            cls._evicted += len(evicted)
+            if cls.spill_dir:
+                if cls._spill is None:
+                    cls._spill = TradeSpill(cls.spill_dir, cls.spill_segment_trades)
+                cls._spill.add(evicted)
+
+    @classmethod
+    def get(cls, entityId: str):
+        """
+        Retrieve a trade by its ID, from memory or else from the spill.
+        """
+        with cls.lock().read:
+            trade = cls._store.get(cls.STORE_NAME, {}).get(entityId)
+            spill = cls._spill
+        if trade is None and spill is not None:
+            trade = spill.get(entityId)
+        if trade is None:
+            raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
+        return trade
+
+    @classmethod
+    def unregister(cls, entityId: str) -> None:
+        """
+        Unregister a trade held in memory.
+        """
+        with cls.lock().write:
+            store = cls._store.get(cls.STORE_NAME, {})
+            if entityId not in store:
+                raise ValueError(f"Entity ID {entityId} does not exist in {cls.STORE_NAME}.")
+            trade = store.pop(entityId)
+            if not cls._limited():
+                cls._bytes -= cls._trade_bytes(trade)  # a limited store discards its queue entry when evicting
+
+    @classmethod
+    def UnregisterAll(cls) -> None:
+        """
+        Unregister all trades held in memory.
+        """
+        super().UnregisterAll()
+        with cls.lock().write:
+            cls._order = deque()
+            cls._bytes = 0
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Memory and eviction counters: trades and estimated bytes in memory, trades evicted, and
+        trades spilled, with the segments, disk bytes and memory of the spill.
+        """
+        with cls.lock().read:
+            store = cls._store.get(cls.STORE_NAME, {})
+            stats = {"trades": len(store), "bytes": cls._bytes, "evicted": cls._evicted}
+            spill = cls._spill
+        if spill is not None:
+            stats.update(spilled=len(spill), spill_segments=spill.stats["segments"],
+                         spill_disk_bytes=spill.stats["bytes"], spill_index_bytes=spill.memory_usage())
+        else:
+            stats.update(spilled=0, spill_segments=0, spill_disk_bytes=0, spill_index_bytes=0)
+        return stats
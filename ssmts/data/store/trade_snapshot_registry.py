@@ -1,10 +1,12 @@
 
+from ssmts.config.constants import VWAP_HORIZONS
 from ssmts.data.store.base_registry import BaseRegistry
+from ssmts.data.store.data_version import DataVersion
+from ssmts.data.store.vwap_horizons import VwapHorizons, horizon_label
+from ssmts.data.store.vwsp_window import VwspWindow
 from ssmts.models.trade import Trade
 from ssmts.models.trade_snapshot import TradeSnapShot
-import threading
 from datetime import datetime
-from collections import deque
  
 
 class TradeSnapShotRegistry(BaseRegistry[TradeSnapShot]):
@@ -13,24 +15,176 @@ class TradeSnapShotRegistry(BaseRegistry[TradeSnapShot]):
     """
 
     STORE_NAME = "TRADE_SNAPSHOTS"
-    _updated_snapshots = deque(maxlen=15)  # deque to keep track of latest snapshots
+    _updated_snapshots: dict[str, None] = {}  # dirty set (insertion ordered) of stocks updated since the last drain
+    _windows: dict[str, VwspWindow] = {}  # time windowed VWSP aggregator per stock
+    _horizons: dict[str, VwapHorizons] = {}  # multi-horizon VWAP aggregator per stock
+    _HORIZON_LABELS = tuple(horizon_label(horizon) for horizon in VWAP_HORIZONS)
+
+    @classmethod
+    def register(cls) -> None:
+        """
+        Start with an empty store, dropping every stock's VWSP window, VWAP horizons and dirty flag.
+        """
+        with cls.lock().write:
+            super().register()
+            cls._windows.clear()
+            cls._horizons.clear()
+            cls._updated_snapshots.clear()
+            DataVersion.bump()
+
+    @classmethod
+    def UnregisterAll(cls) -> None:
+        with cls.lock().write:
+            super().UnregisterAll()
+            cls._windows.clear()
+            cls._horizons.clear()
+            cls._updated_snapshots.clear()
+            DataVersion.bump()
+
+    @classmethod
+    def unregister(cls, entityId: str) -> None:
+        with cls.lock().write:
+            super().unregister(entityId)
+            cls._windows.pop(entityId, None)
+            cls._horizons.pop(entityId, None)
+            cls._updated_snapshots.pop(entityId, None)
+            DataVersion.bump()
+
+    @classmethod
+    def _window(cls, entityId: str) -> VwspWindow:
+        window = cls._windows.get(entityId)
+        if window is None:
+            window = cls._windows[entityId] = VwspWindow()
+        return window
+
+    @classmethod
+    def _aggregate(cls, entityId: str, trades) -> None:
+        """
+        Feed trades into the stock's VWSP window and VWAP horizons.
+        """
+        window = cls._window(entityId)
+        horizons = cls._horizons.get(entityId)
+        if horizons is None:
+            horizons = cls._horizons[entityId] = VwapHorizons()
+        for trade in trades:
+            window.add_trade(trade)
+        horizons.add_trades(trades)
+
+    @classmethod
+    def add(cls, entityId: str, instance: TradeSnapShot) -> None:
+        """
+        Add (or replace) a snapshot, feeding the trades not seen yet into the VWSP window and
+        VWAP horizons.
+        """
+        with cls.lock().write:
+            super().add(entityId, instance)
+            last_timestamp = cls._window(entityId).last_timestamp
+            cls._aggregate(entityId, [trade for trade in instance.trades
+                                      if last_timestamp is None or trade.timeStamp.timestamp() > last_timestamp])
+            DataVersion.bump()
+
+    @classmethod
+    def add_many(cls, items) -> None:
+        """
+        Add (stock id, snapshot) pairs under one lock acquisition, each as add() does.
+        """
+        with cls.lock().write:
+            for entityId, instance in items:
+                cls.add(entityId, instance)
+
+    @classmethod
+    def restore(cls, entityId: str, snapshot: TradeSnapShot, window: VwspWindow,
+                horizons: VwapHorizons = None) -> None:
+        """
+        Put back a stock's snapshot, VWSP window and VWAP horizons as they were rebuilt from the
+        trade journal. The stock is marked updated, so its snapshot gets published. Without trades
+        inside any horizon (horizons None), the horizons are only created by the stock's next trade:
+        each holds rings as long as the longest horizon, too much to keep for every idle stock.
+        """
+        cls.restore_many([(entityId, snapshot, window, horizons)])
+
+    @classmethod
+    def restore_many(cls, items) -> None:
+        """
+        restore() (stock id, snapshot, window, horizons) tuples under one lock acquisition.
+        """
+        with cls.lock().write:
+            if cls.STORE_NAME not in cls._store:
+                cls.register()
+            store, windows, all_horizons, updated = cls._store[cls.STORE_NAME], cls._windows, cls._horizons, cls._updated_snapshots
+            for entityId, snapshot, window, horizons in items:
+                store[entityId] = snapshot
+                windows[entityId] = window
+                if horizons is not None:
+                    all_horizons[entityId] = horizons
+                else:
+                    all_horizons.pop(entityId, None)
+                updated[entityId] = None
+            DataVersion.bump()
+
+    @classmethod
+    def get_vwsp(cls, entityId: str) -> float:
+        """
+        Volume Weighted Stock Price of a stock over the configured time window, in O(1).
+        Reads share the registry's read lock; the window's own lock covers evicting expired trades.
+        """
+        with cls.lock().read:
+            window = cls._windows.get(entityId)
+            if window is None:
+                raise ValueError(f"No trades found for stock ID {entityId}.")
+            with window.lock:
+                return window.vwsp()
+
+    @classmethod
+    def get_vwsp_many(cls, entityIds: list[str]) -> list:
+        """
+        VWSP of many stocks under a single lock acquisition; None for stocks without trades.
+        """
+        with cls.lock().read:
+            windows = cls._windows
+            vwsps = []
+            for entityId in entityIds:
+                window = windows.get(entityId)
+                if window is None:
+                    vwsps.append(None)
+                    continue
+                with window.lock:
+                    window.expire()
+                    vwsps.append(window.notional / window.volume if window.volume else None)
+            return vwsps
+
+    @classmethod
+    def get_vwap_horizons_many(cls, entityIds: list[str]) -> list:
+        """
+        VWAP over every horizon (label -> VWAP, see VwapHorizons.vwaps) of many stocks under a
+        single lock acquisition, O(1) per stock; None for stocks without trades.
+        """
+        with cls.lock().read:  # reading the horizons does not move them forward
+            horizons = cls._horizons
+            snapshots = cls._store.get(cls.STORE_NAME, {})
+            return [horizons[entityId].vwaps() if entityId in horizons
+                    else dict.fromkeys(cls._HORIZON_LABELS) if entityId in snapshots else None  # restored, idle
+                    for entityId in entityIds]
 
     @classmethod
     def add_trades(cls, key, trades):
         """
         Adds a trade snapshot to the SNAPSHOTS list.
         """
-        with threading.Lock():
+        with cls.lock().write:
             if not isinstance(trades, list):
                 raise TypeError("Trades must be a list of Trade instances.")
             cls._store[cls.STORE_NAME].update({key: TradeSnapShot(key, datetime.now(), trades)})
+            cls._aggregate(key, trades)
+            cls._updated_snapshots[key] = None
+            DataVersion.bump()
 
     @classmethod
     def update_trade(cls, entityId: str, trade: Trade) -> None:
         """
         Update an instance in the registry.
         """
-        with threading.Lock():
+        with cls.lock().write:
             if not isinstance(trade, Trade):
                 raise TypeError("Trade must be an instance of Trade.")
             if entityId not in cls._store[cls.STORE_NAME]:
@@ -42,4 +196,31 @@ class TradeSnapShotRegistry(BaseRegistry[TradeSnapShot]):
                 tradeSnapShot = cls._store[cls.STORE_NAME][entityId]
                 tradeSnapShot.add_trade(trade)  # Assuming trades is a Trade instance
                 tradeSnapShot.snapshot_time = datetime.now()
-                cls._updated_snapshots.append(entityId)
\ No newline at end of file
+                cls._aggregate(entityId, (trade,))
+                cls._updated_snapshots[entityId] = None
+                DataVersion.bump()
+
+    @classmethod
+    def update_trades(cls, entityId: str, trades: list[Trade]) -> None:
+        """
+        Apply a batch of trades for one stock in a single registry update.
+        """
+        with cls.lock().write:
+            if entityId not in cls._store[cls.STORE_NAME]:
+                cls.add_trades(entityId, trades)
+            else:
+                tradeSnapShot = cls._store[cls.STORE_NAME][entityId]
+                tradeSnapShot.add_trades(trades)
+                cls._aggregate(entityId, trades)
+                cls._updated_snapshots[entityId] = None
+                DataVersion.bump()
+
+    @classmethod
+    def drain_updated(cls) -> list[str]:
+        """
+        Return the stocks updated since the previous call, oldest first, and clear the dirty set.
+        """
+        with cls.lock().write:
+            updated = list(cls._updated_snapshots)
+            cls._updated_snapshots.clear()
+            return updated
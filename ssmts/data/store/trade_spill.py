@@ -0,0 +1,154 @@
+"""
+Compressed on-disk segments of the trades evicted from the trade store, still readable by id.
+
+Evicted trades are buffered until segment_trades of them are pending, then written as one
+zlib-compressed trade journal segment (see trade_journal.encode_segment) named
+``{number:08d}.spill``. Only a sorted array of 31 bit trade id hashes (4 bytes per trade) stays in
+memory per segment: a lookup checks the pending trades, then bisects the arrays of the segments,
+newest first, and decompresses a segment only when its array holds the id's hash. The last
+segment decompressed is kept, so lookups of neighbouring trades are served from memory.
+
+Id hashes do not depend on the process (crc32 of string ids, like the shard router, rather than
+the salted hash()), but the hash arrays only live in the memory of the process that wrote the
+segments: the spill is scratch space, emptied when it is opened. The trade journal is the durable
+record of the trades.
+"""
+
+import logging
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from ssmts.config.constants import TRADE_SIDES, TRADE_SPILL_SEGMENT_TRADES
+from ssmts.data.store.trade_journal import decode_segment, encode_segment
+from ssmts.models.compact import CompactTrade
+
+logger = logging.getLogger(__name__)
+
+SPILL_SUFFIX = ".spill"
+COMPRESSION_LEVEL = 1  # fast: spilling runs on the consumer thread
+_HASH_MASK = 0x7FFFFFFF
+
+SpillSegment = namedtuple("SpillSegment", "path hashes trades bytes")
+
+
+def _id_hash(trade_id) -> int:
+    if type(trade_id) is int:
+        return trade_id & _HASH_MASK  # the low bits of a snowflake id: sequence, node and milliseconds
+    return zlib.crc32(str(trade_id).encode("utf-8")) & _HASH_MASK
+
+
+class TradeSpill:
+    """
+    Write-once store of evicted trades, in compressed segments.
+    """
+    def __init__(self, directory: str, segment_trades: int = TRADE_SPILL_SEGMENT_TRADES):
+        """
+        :param directory: Directory of the segment files, created if missing; segments left
+            there by an earlier process are deleted.
+        :param segment_trades: Trades per segment; pending trades are kept in memory until then.
+        """
+        self.directory = directory
+        self.segment_trades = segment_trades
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.pending = {}  # trade id -> trade, not written yet
+        self.segments = []  # SpillSegment, oldest first
+        self._decoded = (None, None)  # (path, {trade id: (frame, row)}) of the last segment read
+        self.stats = {"spilled": 0, "segments": 0, "bytes": 0, "lookups": 0, "hits": 0, "segment_reads": 0}
+        self.clear()
+
+    def __len__(self) -> int:
+        return self.stats["spilled"]
+
+    def add(self, trades: list) -> None:
+        """
+        Spill evicted trades; a segment is written once segment_trades are pending.
+        """
+        with self._lock:
+            self.pending.update((trade.tradeId, trade) for trade in trades)
+            self.stats["spilled"] += len(trades)
+            if len(self.pending) >= self.segment_trades:
+                self._write_segment()
+
+    def flush(self) -> None:
+        """
+        Write the pending trades to a segment, however few they are.
+        """
+        with self._lock:
+            if self.pending:
+                self._write_segment()
+
+    def _write_segment(self) -> None:
+        trades = list(self.pending.values())
+        data = zlib.compress(encode_segment(trades, len(self.segments)), COMPRESSION_LEVEL)
+        path = os.path.join(self.directory, f"{len(self.segments):08d}{SPILL_SUFFIX}")
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)
+        hashes = array('i', sorted(map(_id_hash, self.pending)))
+        self.segments.append(SpillSegment(path, hashes, len(trades), len(data)))
+        self.pending = {}
+        self.stats["segments"] += 1
+        self.stats["bytes"] += len(data)
+        logger.debug(f"Spilled {len(trades)} trades to {path} ({len(data)} bytes).")
+
+    def get(self, trade_id: str):
+        """
+        The spilled trade with this id (the latest one spilled, if it was spilled more than once),
+        or None.
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            trade = self.pending.get(trade_id)
+            if trade is None:
+                trade = self._find(trade_id)
+            if trade is not None:
+                self.stats["hits"] += 1
+            return trade
+
+    def _find(self, trade_id: str):
+        key = _id_hash(trade_id)
+        for segment in reversed(self.segments):
+            hashes = segment.hashes
+            idx = bisect_left(hashes, key)
+            if idx == len(hashes) or hashes[idx] != key:
+                continue
+            rows = self._rows(segment)
+            if trade_id in rows:
+                frame, row = rows[trade_id]
+                return CompactTrade(trade_id, frame.stock_ids[frame.stocks[row]], frame.timestamps[row],
+                                    frame.quantities[row], frame.prices[row], TRADE_SIDES[frame.sides[row]])
+        return None
+
+    def _rows(self, segment: SpillSegment) -> dict:
+        path, rows = self._decoded
+        if path != segment.path:
+            with open(segment.path, "rb") as file:
+                frames = decode_segment(zlib.decompress(file.read()))
+            rows = {trade_id: (frame, row) for frame in frames for row, trade_id in enumerate(frame.trade_ids)}
+            self._decoded = (segment.path, rows)
+            self.stats["segment_reads"] += 1
+        return rows
+
+    def memory_usage(self) -> int:
+        """
+        Bytes of memory held for the segments (their id hash arrays); pending trades not included.
+        """
+        return sum(segment.hashes.buffer_info()[1] * segment.hashes.itemsize for segment in self.segments)
+
+    def clear(self) -> None:
+        """
+        Forget every spilled trade and delete the segment files.
+        """
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith(SPILL_SUFFIX) or name.endswith(SPILL_SUFFIX + ".tmp"):
+                    os.remove(os.path.join(self.directory, name))
+            self.pending = {}
+            self.segments = []
+            self._decoded = (None, None)
+            self.stats.update(spilled=0, segments=0, bytes=0)
@@ -0,0 +1,221 @@
+import time
+from array import array
+from datetime import datetime
+
+from ssmts.config.constants import VWAP_BUCKET_SECONDS, VWAP_HORIZONS
+
+
+def horizon_label(seconds: int) -> str:
+    """
+    Short name of a horizon: 60 -> "1m", 3600 -> "1h", 90 -> "90s".
+    """
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+class VwapHorizons:
+    """
+    Volume weighted prices of a single stock over several horizons at once (1m, 5m, 15m and 1h
+    by default).
+
+    Notional and volume are aggregated into fixed time buckets (one second by default) of a ring
+    as long as the longest horizon. Every horizon keeps running sums over its newest buckets: a
+    trade is added to its bucket and to the sums of the horizons it falls in, and when time moves
+    to a new bucket the buckets leaving each horizon are subtracted. Adding a trade and reading
+    all horizons are O(1) per horizon, however many trades the horizons hold; moving time on costs
+    one array slice sum per horizon over the buckets crossed. Reading does not change anything.
+    """
+
+    def __init__(self, horizons=VWAP_HORIZONS, bucket_seconds: int = VWAP_BUCKET_SECONDS, clock=time.time):
+        """
+        :param horizons: Horizon lengths in seconds, each a multiple of bucket_seconds.
+        :param bucket_seconds: Length of a bucket in seconds.
+        :param clock: Callable returning the current epoch time in seconds.
+        """
+        if bucket_seconds <= 0:
+            raise ValueError("Bucket length must be greater than zero.")
+        if not horizons or any(horizon <= 0 or horizon % bucket_seconds for horizon in horizons):
+            raise ValueError(f"Horizons must be positive multiples of {bucket_seconds} seconds.")
+        self.horizons = tuple(horizons)
+        self.labels = tuple(horizon_label(horizon) for horizon in self.horizons)
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.spans = tuple(horizon // bucket_seconds for horizon in self.horizons)  # horizon length in buckets
+        self.size = max(self.spans)
+        self.indices = range(len(self.spans))
+        self.notionals = array('d', bytes(8 * self.size))  # ring of per bucket sums, bucket n at n % size
+        self.volumes = array('q', bytes(8 * self.size))
+        self.head = None  # newest bucket (epoch seconds // bucket_seconds)
+        self.notional = [0.0] * len(self.spans)  # running sums per horizon
+        self.volume = [0] * len(self.spans)
+
+    def _sum(self, ring: array, start: int, end: int):
+        """
+        Sum of the ring over the buckets start (inclusive) to end (exclusive), at most size of them.
+        """
+        if end <= start:
+            return 0
+        first, last = start % self.size, end % self.size
+        if first < last:
+            return sum(ring[first:last])
+        return sum(ring[first:]) + sum(ring[:last])
+
+    def _clear(self, start: int, end: int) -> None:
+        """
+        Zero the buckets start (inclusive) to end (exclusive), at most size of them.
+        """
+        first, last = start % self.size, end % self.size
+        for ring in (self.notionals, self.volumes):
+            if first < last:
+                ring[first:last] = array(ring.typecode, bytes(8 * (last - first)))
+            else:
+                ring[first:] = array(ring.typecode, bytes(8 * (self.size - first)))
+                ring[:last] = array(ring.typecode, bytes(8 * last))
+
+    def advance(self, bucket: int) -> None:
+        """
+        Move the newest bucket forward, expiring the buckets that leave each horizon.
+
+        :param bucket: Bucket number to move to; older buckets than the current one are ignored.
+        """
+        head = self.head
+        if head is None:
+            self.head = bucket
+            return
+        if bucket <= head:
+            return
+        gap = bucket - head
+        size, notionals, volumes = self.size, self.notionals, self.volumes
+        sums, volume = self.notional, self.volume
+        for idx, span in enumerate(self.spans):
+            if gap >= span or not volume[idx]:
+                sums[idx] = 0.0
+                volume[idx] = 0
+                continue
+            # buckets head - span + 1 .. bucket - span leave the horizon
+            if gap == 1:  # the usual case, time moved on by one bucket
+                slot = (bucket - span) % size
+                sums[idx] -= notionals[slot]
+                volume[idx] -= volumes[slot]
+            else:
+                sums[idx] -= self._sum(notionals, head - span + 1, bucket - span + 1)
+                volume[idx] -= self._sum(volumes, head - span + 1, bucket - span + 1)
+            if not volume[idx]:
+                sums[idx] = 0.0  # start from exact zero again so float error does not accumulate
+        if gap == 1:
+            slot = bucket % size
+            notionals[slot] = 0.0
+            volumes[slot] = 0
+        elif gap >= size:
+            self._clear(0, size)
+        else:
+            self._clear(head + 1, bucket + 1)
+        if head // self.size != bucket // self.size:
+            self._resync(bucket)
+        self.head = bucket
+
+    def _resync(self, head: int) -> None:
+        """
+        Recompute the running sums from the buckets, once per ring length of time, so float error
+        from adding and subtracting does not build up.
+        """
+        for idx, span in enumerate(self.spans):
+            self.notional[idx] = self._sum(self.notionals, head - span + 1, head + 1)
+            self.volume[idx] = self._sum(self.volumes, head - span + 1, head + 1)
+
+    def add(self, timestamp, price: float, quantity: int) -> None:
+        """
+        Add a trade. Trades older than the longest horizon are ignored.
+
+        :param timestamp: Trade time, as a datetime or epoch seconds.
+        :param price: Traded price.
+        :param quantity: Traded quantity.
+        """
+        self.add_notional(timestamp, price * quantity, quantity)
+
+    def add_notional(self, timestamp, notional: float, quantity: int) -> None:
+        """
+        Add a trade given as its notional (price * quantity), e.g. a VwspWindow entry.
+        """
+        seconds = timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp
+        bucket_seconds = self.bucket_seconds
+        bucket = int(seconds // bucket_seconds)
+        now = int(self.clock() // bucket_seconds)
+        if bucket > now:
+            now = bucket  # trust trade time if it runs ahead of the local clock
+        if self.head is None or now > self.head:
+            self.advance(now)
+        age = self.head - bucket
+        if age >= self.size:
+            return
+        slot = bucket % self.size
+        self.notionals[slot] += notional
+        self.volumes[slot] += quantity
+        sums, volumes = self.notional, self.volume
+        if age == 0:  # the usual case: the trade is in every horizon
+            for idx in self.indices:
+                sums[idx] += notional
+                volumes[idx] += quantity
+            return
+        for idx, span in enumerate(self.spans):
+            if age < span:
+                sums[idx] += notional
+                volumes[idx] += quantity
+
+    def add_trade(self, trade) -> None:
+        """
+        Add a Trade instance.
+        """
+        self.add_notional(trade.timeStamp, trade.price * trade.quantity, trade.quantity)
+
+    def add_trades(self, trades) -> None:
+        """
+        Add a batch of Trade instances, reading the clock once; each as add_trade() does.
+        """
+        bucket_seconds, size, spans, indices = self.bucket_seconds, self.size, self.spans, self.indices
+        notionals, volumes, sums, volume = self.notionals, self.volumes, self.notional, self.volume
+        now = int(self.clock() // bucket_seconds)
+        for trade in trades:
+            bucket = int(trade.timeStamp.timestamp() // bucket_seconds)
+            newest = bucket if bucket > now else now
+            if self.head is None or newest > self.head:
+                self.advance(newest)
+            age = self.head - bucket
+            if age >= size:
+                continue
+            quantity = trade.quantity
+            notional = trade.price * quantity
+            slot = bucket % size
+            notionals[slot] += notional
+            volumes[slot] += quantity
+            for idx in indices:
+                if age < spans[idx]:
+                    sums[idx] += notional
+                    volume[idx] += quantity
+
+    def vwaps(self, now: float = None) -> dict:
+        """
+        Volume weighted price over every horizon. Read only: the buckets that left a horizon since
+        the newest bucket are subtracted from a copy of its sums, the ring only moves forward when
+        trades are added. So readers can share a lock, while adds need it exclusively.
+
+        :param now: Epoch seconds to evaluate the horizons at, defaults to the clock.
+        :return: Horizon label ("1m", "5m", ...) -> VWAP, None for horizons without trades.
+        """
+        bucket = int((self.clock() if now is None else now) // self.bucket_seconds)
+        head = self.head
+        gap = bucket - head if head is not None else 0
+        vwaps = {}
+        for label, span, notional, volume in zip(self.labels, self.spans, self.notional, self.volume):
+            if gap > 0 and volume:
+                if gap >= span:
+                    volume = 0
+                else:
+                    # buckets head - span + 1 .. bucket - span have left the horizon
+                    notional -= self._sum(self.notionals, head - span + 1, bucket - span + 1)
+                    volume -= self._sum(self.volumes, head - span + 1, bucket - span + 1)
+            vwaps[label] = notional / volume if volume else None
+        return vwaps
@@ -0,0 +1,117 @@
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from ssmts.config.constants import VWSP_WINDOW_SECONDS
+
+
+class VwspWindow:
+    """
+    Time windowed Volume Weighted Stock Price aggregator for a single stock.
+
+    Keeps running notional (price * quantity) and volume sums over the trades of the last
+    ``window_seconds``. Trades are evicted from the head of the window as time advances, so
+    adding a trade and reading the VWSP are both amortised O(1), however many trades the
+    window holds.
+
+    Not thread safe by itself: TradeSnapShotRegistry adds trades under its write lock, and reads
+    under its read lock while holding the window's own ``lock``, since reading evicts expired trades.
+    """
+
+    def __init__(self, window_seconds: float = VWSP_WINDOW_SECONDS, clock=time.time):
+        """
+        :param window_seconds: Length of the window in seconds.
+        :param clock: Callable returning the current epoch time in seconds.
+        """
+        if window_seconds <= 0:
+            raise ValueError("Window length must be greater than zero.")
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.entries = deque()  # (epoch seconds, notional, quantity), oldest first
+        self.notional = 0.0
+        self.volume = 0
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _to_seconds(timestamp) -> float:
+        return timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+
+    def add(self, timestamp, price: float, quantity: int) -> None:
+        """
+        Add a trade to the window. Trades already older than the window are ignored.
+
+        :param timestamp: Trade time, as a datetime or epoch seconds.
+        :param price: Traded price.
+        :param quantity: Traded quantity.
+        """
+        timestamp = self._to_seconds(timestamp)
+        now = self.clock()
+        if self.last_timestamp is not None and self.last_timestamp > now:
+            now = self.last_timestamp  # trust trade time if it runs ahead of the local clock
+        if timestamp <= now - self.window_seconds:
+            return
+        self.entries.append((timestamp, price * quantity, quantity))
+        self.notional += price * quantity
+        self.volume += quantity
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+        self.expire(now)
+
+    def extend(self, entries) -> None:
+        """
+        Add many trades at once, e.g. when the window is rebuilt from the trade journal.
+
+        :param entries: (epoch seconds, notional, quantity) tuples, oldest first and not older
+            than the trades already in the window.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        self.entries.extend(entries)
+        self.notional += sum(entry[1] for entry in entries)
+        self.volume += sum(entry[2] for entry in entries)
+        newest = max(entry[0] for entry in entries)
+        if self.last_timestamp is None or newest > self.last_timestamp:
+            self.last_timestamp = newest
+        self.expire(max(self.clock(), self.last_timestamp))
+
+    def add_trade(self, trade) -> None:
+        """
+        Add a Trade instance to the window.
+        """
+        self.add(trade.timeStamp, trade.price, trade.quantity)
+
+    def expire(self, now: float = None) -> None:
+        """
+        Evict every trade that has fallen out of the window.
+
+        :param now: Epoch seconds to evaluate the window at, defaults to the clock.
+        """
+        cutoff = (self.clock() if now is None else now) - self.window_seconds
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            _, notional, quantity = entries.popleft()
+            self.notional -= notional
+            self.volume -= quantity
+        if not entries:
+            # start from exact zero again so float error does not accumulate
+            self.notional = 0.0
+            self.volume = 0
+
+    def vwsp(self, now: float = None) -> float:
+        """
+        Volume Weighted Stock Price over the trades in the window.
+
+        :param now: Epoch seconds to evaluate the window at, defaults to the clock.
+        :return: The VWSP.
+        """
+        self.expire(now)
+        if self.volume == 0:
+            raise ValueError(f"No trades in the past {self.window_seconds:g} seconds.")
+        return self.notional / self.volume
+
+    def __len__(self):
+        return len(self.entries)
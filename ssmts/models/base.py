@@ -8,6 +8,7 @@ class BaseModel(ABC, Generic[T]):
     BaseModel is an abstract class that defines the interface for a model.
     It uses generics to allow for different types of models to be created.
     """
+    __slots__ = ()  # lets slotted models (see ssmts.models.compact) avoid a per-instance __dict__
 
     @abstractmethod
     def from_dict(self, data: dict) -> T:
@@ -0,0 +1,201 @@
+
+"""
+Compact, ``__slots__`` based variants of the Trade, Stock and TradeSnapShot models.
+
+They have no per-instance ``__dict__``, validate against precomputed frozensets and keep
+timestamps in the form they were received in (ISO string, epoch nanoseconds or datetime) until
+they are first accessed. They are registered as virtual subclasses of the regular models, so
+``isinstance(trade, Trade)`` checks across the code base accept them.
+
+Benchmark: python -m ssmts.benchmarks.bench_models
+"""
+
+from collections import deque
+from datetime import datetime
+
+from ssmts.config.constants import TRADE_INDICATORS
+from ssmts.models.base import BaseModel
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.models.trade_snapshot import TradeSnapShot
+
+
+def _parse_timestamp(raw) -> datetime:
+    """
+    Turn a raw timestamp (datetime, ISO string or epoch nanoseconds) into a datetime.
+    """
+    if isinstance(raw, datetime):
+        return raw
+    if isinstance(raw, str):
+        return datetime.fromisoformat(raw)
+    if isinstance(raw, int):
+        seconds, nanos = divmod(raw, 1_000_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=nanos // 1000)
+    raise TypeError(f"Unsupported timestamp {raw!r}.")
+
+
+class CompactTrade(BaseModel):
+    """
+    Slotted Trade with a lazily parsed timestamp.
+    """
+    __slots__ = ('tradeId', 'stockId', '_rawTimeStamp', '_timeStamp', 'quantity', 'price', 'indicator')
+
+    def __init__(self, tradeId: str, stockId: str, timeStamp, quantity: int, price: float, indicator: str):
+        """
+        :param timeStamp: datetime, ISO string or epoch nanoseconds; parsed on first access.
+        """
+        self.tradeId = tradeId
+        self.stockId = stockId
+        self._rawTimeStamp = timeStamp
+        self._timeStamp = timeStamp if isinstance(timeStamp, datetime) else None
+        self.quantity = quantity
+        self.price = price
+        self.indicator = indicator
+        self.validate_trade()
+
+    def validate_trade(self):
+        """
+        Validates the trade attributes to ensure they meet the required criteria.
+        """
+        if self.quantity <= 0:
+            raise ValueError("Quantity must be greater than zero.")
+        if self.price <= 0:
+            raise ValueError("Price must be greater than zero.")
+        if self.indicator not in TRADE_INDICATORS:
+            raise ValueError("Indicator must be 'buy' or 'sell'.")
+
+    @property
+    def timeStamp(self) -> datetime:
+        if self._timeStamp is None:
+            self._timeStamp = _parse_timestamp(self._rawTimeStamp)
+        return self._timeStamp
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a CompactTrade from a dictionary, without parsing the timestamp.
+        """
+        return cls(
+            tradeId=data.get('tradeId'),
+            stockId=data.get('stockId'),
+            timeStamp=data.get('timestamp') or datetime.now(),
+            quantity=data.get('quantity'),
+            price=data.get('price'),
+            indicator=data.get('indicator')
+        )
+
+    def to_dict(self):
+        """
+        Converts the trade to a dictionary. An ISO string timestamp is passed through unparsed.
+        """
+        raw = self._rawTimeStamp
+        return {
+            'tradeId': self.tradeId,
+            'stockId': self.stockId,
+            'timestamp': raw if isinstance(raw, str) else self.timeStamp.isoformat(),
+            'quantity': self.quantity,
+            'price': self.price,
+            'indicator': self.indicator
+        }
+
+    __str__ = Trade.__str__
+    __eq__ = Trade.__eq__
+    __repr__ = Trade.__repr__
+
+
+class CompactStock(BaseModel):
+    """
+    Slotted Stock.
+    """
+    __slots__ = ('stockId', 'symbol', 'stockType', 'lastDivident', 'fixedDivident', 'parValue',
+                 'currentPrice', 'lastTradeTime')
+
+    def __init__(self, stockId=None, symbol=None, stockType=None, lastDivident=None, fixedDivident=None,
+                 parValue=None, currentPrice=None, lastTradeTime=None):
+        self.stockId = stockId if stockId is not None else ''
+        self.symbol = symbol if symbol is not None else ''
+        self.stockType = stockType if stockType is not None else ''
+        self.lastDivident = lastDivident if lastDivident is not None else 0.0
+        self.fixedDivident = fixedDivident if fixedDivident is not None else 0.0
+        self.parValue = parValue if parValue is not None else 0.0
+        self.currentPrice = currentPrice if currentPrice is not None else 0.0
+        self.lastTradeTime = lastTradeTime
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a CompactStock from a dictionary.
+        """
+        return cls(data.get('stockId'), data.get('symbol'), data.get('stockType'), data.get('lastDivident'),
+                   data.get('fixedDivident'), data.get('parValue'), data.get('currentPrice'),
+                   data.get('lastTradeTime'))
+
+    get_last_trade_time = Stock.get_last_trade_time
+    to_dict = Stock.to_dict
+    set_current_price = Stock.set_current_price
+    __str__ = Stock.__str__
+    __repr__ = Stock.__repr__
+    __eq__ = Stock.__eq__
+
+
+class CompactTradeSnapShot(BaseModel):
+    """
+    Slotted TradeSnapShot with a lazily parsed snapshot time.
+    """
+    __slots__ = ('stockId', '_rawSnapshotTime', '_snapshot_time', 'max_length', 'trades')
+
+    def __init__(self, stockId: str, snapshot_time, trades: list, max_length=TradeSnapShot.MAX_LENGTH):
+        self.stockId = stockId
+        self.snapshot_time = snapshot_time
+        self.max_length = max_length
+        self.trades = deque(trades, maxlen=max_length)
+
+    @property
+    def snapshot_time(self) -> datetime:
+        if self._snapshot_time is None:
+            self._snapshot_time = _parse_timestamp(self._rawSnapshotTime)
+        return self._snapshot_time
+
+    @snapshot_time.setter
+    def snapshot_time(self, value):
+        self._rawSnapshotTime = value
+        self._snapshot_time = value if isinstance(value, datetime) else None
+
+    def add_trades(self, trades: list):
+        """
+        Adds multiple trades to the snapshot, dropping the oldest ones beyond max_length.
+        """
+        if not isinstance(trades, list):
+            raise TypeError("Trades must be a list of Trade instances.")
+        for trade in trades:
+            self.add_trade(trade)
+
+    def add_trade(self, trade):
+        """
+        Adds a trade to the snapshot, dropping the oldest one beyond max_length.
+        """
+        if not isinstance(trade, Trade):
+            raise TypeError("Trade must be an instance of Trade.")
+        self.trades.append(trade)
+        self.snapshot_time = datetime.now()
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a CompactTradeSnapShot from a dictionary, without parsing any timestamp.
+        """
+        return cls(
+            stockId=data.get('stockId'),
+            snapshot_time=data.get('snapshot_time') or datetime.now(),
+            trades=[CompactTrade.from_dict(trade_data) for trade_data in data.get('trades', [])]
+        )
+
+    to_dict = TradeSnapShot.to_dict
+    __str__ = TradeSnapShot.__str__
+    __eq__ = TradeSnapShot.__eq__
+    __repr__ = TradeSnapShot.__repr__
+
+
+Trade.register(CompactTrade)
+Stock.register(CompactStock)
+TradeSnapShot.register(CompactTradeSnapShot)
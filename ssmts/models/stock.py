@@ -52,7 +52,7 @@ class Stock(BaseModel):
         """
         Populates the Stock instance from a dictionary.
         """
-        stock = cls()
+        stock = cls.__new__(cls)  # every attribute __init__ would set is set below
         stock.stockId = data.get('stockId')
         stock.symbol = data.get('symbol')
         stock.stockType = data.get('stockType')
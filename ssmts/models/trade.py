@@ -1,6 +1,6 @@
 
 from datetime import datetime
-from ssmts.config.constants import TradeType
+from ssmts.config.constants import TRADE_INDICATORS
 from ssmts.models.base import BaseModel
 
 
@@ -8,6 +8,7 @@ class Trade(BaseModel):
     """
     Trade class representing a trade in the system.
     """
+    trace = None  # (trace id, send ns, received ns) of a traced trade, see ssmts.utility.tracing
 
     def __init__(self, tradeId: str, stockId: str, timeStamp: datetime, quantity: int, price: float, indicator: str):
         """
@@ -31,7 +32,7 @@ class Trade(BaseModel):
             raise ValueError("Quantity must be greater than zero.")
         if self.price <= 0:
             raise ValueError("Price must be greater than zero.")
-        if self.indicator not in [t.value for t in TradeType]:
+        if self.indicator not in TRADE_INDICATORS:
             raise ValueError("Indicator must be 'buy' or 'sell'.")
 
     @classmethod
@@ -39,10 +40,15 @@ class Trade(BaseModel):
         """
         Populates the Trade instance from a dictionary.
         """
+        timestamp = data.get('timestamp')
+        if not timestamp:
+            timestamp = datetime.now()
+        elif not isinstance(timestamp, datetime):
+            timestamp = datetime.fromisoformat(timestamp)  # binary frames already carry a datetime
         trade = cls(
             tradeId=data.get('tradeId'),
             stockId=data.get('stockId'),
-            timeStamp=datetime.fromisoformat(data.get('timestamp')) if data.get('timestamp') else datetime.now(),
+            timeStamp=timestamp,
             quantity=data.get('quantity'),
             price=data.get('price'),
             indicator=data.get('indicator')
@@ -30,9 +30,11 @@ class TradeSnapShot(BaseModel):
         """
         if not isinstance(trades, list):
             raise TypeError("Trades must be a list of Trade instances.")
-        
-        for trade in trades:
-            self.add_trade(trade)
+        if not all(isinstance(trade, Trade) for trade in trades):
+            raise TypeError("Trade must be an instance of Trade.")
+
+        self.trades.extend(trades)
+        self.snapshot_time = datetime.now()
 
     def add_trade(self, trade: Trade):
         """
@@ -49,9 +51,14 @@ class TradeSnapShot(BaseModel):
         """
         Populates the Tradesnapshot instance from a dictionary.
         """
+        snapshot_time = data.get('snapshot_time')
+        if not snapshot_time:
+            snapshot_time = datetime.now()
+        elif not isinstance(snapshot_time, datetime):
+            snapshot_time = datetime.fromisoformat(snapshot_time)
         trade = cls(
             stockId=data.get('stockId'),
-            snapshot_time=datetime.fromisoformat(data.get('snapshot_time')) if data.get('snapshot_time') else datetime.now(),
+            snapshot_time=snapshot_time,
             trades=[Trade.from_dict(trade_data) for trade_data in data.get('trades', [])]
         )
         return trade
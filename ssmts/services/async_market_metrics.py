@@ -0,0 +1,329 @@
+"""
+asyncio serving mode of the market metrics service.
+
+The snapshot consumer (zmq.asyncio) and the REST API share one event loop and one thread: the
+Flask app is served by a small keep-alive HTTP/1.1 server built on asyncio streams, calling the
+WSGI app inline. The metric views are O(1) lookups, so nothing blocks the loop for long, and no
+thread is created per request or per connection.
+
+Usage: SSMTS_SERVING_MODE=asyncio python -m ssmts.services.market_metrics
+   or: python -m ssmts.services.async_market_metrics [--host H] [--port P]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import signal
+import sys
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote_to_bytes
+
+from ssmts.config.constants import MAX_REQUEST_BODY, STREAM_SEND_BUFFER
+from ssmts.services.consumer.async_trade_snapshot_sub import AsyncTradeSnapshotSubscriber
+from ssmts.services.market_metrics import app
+from ssmts.services.stream_hub import HEARTBEAT_SECONDS, STALL_SECONDS, format_event, stream_hub, stream_options
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_LINES = 100
+SHUTDOWN_GRACE_SECONDS = 5  # time given to in flight requests on shutdown
+
+
+class HttpError(Exception):
+    """
+    A request the server cannot serve; answered with ``status`` and the connection closed, since
+    where the next request starts is not known.
+    """
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncWsgiServer:
+    """
+    Minimal HTTP/1.1 server running a WSGI app on asyncio streams, with keep-alive.
+
+    Request bodies are framed by Content-Length only: a request with Transfer-Encoding is refused
+    (501), so a chunked body can never be read as the next request, and bodies over
+    MAX_REQUEST_BODY bytes get a 413 before they are read. Malformed requests get a 400.
+
+    Paths listed in ``streams`` are served by a coroutine instead of the WSGI app, for responses
+    that never end (server push): ``handler(query, writer)`` writes the whole response and the
+    connection is closed when it returns.
+    """
+    def __init__(self, wsgi_app, host="0.0.0.0", port=5000, streams=None):
+        self.wsgi_app = wsgi_app
+        self.host = host
+        self.port = port
+        self.streams = streams or {}
+        self.server = None
+        self.connections = set()
+        self.busy = set()  # connections with a request in flight
+        self.streaming = set()  # tasks serving a stream, cancelled on shutdown
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logger.info(f"Serving on http://{self.host}:{self.port}")
+
+    async def close(self):
+        """
+        Stop accepting connections, let in flight requests finish, then close idle keep-alive connections.
+        """
+        self.server.close()
+        for task in list(self.streaming):
+            task.cancel()
+        for _ in range(SHUTDOWN_GRACE_SECONDS * 100):
+            if not self.busy:
+                break
+            await asyncio.sleep(0.01)
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:  # over the stream's line limit
+                    await self._send_error(writer, HTTPStatus.BAD_REQUEST, "Request line too long.")
+                    break
+                if not request_line.strip():
+                    break
+                self.busy.add(writer)
+                try:
+                    method, target, version, headers, body = await self._read_request(request_line, reader)
+                except HttpError as e:
+                    await self._send_error(writer, e.status, str(e))
+                    break
+                path, _, query = target.partition("?")
+                if method == "GET" and path in self.streams:
+                    self.busy.discard(writer)  # a stream does not hold up shutdown
+                    await self._stream(self.streams[path], query, writer)
+                    break
+                status, response_headers, payload = self.call_app(method, target, version, headers, body,
+                                                                  writer.get_extra_info("peername"))
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                response_headers = [(k, v) for k, v in response_headers if k.lower() not in ("content-length", "connection")]
+                response_headers += [("Content-Length", str(len(payload))),
+                                     ("Connection", "keep-alive" if keep_alive else "close")]
+                head = f"HTTP/1.1 {status}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in response_headers) + "\r\n"
+                writer.write(head.encode("latin-1") + payload)
+                await writer.drain()
+                self.busy.discard(writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.busy.discard(writer)
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _stream(self, handler, query, writer):
+        task = asyncio.current_task()
+        self.streaming.add(task)
+        try:
+            await handler(query, writer)
+        except asyncio.CancelledError:
+            pass  # shutting down
+        finally:
+            self.streaming.discard(task)
+
+    async def _read_request(self, request_line: bytes, reader):
+        """
+        Parse the rest of a request after its request line and read its body.
+
+        :return: method, target, version, headers and body.
+        :raises HttpError: The request cannot be served.
+        """
+        parts = request_line.decode("latin-1").rstrip("\r\n").split(" ")
+        if len(parts) != 3 or not parts[0].isalpha() or not parts[2].startswith("HTTP/"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        method, target, version = parts
+        headers = await self._read_headers(reader)
+        if "transfer-encoding" in headers:
+            raise HttpError(HTTPStatus.NOT_IMPLEMENTED, "Transfer-Encoding is not supported, send a Content-Length.")
+        length = headers.get("content-length", "0")
+        if not length.isdigit():  # also rejects signs and lists of values
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if int(length) > MAX_REQUEST_BODY:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body over {MAX_REQUEST_BODY} bytes.")
+        return method, target, version, headers, await reader.readexactly(int(length))
+
+    @staticmethod
+    async def _read_headers(reader) -> dict:
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            try:
+                line = await reader.readline()
+            except ValueError:  # over the stream's line limit
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Request header line too long.")
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, colon, value = line.decode("latin-1").partition(":")
+            if not colon or not name or any(c in name for c in " \t"):  # e.g. "Content-Length :" or a folded line
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request header.")
+            name = name.lower()
+            if name in headers and name in ("content-length", "transfer-encoding"):
+                raise HttpError(HTTPStatus.BAD_REQUEST, f"Repeated {name} header.")
+            headers[name] = value.strip()
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Too many request headers.")
+
+    @staticmethod
+    async def _send_error(writer, status: HTTPStatus, message: str) -> None:
+        payload = json.dumps({"error": message}).encode()
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload)
+        await writer.drain()
+
+    def call_app(self, method, target, version, headers, body, peer):
+        """
+        Run one request through the WSGI app.
+
+        :return: status line, response headers and the response body.
+        """
+        path, _, query = target.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote_to_bytes(path).decode("latin-1"),
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": peer[0] if peer else "",
+            "CONTENT_TYPE": headers.get("content-type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            if name not in ("content-type", "content-length"):
+                environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = status
+            response["headers"] = response_headers
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                payload = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except Exception as e:
+            logger.error(f"Unhandled error serving {method} {target}: {e}")
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            return f"{status.value} {status.phrase}", [("Content-Type", "text/plain")], status.phrase.encode()
+        return response["status"], response["headers"], payload
+
+
+async def stream_updates(query: str, writer):
+    """
+    Server-Sent Events stream of VWSP and All Share Index changes (the /stream route of this mode).
+
+    One coroutine per client, woken by the hub; the socket's send buffer is capped at
+    STREAM_SEND_BUFFER bytes, and a client that stays over the cap for STALL_SECONDS is dropped.
+    Updates published while a client is rate limited or draining are conflated, not queued.
+    """
+    wake = asyncio.Event()
+    try:
+        subscription = stream_hub.subscribe(wake=wake.set, **stream_options(
+            {name: values[-1] for name, values in parse_qs(query).items()}))
+    except (ValueError, OverflowError) as e:
+        status = HTTPStatus.BAD_REQUEST if isinstance(e, ValueError) else HTTPStatus.SERVICE_UNAVAILABLE
+        payload = json.dumps({"error": str(e)}).encode()
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload)
+        await writer.drain()
+        return
+    dropped = False
+    try:
+        writer.transport.set_write_buffer_limits(high=STREAM_SEND_BUFFER)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                writer.write(b": keep-alive\n\n")
+            else:
+                delay = subscription.send_delay(time.monotonic())
+                if delay:
+                    await asyncio.sleep(delay)  # updates arriving meanwhile are conflated
+                wake.clear()
+                updates = stream_hub.take(subscription)
+                if updates:
+                    writer.write(format_event(updates))
+            try:
+                await asyncio.wait_for(writer.drain(), STALL_SECONDS)  # returns at once below the cap
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping stream client {writer.get_extra_info('peername')}: not reading.")
+                dropped = True
+                return
+    except ConnectionError:
+        pass
+    finally:
+        stream_hub.unsubscribe(subscription, dropped=dropped)
+
+
+async def serve(host="0.0.0.0", port=5000, snapshot_address="tcp://localhost:5556",
+                sync_address="tcp://localhost:5557", stop: asyncio.Event = None):
+    """
+    Run the snapshot consumer and the REST API on the current event loop until ``stop`` is set
+    (or SIGINT/SIGTERM is received), then shut both down gracefully.
+    """
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # not the main thread, or not supported on this platform
+
+    subscriber = AsyncTradeSnapshotSubscriber(address=snapshot_address, syncAddress=sync_address,
+                                              listener=stream_hub.on_vwsp)
+    consumer = asyncio.create_task(subscriber.consume_snapshots())
+    server = AsyncWsgiServer(app, host, port, streams={"/stream": stream_updates})
+    await server.start()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down market metrics...")
+        await server.close()
+        subscriber.stop()
+        consumer.cancel()
+        try:
+            await consumer
+        except asyncio.CancelledError:
+            pass
+        subscriber.close()
+        logger.info("Market metrics shutdown complete.")
+
+
+def run(host="0.0.0.0", port=5000, snapshot_address="tcp://localhost:5556", sync_address="tcp://localhost:5557"):
+    asyncio.run(serve(host, port, snapshot_address, sync_address))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--snapshot-address", default="tcp://localhost:5556")
+    args = parser.parse_args()
+    run(args.host, args.port, args.snapshot_address)
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+
+import zmq
+import zmq.asyncio
+
+from ssmts.services.consumer.trade_snapshot_sub import TradeSnapshotSubscriber
+
+logger = logging.getLogger(__name__)
+
+YIELD_EVERY = 100  # messages handled before giving the event loop back to other tasks
+
+
+class AsyncTradeSnapshotSubscriber(TradeSnapshotSubscriber):
+    """
+    TradeSnapshotSubscriber for an asyncio event loop, built on zmq.asyncio.
+
+    Messages are applied with the same handle_message as the threaded subscriber, so the
+    registries are updated from the event loop thread instead of a thread of their own.
+    Resync requests after a sequence gap still use a blocking REQ socket (at most SYNC_TIMEOUT_MS);
+    gaps are rare and the reply is needed before any later delta can be applied.
+    """
+    def __init__(self, address="tcp://localhost:5556", syncAddress="tcp://localhost:5557", symbols=None, prefixes=None,
+                 listener=None):
+        super().__init__(address, syncAddress, context=zmq.asyncio.Context(), symbols=symbols, prefixes=prefixes,
+                         listener=listener)
+        self.syncContext = zmq.Context.shadow(self.context.underlying)
+        self.running = False
+
+    async def consume_snapshots(self):
+        """
+        Apply snapshot messages until stop() is called or the task is cancelled.
+        """
+        self.running = True
+        handled = 0
+        while self.running:
+            try:
+                frames = await self.socket.recv_multipart()
+            except zmq.Again:
+                continue  # RCVTIMEO expired, nothing published meanwhile
+            except zmq.ContextTerminated:
+                break
+            try:
+                self.handle_message(frames[-1])
+            except Exception as e:
+                logger.error(f"Error while consuming snapshots: {e}")
+            handled += 1
+            if handled % YIELD_EVERY == 0:
+                await asyncio.sleep(0)  # queued messages resolve without suspending; let requests in
+
+    def stop(self):
+        self.running = False
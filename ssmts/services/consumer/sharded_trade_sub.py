@@ -0,0 +1,244 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+
+import zmq
+
+from ssmts.config.constants import CONSUMER_SHARDS, JOURNAL_DIR, SHARD_BASE_PORT
+from ssmts.data.store.trade_registry import TradeRegistry
+from ssmts.services.consumer.trade_sub import IDLE_TIMEOUT, RCV_HWM, TradeSubscriber
+from ssmts.utility.codec import codec_for, subscriptions, topic_stock_id
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROUTER_POLL_MS = 100
+
+
+def shard_for(stock_id: str, shards: int) -> int:
+    """
+    The shard owning a stock. crc32 rather than hash(), so every process agrees on it.
+    """
+    return zlib.crc32(stock_id.encode("utf-8")) % shards
+
+
+def worker_addresses(shard: int, host: str = "127.0.0.1", base_port: int = SHARD_BASE_PORT) -> dict:
+    """
+    Local addresses of a worker: where it pulls trades from, publishes snapshots and serves resyncs.
+    """
+    port = base_port + 3 * shard
+    return {
+        "trades": f"tcp://{host}:{port}",
+        "snapshots": f"tcp://{host}:{port + 1}",
+        "sync": f"tcp://{host}:{port + 2}",
+    }
+
+
+def run_worker(shard: int, base_port: int, options: dict, results=None):
+    """
+    Worker process entry point: a TradeSubscriber pulling the trades of one shard.
+    Its TradeRegistry and TradeSnapShotRegistry hold only the stocks of that shard.
+
+    :param results: Optional multiprocessing queue receiving the worker's stats when it exits.
+    """
+    addresses = worker_addresses(shard, base_port=base_port)
+    journal_dir = options.get("journal_dir") or JOURNAL_DIR
+    if journal_dir:
+        options = dict(options, journal_dir=os.path.join(journal_dir, f"shard-{shard}"))  # one journal per shard
+    if TradeRegistry.spill_dir:
+        TradeRegistry.configure_retention(TradeRegistry.max_age, TradeRegistry.max_trades, TradeRegistry.max_bytes,
+                                          os.path.join(TradeRegistry.spill_dir, f"shard-{shard}"),
+                                          TradeRegistry.spill_segment_trades)
+    subscriber = TradeSubscriber(address=addresses["trades"], snapShotPubAddress=addresses["snapshots"],
+                                 snapShotSyncAddress=addresses["sync"], socket_type=zmq.PULL, drain=True,
+                                 **options)
+    logger.info(f"Shard {shard} worker started.")
+    subscriber.consume_trades()
+    if results is not None:
+        results.put({"shard": shard, "trades": subscriber.conflation_stats["updates"],
+                     "last_batch_at": subscriber.last_batch_at})
+
+
+class ShardedTradeSubscriber:
+    """
+    Trade consumer spread over several processes, partitioned by stockId.
+
+    The router (this process) subscribes to the trade publisher and pushes each trade to the
+    worker owning its stock, so the trades of a stock stay in order on one worker. It only reads
+    the topic frame, whose shard it remembers, and forwards the frames as received (zero copy):
+    trades are decoded by the workers, not by the router. Every worker is
+    a regular TradeSubscriber with its own shard of the registries. The workers' snapshot channels
+    are merged back onto the usual snapshot address, and resync requests are forwarded to the
+    worker owning the stock, so snapshot consumers can not tell the difference.
+    """
+    def __init__(self, address="tcp://localhost:5555", snapShotPubAddress="tcp://localhost:5556",
+                 snapShotSyncAddress="tcp://localhost:5557", shards=None, base_port=SHARD_BASE_PORT,
+                 idle_timeout=IDLE_TIMEOUT, results=None, symbols=None, prefixes=None,
+                 worker_class=multiprocessing.Process, **options):
+        """
+        :param shards: Number of worker processes, defaults to CONSUMER_SHARDS.
+        :param worker_class: What runs a worker, given target, name, daemon and args:
+            multiprocessing.Process, or threading.Thread to keep the workers in this process (tests,
+            debugging), where they share the registries.
+        :param symbols: Only route the trades of these stocks; see TradeSubscriber.
+        :param prefixes: Only route the trades of stocks whose id starts with one of these.
+        :param options: Passed on to each worker's TradeSubscriber (codec, trade_store, batch_size, ...).
+        """
+        self.address = address
+        self.snapShotPubAddress = snapShotPubAddress
+        self.snapShotSyncAddress = snapShotSyncAddress
+        self.shards = shards or CONSUMER_SHARDS
+        self.base_port = base_port
+        self.idle_timeout = idle_timeout
+        self.options = dict(options, idle_timeout=idle_timeout)
+        self.results = results
+        self.subscriptions = subscriptions(symbols, prefixes)
+        self.worker_class = worker_class
+        self.workers = []
+        self.routed = [0] * self.shards  # trades sent to each shard
+        self.topic_shards = {}  # topic frame -> shard
+
+    def start(self):
+        """
+        Start the workers, then bind the router sockets.
+        Workers are started first, so they do not inherit any zmq state from this process.
+        """
+        for shard in range(self.shards):
+            worker = self.worker_class(target=run_worker, name=f"trade-shard-{shard}", daemon=True,
+                                       args=(shard, self.base_port, self.options, self.results))
+            worker.start()
+            self.workers.append(worker)
+
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.setsockopt(zmq.RCVHWM, RCV_HWM)
+        self.socket.connect(self.address)
+        for subscription in self.subscriptions:
+            self.socket.setsockopt(zmq.SUBSCRIBE, subscription)
+
+        addresses = [worker_addresses(shard, base_port=self.base_port) for shard in range(self.shards)]
+        self.shardSockets = []
+        self.syncDealers = []
+        for shard_addresses in addresses:
+            push = self.context.socket(zmq.PUSH)
+            push.setsockopt(zmq.SNDHWM, RCV_HWM)
+            push.bind(shard_addresses["trades"])
+            self.shardSockets.append(push)
+            dealer = self.context.socket(zmq.DEALER)
+            dealer.setsockopt(zmq.LINGER, 0)
+            dealer.connect(shard_addresses["sync"])
+            self.syncDealers.append(dealer)
+
+        # resync requests: REQ clients -> ROUTER -> DEALER of the owning shard -> worker REP
+        self.syncSocket = self.context.socket(zmq.ROUTER)
+        self.syncSocket.bind(self.snapShotSyncAddress)
+
+        self.proxy = threading.Thread(target=self._proxy_snapshots,
+                                      args=([a["snapshots"] for a in addresses],), daemon=True)
+        self.proxy.start()
+
+        self.poller = zmq.Poller()
+        self.poller.register(self.socket, zmq.POLLIN)
+        self.poller.register(self.syncSocket, zmq.POLLIN)
+        for dealer in self.syncDealers:
+            self.poller.register(dealer, zmq.POLLIN)
+        logger.info(f"Routing trades from {self.address} to {self.shards} shards.")
+
+    def _proxy_snapshots(self, worker_addresses):
+        """
+        Merge the snapshot channels of all workers onto the public snapshot address.
+        """
+        xsub = self.context.socket(zmq.XSUB)
+        xpub = self.context.socket(zmq.XPUB)
+        for address in worker_addresses:
+            xsub.connect(address)
+        xpub.bind(self.snapShotPubAddress)
+        try:
+            zmq.proxy(xsub, xpub)
+        except zmq.ContextTerminated:
+            pass
+        finally:
+            xsub.close(linger=0)
+            xpub.close(linger=1000)
+
+    def route(self, frames: list) -> int:
+        """
+        Push a trade message, as received, to the shard owning its stock.
+        The shard comes from the topic frame, looked up once per topic; only untagged messages are
+        read with their codec.
+
+        :param frames: The message frames, as bytes or zmq.Frame.
+        :return: The shard, or -1 if the message was discarded.
+        """
+        try:
+            key = frames[0] if isinstance(frames[0], bytes) else frames[0].bytes
+            if len(frames) > 1:
+                shard = self.topic_shards.get(key)
+                if shard is None:
+                    shard = self.topic_shards[key] = shard_for(topic_stock_id(key), self.shards)
+            else:
+                shard = shard_for(codec_for(key).stock_id(key), self.shards)
+        except Exception as e:
+            logger.error(f"Unroutable trade message discarded: {e}")
+            return -1
+        self.shardSockets[shard].send_multipart(frames, copy=False)
+        self.routed[shard] += 1
+        return shard
+
+    def forward_sync_request(self):
+        """
+        Forward a resync request (the stock id) to the worker owning the stock.
+        """
+        frames = self.syncSocket.recv_multipart()
+        stock_id = frames[-1].decode("utf-8")
+        self.syncDealers[shard_for(stock_id, self.shards)].send_multipart(frames)
+
+    def consume_trades(self):
+        """
+        Route trades until every worker has gone idle and exited.
+        """
+        self.start()
+        last_trade_time = time.monotonic()
+        try:
+            while any(worker.is_alive() for worker in self.workers):
+                socks = dict(self.poller.poll(ROUTER_POLL_MS))
+                if self.socket in socks:
+                    while True:
+                        try:
+                            self.route(self.socket.recv_multipart(zmq.NOBLOCK, copy=False))
+                        except zmq.Again:
+                            break
+                    last_trade_time = time.monotonic()
+                if self.syncSocket in socks:
+                    self.forward_sync_request()
+                for dealer in self.syncDealers:
+                    if dealer in socks:
+                        self.syncSocket.send_multipart(dealer.recv_multipart())
+                if time.monotonic() - last_trade_time > self.idle_timeout + 5:
+                    logger.warning("Workers still running after the idle timeout. Exiting...")
+                    break
+        except KeyboardInterrupt:
+            logger.info("Shutting down sharded subscriber...")
+        finally:
+            self.shutdown()
+        logger.info(f"Trades routed per shard: {self.routed}")
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive() and hasattr(worker, "terminate"):  # a thread can not be stopped
+                worker.terminate()
+        for sock in [self.socket, self.syncSocket, *self.shardSockets, *self.syncDealers]:
+            sock.close(linger=0)
+        self.context.term()
+        self.proxy.join(timeout=1)
+        logger.info("ShardedTradeSubscriber shutdown complete.")
+
+
+if __name__ == "__main__":
+    logger.info("Starting ShardedTradeSubscriber...")
+    subscriber = ShardedTradeSubscriber()
+    subscriber.consume_trades()
@@ -12,6 +12,9 @@ from ssmts.models.trade import Trade
 from ssmts.models.trade_snapshot import TradeSnapShot
 from datetime import datetime
 
+from ssmts.utility.codec import MessageType, decode_any, recv_payload, subscriptions
+from ssmts.utility import tracing
+from ssmts.utility.metrics import metrics
 from ssmts.utility.stock_utils import StockUtils
 
 # Configure logging
@@ -28,34 +31,152 @@ logger = logging.getLogger(__name__)
 # It can be extended to include additional functionality such as filtering messages or processing them in a specific way.
 # It can also be used to create a snapshot of trades and store them in the TradeSnapshotRegistry.
 
+SYNC_TIMEOUT_MS = 500  # how long to wait for a resync reply before waiting for the next full snapshot
+
+# per stage latency histograms (see ssmts.utility.metrics)
+DECODE = metrics.histogram("snapshot_sub.decode")
+APPLY = metrics.histogram("snapshot_sub.apply")  # applying a snapshot or delta to the registry
+VWSP = metrics.histogram("snapshot_sub.vwsp")  # recomputing the VWSP and the stock price
+LISTENER = metrics.histogram("snapshot_sub.listener")
+
 class TradeSnapshotSubscriber:
-    def __init__(self, address="tcp://localhost:5556"):
-        self.context = zmq.Context()
+    def __init__(self, address="tcp://localhost:5556", syncAddress="tcp://localhost:5557", context=None,
+                 symbols=None, prefixes=None, listener=None):
+        """
+        :param symbols: Only receive the snapshots of these stocks (exact stock ids).
+        :param prefixes: Only receive the snapshots of stocks whose id starts with one of these.
+            Both filter on the topic frame inside zmq; with neither, every snapshot is received.
+        :param listener: Optional callable(stock_id, vwsp) called after each update is applied,
+            e.g. StreamHub.on_vwsp to push the new values to streaming clients.
+        """
+        self.context = context or zmq.Context()  # share the trade consumer's context for inproc://
         self.socket = self.context.socket(zmq.SUB)
         self.socket.connect(address)
-        self.socket.setsockopt_string(zmq.SUBSCRIBE, "")
+        for subscription in subscriptions(symbols, prefixes):
+            self.socket.setsockopt(zmq.SUBSCRIBE, subscription)
         self.socket.setsockopt(zmq.RCVTIMEO, 5000)
         self.poller = zmq.Poller()
         self.poller.register(self.socket, zmq.POLLIN)
         self.address = address
+        self.syncAddress = syncAddress
+        self.syncContext = self.context  # context for the (blocking) resync REQ socket
+        self.syncSocket = None
+        self.sequences = {}  # stock id -> sequence number of the last update applied
+        self.epochs = {}  # stock id -> epoch of its publisher (changes when the publisher restarts)
+        self.stale = set()  # stocks with a gap, ignoring deltas until a full snapshot arrives
+        self.listener = listener
         logger.info(f"Connected to {address} and subscribed to trade messages.")
         StockLoader.load()  # Load stock data into the registry (central store)
-    
+        TradeSnapShotRegistry.register()
+
+    def request_snapshot(self, stock_id):
+        """
+        Ask the trade consumer for a full snapshot of a stock, after a sequence gap.
+
+        :return: The decoded snapshot, or None if no reply came in time.
+        """
+        if self.syncSocket is None:
+            self.syncSocket = self.syncContext.socket(zmq.REQ)
+            self.syncSocket.setsockopt(zmq.LINGER, 0)
+            self.syncSocket.connect(self.syncAddress)
+        self.syncSocket.send(stock_id.encode("utf-8"))
+        if self.syncSocket.poll(SYNC_TIMEOUT_MS, zmq.POLLIN):
+            reply = self.syncSocket.recv()
+            return decode_any(reply)[1] if reply else None
+        # a REQ socket without its reply is stuck; drop it and reconnect on the next gap
+        self.syncSocket.close()
+        self.syncSocket = None
+        return None
+
+    def apply_snapshot(self, snapshot):
+        """
+        Replace the snapshot of a stock with a full snapshot. A snapshot from a new publisher epoch
+        (the trade consumer restarted, numbering from 1 again) is always applied and resets the
+        stock's sequence.
+        """
+        stock_id, snapshot_seq, epoch = snapshot["stockId"], snapshot.get("seq", 0), snapshot.get("epoch", 0)
+        if epoch == self.epochs.get(stock_id, epoch):
+            if snapshot_seq and snapshot_seq < self.sequences.get(stock_id, 0):
+                return  # older than what we already have
+        else:
+            logger.info(f"Publisher of Stock {stock_id} restarted (epoch {epoch}), sequence reset to {snapshot_seq}.")
+        snapshot = TradeSnapShot.from_dict(snapshot)  # Deserialize the trade message
+        TradeSnapShotRegistry.add(stock_id, snapshot)
+        self.sequences[stock_id] = snapshot_seq
+        self.epochs[stock_id] = epoch
+        self.stale.discard(stock_id)
+
+    def apply_delta(self, delta):
+        """
+        Apply a delta if it is the next in sequence; on a gap, or a delta from a new publisher
+        epoch, resync with a full snapshot.
+        """
+        stock_id, seq, epoch = delta["stockId"], delta["seq"], delta.get("epoch", 0)
+        if stock_id in self.stale:
+            return  # waiting for a full snapshot
+        last_seq = self.sequences.get(stock_id, 0)
+        restarted = epoch != self.epochs.get(stock_id, epoch)
+        if seq <= last_seq and not restarted:
+            return  # duplicate
+        if seq != last_seq + 1 or restarted:
+            if restarted:
+                logger.warning(f"Publisher of Stock {stock_id} restarted (epoch {epoch}). Resyncing.")
+            else:
+                logger.warning(f"Sequence gap for Stock {stock_id}: expected {last_seq + 1}, got {seq}. Resyncing.")
+            self.stale.add(stock_id)
+            snapshot = self.request_snapshot(stock_id)
+            if snapshot is not None:
+                self.apply_snapshot(snapshot)
+            return
+        TradeSnapShotRegistry.update_trades(stock_id, [Trade.from_dict(trade) for trade in delta["trades"]])
+        self.sequences[stock_id] = seq
+        self.epochs[stock_id] = epoch
+
+    def handle_message(self, payload):
+        """
+        Apply one snapshot channel message and refresh the stock price from the new VWSP.
+        """
+        watch = metrics.stopwatch()
+        msg_type, message = decode_any(payload)
+        watch.lap(DECODE)
+        trace = tracing.snapshot_received(message) if "traceId" in message else None
+        if msg_type == MessageType.SNAPSHOT:
+            self.apply_snapshot(message)
+        elif msg_type == MessageType.DELTA:
+            self.apply_delta(message)
+        else:
+            logger.error(f"Unexpected message type {msg_type.name} on snapshot socket.")
+            return
+        watch.lap(APPLY)
+        metrics.incr(f"snapshot_sub.{msg_type.name.lower()}s")
+        stock_id = message["stockId"]
+        if stock_id in self.stale:
+            return
+        vwsp = StockUtils.calculate_vwsp(stock_id)
+        StockRegistry.update_stock_price(stock_id, price=vwsp, trace=trace) #realtime update of stock price
+        if trace is not None:
+            tracing.price_updated(trace)
+        watch.lap(VWSP)
+        if self.listener is not None:
+            self.listener(stock_id, vwsp)
+            watch.lap(LISTENER)
+        logger.debug(f"Trade snapshot {stock_id} updated in TradeSnapShotRegistry.")
+
     def consume_snapshots(self):
         while True:
             try:
                 socks = dict(self.poller.poll(1000))  # Poll for incoming messages
                 if self.socket in socks and socks[self.socket] == zmq.POLLIN:
-                    message = self.socket.recv_string()
-                    snapshot = eval(message)
-                    logger.info(f"Received trade snapshot in metrics service")
-                    # Process the trade message here
-                    snapshot = TradeSnapShot.from_dict(snapshot)  # Deserialize the trade message
-                    TradeSnapShotRegistry.add(snapshot.stockId, snapshot)
-                    vwsp = StockUtils.calculate_vwsp(snapshot.stockId)
-                    StockRegistry.update_stock_price(snapshot.stockId, price=vwsp) #realtime update of stock price
-                    logger.info(f"Trade snapshot {snapshot.stockId} updated/added in TradeSnapShotRegistry.")
+                    self.handle_message(recv_payload(self.socket))
             except zmq.Again as e:
                 logger.warning(f"Polling timed out: {e}")
             except Exception as e:
-                logger.error(f"Error while consuming trades: {e}")
\ No newline at end of file
+                logger.error(f"Error while consuming trades: {e}")
+
+    def close(self):
+        self.socket.close(linger=0)
+        if self.syncSocket is not None:
+            self.syncSocket.close()
+            self.syncSocket = None
+        self.context.term()
+        logger.info("TradeSnapshotSubscriber closed.")
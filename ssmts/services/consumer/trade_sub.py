@@ -1,11 +1,17 @@
 import logging
+import math
 import zmq
 import time
 
-from ssmts.config.constants import TradeType
+from ssmts.config.constants import CONFLATE_INTERVAL, DRAIN_BATCH_SIZE, DRAIN_MODE, JOURNAL_DIR, JOURNAL_FSYNC, METRICS_PORT, SNAPSHOT_RESYNC_INTERVAL, TRADE_INDICATORS, TRADE_STORE
+from ssmts.data.store.columnar_trade_registry import ColumnarTradeRegistry
+from ssmts.data.store.trade_journal import TradeJournal
 from ssmts.data.store.trade_registry import TradeRegistry
 from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
 from ssmts.models.trade import Trade
+from ssmts.utility.codec import MessageType, decode_any, get_codec, recv_payload, subscriptions, topic
+from ssmts.utility import tracing
+from ssmts.utility.metrics import metrics, serve_metrics
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +19,29 @@ logger = logging.getLogger(__name__)
 print("Debugging: Logger initialized.")
 
 IDEAL_THRESHOLD = 10  # Ideal threshold for trade messages
+IDLE_TIMEOUT = 50  # seconds without trades before the drain mode consumer exits
+MIN_POLL_MS = 1  # adaptive polling: poll timeout right after a batch
+MAX_POLL_MS = 1000  # adaptive polling: poll timeout once the socket has been idle for a while
+RCV_HWM = 100_000  # messages zmq may queue on the trade socket before it starts dropping
+
+REQUIRED_TRADE_FIELDS = frozenset({"tradeId", "timestamp", "indicator", "stockId", "price", "quantity"})
+MAX_QUANTITY = 0xFFFFFFFF  # quantities are unsigned 32 bit in the columnar store, the journal and the wire
+NON_TRANSIENT_ERRORS = (TypeError, ValueError, OverflowError)  # a bad trade: retrying fails the same way
+
+# per stage latency histograms (see ssmts.utility.metrics)
+RECEIVE = metrics.histogram("trade_sub.receive")  # draining a batch off the socket
+DECODE = metrics.histogram("trade_sub.decode")
+VALIDATE = metrics.histogram("trade_sub.validate")
+BUILD = metrics.histogram("trade_sub.build")  # Trade.from_dict
+STORE = metrics.histogram("trade_sub.store")
+JOURNAL = metrics.histogram("trade_sub.journal")  # per batch
+SNAPSHOT = metrics.histogram("trade_sub.snapshot")  # updating the snapshot registry, per batch
+PUBLISH = metrics.histogram("trade_sub.publish")  # a conflated flush, or one update in the classic loop
+
+TRADE_STORES = {
+    "dict": TradeRegistry,  # one Trade object per trade
+    "columnar": ColumnarTradeRegistry,  # parallel typed arrays, for large sessions
+}
 
 class TradeSubscriber:
     """
@@ -20,113 +49,407 @@ class TradeSubscriber:
     It validates the trades and retries processing in case of failure.
     This can be instantiate and used to consume trades from a publisher
     """
-    def __init__(self, address="tcp://localhost:5555", snapShotPubAddress="tcp://localhost:5556", max_retries=3, retry_interval=1):
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.SUB)
+    def __init__(self, address="tcp://localhost:5555", snapShotPubAddress="tcp://localhost:5556", max_retries=3, retry_interval=1, codec=None, trade_store=None, drain=None, batch_size=None,
+                 snapShotSyncAddress="tcp://localhost:5557", resync_interval=None, conflate_interval=None, context=None,
+                 socket_type=zmq.SUB, idle_timeout=IDLE_TIMEOUT, symbols=None, prefixes=None, journal_dir=None,
+                 fsync=None):
+        """
+        :param context: zmq context to create the sockets in. Pass the publisher's context to use
+            inproc:// addresses; by default the subscriber creates (and terminates) its own.
+        :param socket_type: zmq.SUB to subscribe to the trade publisher, or zmq.PULL to take a
+            share of the trades from a router (see sharded_trade_sub).
+        :param idle_timeout: Seconds without trades before the drain mode consumer exits.
+        :param symbols: Only receive the trades of these stocks (exact stock ids).
+        :param prefixes: Only receive the trades of stocks whose id starts with one of these.
+            Both filter on the topic frame inside zmq; with neither, every trade is received.
+        :param journal_dir: Directory of the trade journal, defaults to JOURNAL_DIR (no journal if
+            unset). Accepted trades are journaled before they are published, and the journal is
+            replayed into the registries on startup.
+        :param fsync: Journal fsync policy ("always", "interval" or "never"), defaults to JOURNAL_FSYNC.
+        """
+        self.ownsContext = context is None
+        self.closed = False
+        self.context = context or zmq.Context()
+        self.socket = self.context.socket(socket_type)
+        self.socket.setsockopt(zmq.RCVHWM, RCV_HWM)  # queue bursts instead of dropping them
         self.socket.connect(address)
-        self.socket.setsockopt_string(zmq.SUBSCRIBE, "")
+        if socket_type == zmq.SUB:
+            for subscription in subscriptions(symbols, prefixes):
+                self.socket.setsockopt(zmq.SUBSCRIBE, subscription)
         self.socket.setsockopt(zmq.RCVTIMEO, 5000)  # Set a timeout for receiving messages
 
-        self.snapShotContext = zmq.Context()
+        self.snapShotContext = context or zmq.Context()
         self.snapShotSocket = self.snapShotContext.socket(zmq.PUB)
         self.snapShotSocket.bind(snapShotPubAddress)
+        # snapshot consumers that detect a sequence gap request a full snapshot here
+        self.syncSocket = self.snapShotContext.socket(zmq.REP)
+        self.syncSocket.bind(snapShotSyncAddress)
 
         self.poller = zmq.Poller()
         self.poller.register(self.socket, zmq.POLLIN)
+        self.poller.register(self.syncSocket, zmq.POLLIN)
         self.address = address
         
         logger.info(f"Connected to {address} and subscribed to trade messages.")
         self.max_retries = max_retries
         self.retry_interval = retry_interval
+        self.idle_timeout = idle_timeout
+        self.last_batch_at = None  # wall clock time the last batch was processed
+        self.codec = get_codec(codec)  # wire format used for outgoing snapshots
+        self.drain = DRAIN_MODE if drain is None else drain
+        self.batch_size = batch_size or DRAIN_BATCH_SIZE
+        self.resync_interval = resync_interval or SNAPSHOT_RESYNC_INTERVAL
+        self.sequences = {}  # stock id -> sequence number of the last update published
+        # sequences start again at 1 on every start: the epoch tells snapshot consumers they did
+        self.epoch = time.time_ns()
+        self.updates_since_full = {}  # stock id -> deltas published since the last full snapshot
+        # conflation: trades applied but not yet published, flushed once per batch or per interval
+        self.conflate_interval = CONFLATE_INTERVAL if conflate_interval is None else conflate_interval
+        self.pending_trades = {}  # stock id -> trades applied since its last publication
+        self.last_flush = time.monotonic()
+        self.conflation_stats = {"updates": 0, "published": 0, "coalesced": 0}
         logger.info(f"Connected to {address} and subscribed to trade messages.")
 
-        TradeRegistry.register()
+        self.trade_store = TRADE_STORES[trade_store or TRADE_STORE]
+        self.trade_store.register()
+        if self.trade_store is not TradeRegistry and (TradeRegistry.max_age or TradeRegistry.max_trades or TradeRegistry.max_bytes):
+            logger.warning(f"Trade retention limits only apply to the dict trade store, not to {self.trade_store.__name__}.")
         TradeSnapShotRegistry.register()
+        metrics.gauges("trade_store", self.trade_store.stats)
+
+        journal_dir = journal_dir or JOURNAL_DIR
+        self.journal = TradeJournal(journal_dir, fsync=fsync or JOURNAL_FSYNC) if journal_dir else None
+        if self.journal is not None:
+            self.recovery_stats = self.journal.recover(self.trade_store)
+            # the first flush publishes a full snapshot of every recovered stock
+            for stock_id in TradeSnapShotRegistry.get_all():
+                self.pending_trades[stock_id] = list(TradeSnapShotRegistry.get(stock_id).trades)
 
     def validate_trade(self, trade):
-        required_fields = {"tradeId", "timestamp", "indicator", "stockId", "price", "quantity"}
-        if not all(field in trade for field in required_fields):
+        if not REQUIRED_TRADE_FIELDS.issubset(trade):
             logger.error(f"Trade validation failed: Missing fields in trade {trade}")
             return False
-        if trade["indicator"] not in [t.value for t in TradeType]:
+        if trade["indicator"] not in TRADE_INDICATORS:
             logger.error(f"Trade validation failed: Invalid trade type {trade['indicator']}")
             return False
-        if trade["price"] <= 0 or trade["quantity"] <= 0:
-            logger.error(f"Trade validation failed: Invalid price or quantity in trade {trade}")
+        quantity, price = trade["quantity"], trade["price"]
+        if type(quantity) is not int or not 0 < quantity <= MAX_QUANTITY:
+            logger.error(f"Trade validation failed: Quantity must be an integer from 1 to {MAX_QUANTITY} in trade {trade}")
+            return False
+        if type(price) not in (int, float) or not 0 < price < math.inf:
+            logger.error(f"Trade validation failed: Invalid price in trade {trade}")
             return False
-        logger.info(f"Trade validation passed for trade {trade.get('tradeId')}")
+        logger.debug(f"Trade validation passed for trade {trade.get('tradeId')}")
         return True
 
     def process_trade(self, trade):
+        """
+        Store a trade, retrying transient failures.
+
+        :return: Whether the trade was stored. Errors a bad trade causes (NON_TRANSIENT_ERRORS) are not retried.
+        """
         retry = 0
         while retry <= self.max_retries:
             try:
-                TradeRegistry.add(trade.tradeId, trade)
-                logger.info(f"Trade {trade.tradeId} added to TradeRegistry.")
+                self.trade_store.add(trade.tradeId, trade)
+                logger.debug(f"Trade {trade.tradeId} added to {self.trade_store.__name__}.")
                 # Simulate processing the trade (e.g., storing in a database)
                 # In a real-world scenario, this could involve more complex logic
-                return
+                return True
+            except NON_TRANSIENT_ERRORS as e:
+                logger.error(f"Failed to process trade {trade}, not retrying. Error: {e}")
+                return False
             except Exception as e:
                 retry += 1
                 logger.error(f"Failed to process trade {trade}. Retrying {retry}/{self.max_retries}. Error: {e}")
                 time.sleep(self.retry_interval)
         else:
             logger.error(f"Failed to process trade after {self.max_retries} retries: {retry}")
+            return False
 
-    def consume_trades(self):
-        ideal_count = 0
+    def ingest(self, payload):
+        """
+        Decode, validate and store a single trade message.
+
+        :param payload: The message frame of a trade received on the trade socket (after the topic frame).
+        :return: The stored Trade, or None if the message was discarded.
+        """
+        watch = metrics.stopwatch()
+        msg_type, trade_data = decode_any(payload)
+        watch.lap(DECODE)
+        if msg_type != MessageType.TRADE:
+            logger.error(f"Unexpected message type {msg_type.name} on trade socket.")
+            metrics.incr("trade_sub.rejected")
+            return None
+        logger.debug(f"Received trade: {trade_data.get('tradeId')} for stock {trade_data.get('stockId')}")
+        valid = self.validate_trade(trade_data)
+        watch.lap(VALIDATE)
+        if not valid:
+            logger.error(f"Invalid trade discarded: {trade_data.get('tradeId')}")
+            metrics.incr("trade_sub.rejected")
+            return None
+        trade = Trade.from_dict(trade_data)
+        if "traceId" in trade_data:
+            trade.trace = tracing.received(trade_data)
+        watch.lap(BUILD)
+        stored = self.process_trade(trade)
+        watch.lap(STORE)
+        if not stored:  # kept out of the snapshots and the journal too
+            metrics.incr("trade_sub.rejected")
+            return None
+        metrics.incr("trade_sub.accepted")
+        return trade
+
+    def publish_snapshot(self, stock_id, trace=None, seq=None):
+        """
+        Send the full current snapshot of a stock on the snapshot socket.
+
+        :param trace: Trace fields to send along (see tracing.published).
+        :param seq: Sequence number to send, defaults to the stock's last published one.
+        """
+        snapshot = TradeSnapShotRegistry.get(stock_id).to_dict()
+        snapshot["seq"] = self.sequences.get(stock_id, 0) if seq is None else seq
+        snapshot["epoch"] = self.epoch
+        if trace:
+            snapshot.update(trace)
+        self.snapShotSocket.send_multipart([topic(stock_id), self.codec.encode_snapshot(snapshot)]) ### this can also be persisted to a file/database
+        self.updates_since_full[stock_id] = 0
+        logger.debug(f"Snapshot sent for Stock {stock_id}.")
+
+    def publish_update(self, stock_id, trades):
+        """
+        Publish the trades just applied to a stock's snapshot.
+        Normally only a delta with the next sequence number is sent; a full snapshot goes out for
+        the first update of a stock and then every resync_interval updates. The sequence number
+        only moves on once the update is encoded, so an update that fails leaves no gap.
+        """
+        seq = self.sequences.get(stock_id, 0) + 1
+        trace = tracing.published(trades)
+        if self.updates_since_full.get(stock_id, self.resync_interval) >= self.resync_interval:
+            self.publish_snapshot(stock_id, trace, seq)
+            self.sequences[stock_id] = seq
+            return
+        delta = {"stockId": stock_id, "seq": seq, "epoch": self.epoch,
+                 "trades": [trade.to_dict() for trade in trades]}
+        if trace:
+            delta.update(trace)
+        payload = self.codec.encode_delta(delta)
+        self.sequences[stock_id] = seq
+        self.snapShotSocket.send_multipart([topic(stock_id), payload])
+        self.updates_since_full[stock_id] += 1
+        logger.debug(f"Delta {delta['seq']} sent for Stock {stock_id}.")
+
+    def serve_sync_requests(self):
+        """
+        Answer pending full snapshot requests from snapshot consumers that detected a gap.
+        The request is the stock id; the reply is its full snapshot, or empty if it has none.
+        """
         while True:
-            time.sleep(1)  # Sleep for a second before polling again
             try:
-                socks = dict(self.poller.poll(1000))  # Poll for messages with a timeout of 50 second
-                if self.socket in socks and socks[self.socket] == zmq.POLLIN:
-                    logger.info("Trade data received.")
-                    trade_data = self.socket.recv_string()
-                    trade_data = eval(trade_data)
-                    logger.info(f"Received trade: {trade_data.get('tradeId')} for stock {trade_data.get('stockId')}")
-                    if self.validate_trade(trade_data):
-                        trade = Trade.from_dict(trade_data)
-                        ### Process the trade ###
-                        self.process_trade(trade)
-                        ### Update the TradeSnapShotRegistry with the trade ###
-                        TradeSnapShotRegistry.update_trade(trade.stockId, trade)
-                        logger.info(f"Trade {trade.tradeId} for Stock {trade.stockId} updated in TradeSnapShotRegistry.")
-                        ### Send the updated snapshot to the snapshot publisher ###
-                        snapshot = TradeSnapShotRegistry.get(trade.stockId)
-                        self.snapShotSocket.send_string(f'{snapshot.to_dict()}') ### this can also be persisted to a file/database
-                        logger.info(f"Snapshot sent for Stock {trade.stockId}.")
-                    else:
-                        logger.error(f"Invalid trade discarded: {trade_data.get('tradeId')}")
-                else:
-                    logger.warning("No trade data received. Polling again...")
-                    time.sleep(3)
-                    ideal_count += 1
-                    if ideal_count > IDEAL_THRESHOLD:
-                        logger.warning("No trade data received for a while. Exiting...")
-                        self.shutdown()
-                        logger.info("Total Trade Logged:")
-                        logger.info(TradeRegistry.get_all())
-                        break
-                    continue
-            except KeyboardInterrupt:
-                logger.info("Shutting down subscriber...")
-                break
+                stock_id = self.syncSocket.recv(zmq.NOBLOCK).decode("utf-8")
             except zmq.Again:
-                logger.warning("No message received within the timeout period.")
-            except zmq.ZMQError as e:
-                logger.error(f"ZMQ error: {e}")
-            except ValueError as ve:
-                logger.error(f"Value error: {ve}")
+                return
+            try:
+                snapshot = TradeSnapShotRegistry.get(stock_id).to_dict()
+            except (ValueError, KeyError):
+                self.syncSocket.send(b"")
+                continue
+            snapshot["seq"] = self.sequences.get(stock_id, 0)
+            snapshot["epoch"] = self.epoch
+            self.syncSocket.send(self.codec.encode_snapshot(snapshot))
+            logger.info(f"Resync snapshot {snapshot['seq']} sent for Stock {stock_id}.")
+
+    def receive_batch(self):
+        """
+        Read every message already queued on the socket, without blocking, up to batch_size.
+        Returns the message frames, without their topic frames.
+        """
+        watch = metrics.stopwatch()
+        payloads = []
+        while len(payloads) < self.batch_size:
+            try:
+                payloads.append(recv_payload(self.socket, zmq.NOBLOCK))
+            except zmq.Again:
+                break
+        watch.lap(RECEIVE)
+        return payloads
+
+    def process_batch(self, payloads):
+        """
+        Ingest a batch of trade messages, then update and publish each touched snapshot once.
+
+        :return: The number of trades accepted.
+        """
+        trades_by_stock = {}
+        for payload in payloads:
+            try:
+                trade = self.ingest(payload)
+            except Exception as e:
+                logger.error(f"Error while ingesting trade: {e}")
+                continue
+            if trade is not None:
+                trades_by_stock.setdefault(trade.stockId, []).append(trade)
+        watch = metrics.stopwatch()
+        if self.journal is not None and trades_by_stock:
+            self.journal.append([trade for trades in trades_by_stock.values() for trade in trades])
+            watch.lap(JOURNAL)
+        for stock_id, trades in trades_by_stock.items():
+            TradeSnapShotRegistry.update_trades(stock_id, trades)
+            self.pending_trades.setdefault(stock_id, []).extend(trades)
+        watch.lap(SNAPSHOT)
+        metrics.incr("trade_sub.batches")
+        accepted = sum(len(trades) for trades in trades_by_stock.values())
+        self.conflation_stats["updates"] += accepted
+        self.last_batch_at = time.time()
+        return accepted
+
+    def flush_due_in(self):
+        """
+        Seconds until pending updates must be flushed (0 when a flush is due now, None if nothing is pending).
+        """
+        if not self.pending_trades:
+            return None
+        return max(0.0, self.conflate_interval - (time.monotonic() - self.last_flush))
+
+    def flush_updates(self):
+        """
+        Conflating publisher: publish one update per stock that changed since the last flush,
+        carrying every trade applied to it in the meantime.
+        """
+        watch = metrics.stopwatch()
+        for stock_id in TradeSnapShotRegistry.drain_updated():
+            trades = self.pending_trades.pop(stock_id, None)
+            if trades:
+                self.publish_update(stock_id, trades)
+                self.conflation_stats["published"] += 1
+        self.conflation_stats["coalesced"] = self.conflation_stats["updates"] - self.conflation_stats["published"]
+        self.last_flush = time.monotonic()
+        watch.lap(PUBLISH)
+
+    def consume_trades(self):
+        if self.drain:
+            return self.drain_trades()
+        ideal_count = 0
+        try:
+            while True:
+                time.sleep(1)  # Sleep for a second before polling again
+                try:
+                    socks = dict(self.poller.poll(1000))  # Poll for messages with a timeout of 50 second
+                    if self.syncSocket in socks:
+                        self.serve_sync_requests()
+                    if self.socket in socks and socks[self.socket] == zmq.POLLIN:
+                        logger.info("Trade data received.")
+                        watch = metrics.stopwatch()
+                        payload = recv_payload(self.socket)
+                        watch.lap(RECEIVE)
+                        trade = self.ingest(payload)
+                        if trade is not None:
+                            watch.restart()
+                            if self.journal is not None:
+                                self.journal.append([trade])
+                                watch.lap(JOURNAL)
+                            ### Update the TradeSnapShotRegistry with the trade ###
+                            TradeSnapShotRegistry.update_trade(trade.stockId, trade)
+                            watch.lap(SNAPSHOT)
+                            logger.info(f"Trade {trade.tradeId} for Stock {trade.stockId} updated in TradeSnapShotRegistry.")
+                            ### Send the update to the snapshot publisher ###
+                            self.publish_update(trade.stockId, [trade])
+                            watch.lap(PUBLISH)
+                    else:
+                        if self.syncSocket in socks:
+                            continue
+                        logger.warning("No trade data received. Polling again...")
+                        time.sleep(3)
+                        ideal_count += 1
+                        if ideal_count > IDEAL_THRESHOLD:
+                            logger.warning("No trade data received for a while. Exiting...")
+                            break
+                        continue
+                except KeyboardInterrupt:
+                    logger.info("Shutting down subscriber...")
+                    break
+                except zmq.Again:
+                    logger.warning("No message received within the timeout period.")
+                except zmq.ZMQError as e:
+                    logger.error(f"ZMQ error: {e}")
+                except ValueError as ve:
+                    logger.error(f"Value error: {ve}")
+                except Exception as e:
+                    logger.error(f"Error while consuming trades: {e}")
+        finally:
+            self.shutdown()
+            logger.info(f"Trade store: {self.trade_store.stats()}")
+
+    def drain_trades(self):
+        """
+        High throughput consumer loop.
+        Drains everything queued on the socket (up to batch_size) with non-blocking receives,
+        processes it as one batch and backs off the poll timeout exponentially while idle.
+        """
+        poll_ms = MIN_POLL_MS
+        last_trade_time = time.monotonic()
+        try:
+            while True:
+                try:
+                    socks = dict(self.poller.poll(poll_ms))
+                    if self.syncSocket in socks:
+                        self.serve_sync_requests()
+                    if self.socket in socks and socks[self.socket] == zmq.POLLIN:
+                        payloads = self.receive_batch()
+                        accepted = self.process_batch(payloads)
+                        logger.info(f"Processed batch of {len(payloads)} messages, {accepted} trades accepted.")
+                        poll_ms = MIN_POLL_MS
+                        last_trade_time = time.monotonic()
+                    elif self.syncSocket not in socks:
+                        poll_ms = min(poll_ms * 2, MAX_POLL_MS)
+                        if time.monotonic() - last_trade_time > self.idle_timeout:
+                            logger.warning("No trade data received for a while. Exiting...")
+                            break
+                    if self.journal is not None:
+                        self.journal.maybe_sync()  # the "interval" fsync of the last trades of a burst
+                    flush_due_in = self.flush_due_in()
+                    if flush_due_in == 0:
+                        self.flush_updates()
+                    elif flush_due_in is not None:
+                        poll_ms = max(MIN_POLL_MS, min(poll_ms, int(flush_due_in * 1000)))
+                except KeyboardInterrupt:
+                    logger.info("Shutting down subscriber...")
+                    break
+                except zmq.ZMQError as e:
+                    logger.error(f"ZMQ error: {e}")
+                except Exception as e:
+                    logger.error(f"Error while consuming trades: {e}")
+        finally:
+            try:
+                self.flush_updates()  # the trades applied since the last flush
             except Exception as e:
-                logger.error(f"Error while consuming trades: {e}")
-                
+                logger.error(f"Error while flushing snapshot updates: {e}")
+            logger.info(f"Snapshot conflation: {self.conflation_stats}")
+            self.shutdown()
+            logger.info(f"Trade store: {self.trade_store.stats()}")
 
     def shutdown(self):
+        """
+        Close the journal and the sockets. consume_trades calls it on the way out, however it ends;
+        calling it again does nothing.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.journal is not None:
+            self.journal.close()
+            logger.info(f"Trade journal: {self.journal.stats}")
         self.socket.close()
-        self.context.term()
+        self.syncSocket.close(linger=0)
+        self.snapShotSocket.close(linger=1000)  # give queued snapshots a moment to go out
+        if self.ownsContext:
+            self.context.term()
+            self.snapShotContext.term()
         logger.info("TradeSubscriber shutdown complete.")
 
 if __name__ == "__main__":
     logger.info("Starting TradeSubscriber...")
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
     subscriber = TradeSubscriber()
     subscriber.consume_trades()
\ No newline at end of file
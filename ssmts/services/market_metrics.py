@@ -2,14 +2,53 @@
 from http import HTTPStatus
 import threading
 import time
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 
+from ssmts.config.constants import MAX_BULK_ITEMS, SERVING_MODE, VWAP_HORIZONS
 from ssmts.data.loaders.stock_loader import StockLoader
+from ssmts.data.store.data_version import DataVersion
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.vwap_horizons import horizon_label
 from ssmts.services.consumer.trade_snapshot_sub import TradeSnapshotSubscriber
+from ssmts.services.stream_hub import HEARTBEAT_SECONDS, format_event, stream_hub, stream_options
+from ssmts.utility import tracing
+from ssmts.utility.metrics import CONTENT_TYPE, metrics
+from ssmts.utility.response_cache import ResponseCache
 from ssmts.utility.stock_utils import StockUtils
 
 
 app = Flask(__name__)
+response_cache = ResponseCache()
+# views serving stock prices: a successful response ends the traces of the prices it served
+# (a stock_id view argument limits them to that stock), see ssmts.utility.tracing
+TRACED_VIEWS = {"get_stocks", "get_stock", "calculate_gbce_index", "calculate_vwsp",
+                "calculate_vwap_horizons", "calculate_stock_vwap_horizons"}
+HORIZON_LABELS = [horizon_label(horizon) for horizon in VWAP_HORIZONS]
+
+
+def cached_json(key: str, build):
+    """
+    JSON response for a read endpoint, served from the response cache while the data version is
+    unchanged, with an ETag. A request whose If-None-Match matches the ETag gets a 304.
+
+    :param key: Cache key, the request path.
+    :param build: Callable returning the response data; errors it raises are not cached.
+    :return: The response, or None if ``build`` returned None.
+    """
+    version = DataVersion.current()  # read first: whatever is built next is at least this recent
+    entry = response_cache.get(key, version)
+    if entry is None:
+        data = build()
+        if data is None:
+            return None
+        entry = response_cache.put(key, version, app.json.response(data).get_data())
+    if request.if_none_match.contains(entry.etag):
+        response = app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    else:
+        response = app.response_class(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    return response
+
 
 @app.before_first_request
 def load_data():
@@ -25,19 +64,23 @@ def before_request():
     This function runs before each request.
     You can use it to perform any setup needed for each request.
     """
-    # Example: Check if the request is valid or authenticate the user
-    request.start_time = time.time()  # Store the start time of the request
-    print(f"Request started at: {request.start_time}")
+    request.start_ns = time.perf_counter_ns()  # Store the start time of the request
 
 
 @app.after_request
 def after_request(response):
     """
     This function runs after each request.
-    You can use it to perform any cleanup or logging needed after the request is processed.
+    Records the request latency under the route (e.g. http./stock/<stock_id>) and counts the status code.
+    For streamed responses it is the time until the response starts.
     """
-    response_time = time.time() - request.start_time
-    print(f"Request completed in: {response_time} seconds")
+    if metrics.enabled:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.observe(f"http.{route}", time.perf_counter_ns() - request.start_ns)
+        metrics.incr(f"http.status.{response.status_code}")
+        if request.endpoint in TRACED_VIEWS and response.status_code < 400:
+            stock_id = request.view_args.get("stock_id")
+            tracing.served(StockRegistry.take_traces(None if stock_id is None else [stock_id]))
     return response
 
 
@@ -57,9 +100,7 @@ def get_stocks():
     :return: JSON response with the list of stocks.
     """
     try:
-        # Assuming StockUtils is already imported and available
-        stocks = StockUtils.get_all_stocks()
-        return jsonify(stocks), HTTPStatus.OK
+        return cached_json(request.path, StockUtils.get_all_stocks)
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
     
@@ -72,10 +113,9 @@ def get_stock(stock_id):
     :return: JSON response with the stock details.
     """
     try:
-        # Assuming StockUtils is already imported and available
-        stock = StockUtils.get_stock_details(stock_id)
-        if stock:
-            return jsonify(stock), HTTPStatus.OK
+        response = cached_json(request.path, lambda: StockUtils.get_stock_details(stock_id))
+        if response is not None:
+            return response
         else:
             return jsonify({"error": "Stock not found"}), HTTPStatus.NOT_FOUND
     except ValueError as ve:
@@ -128,9 +168,7 @@ def calculate_gbce_index():
     :return: JSON response with the GBCE All Share Index.
     """
     try:
-        # Assuming StockUtils is already imported and available
-        gbce_index = StockUtils.calculate_all_share_index()
-        return jsonify({"gbce_index": gbce_index}), HTTPStatus.OK
+        return cached_json(request.path, lambda: {"gbce_index": StockUtils.calculate_all_share_index()})
     except ValueError as ve:
         return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
     except Exception as e:
@@ -155,22 +193,183 @@ def calculate_vwsp(stock_id):
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
 
-if __name__ == '__main__':
+@app.route('/trade/vwap-horizons', methods=['GET'])
+def calculate_vwap_horizons():
+    """
+    Volume weighted price of every stock (or of ?stocks=STK1,STK2) over every horizon (1m, 5m,
+    15m and 1h by default, see SSMTS_VWAP_HORIZONS). Stocks without trades get null.
+
+    :return: JSON response with the horizons and the VWAPs per stock.
+    """
+    try:
+        stock_ids = [stock_id for stock_id in request.args.get("stocks", "").split(",") if stock_id] or None
+        stock_count = len(stock_ids) if stock_ids is not None else StockRegistry.count()
+        if stock_count > MAX_BULK_ITEMS:
+            raise ValueError(f"At most {MAX_BULK_ITEMS} stocks per request.")
+        return jsonify({"horizons": HORIZON_LABELS, "vwap": StockUtils.calculate_vwap_horizons(stock_ids)}), HTTPStatus.OK
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@app.route('/trade/vwap-horizons/<stock_id>', methods=['GET'])
+def calculate_stock_vwap_horizons(stock_id):
+    """
+    Volume weighted price of a stock over every horizon.
+
+    :param stock_id: The ID of the stock.
+    :return: JSON response with horizon label -> VWAP (null for horizons without trades).
+    """
+    try:
+        vwaps = StockUtils.calculate_vwap_horizons([stock_id])[stock_id]
+        if vwaps is None:
+            raise ValueError(f"No trades found for stock ID {stock_id}.")
+        return jsonify({"stockId": stock_id, "vwap": vwaps}), HTTPStatus.OK
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Latency histograms, counters and gauges of this process, as text (see ssmts.utility.metrics).
+    """
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/metrics/<action>', methods=['POST'])
+def control_metrics(action):
+    """
+    POST /metrics/reset zeroes the histograms and counters; /metrics/enable and /metrics/disable
+    switch the instrumentation on and off.
+    """
+    if not metrics.control(action):
+        return jsonify({"error": f"Unknown metrics action {action}"}), HTTPStatus.NOT_FOUND
+    return jsonify({"metrics": action, "enabled": metrics.enabled}), HTTPStatus.OK
+
+
+def _parse_pairs(body) -> list:
+    """
+    (stock id, price) pairs of a bulk request body: {"items": [{"stockId": .., "price": ..}, ..]}
+    or a plain list of [stock_id, price] pairs.
+    """
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON list of [stockId, price] pairs or {\"items\": [{\"stockId\": .., \"price\": ..}]}.")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} items per request.")
+    pairs = []
+    for item in items:
+        if isinstance(item, dict):
+            stock_id, price = item.get("stockId"), item.get("price")
+        elif isinstance(item, list) and len(item) == 2:
+            stock_id, price = item
+        else:
+            stock_id, price = None, None
+        # malformed items are reported as per item errors
+        pairs.append((stock_id if isinstance(stock_id, str) else None, price))
+    return pairs
+
+
+@app.route('/calculate/bulk', methods=['POST'])
+def calculate_bulk():
+    """
+    Calculate the dividend yield, P/E ratio and VWSP for many (stock ID, price) pairs at once.
+    Items for stocks that do not exist get their own error; the rest of the request still succeeds.
+
+    :return: JSON response with one result per pair, in request order.
+    """
+    try:
+        pairs = _parse_pairs(request.get_json(silent=True))
+        return jsonify({"results": StockUtils.calculate_metrics_bulk(pairs)}), HTTPStatus.OK
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@app.route('/calculate/grid', methods=['GET'])
+def calculate_grid():
+    """
+    Calculate the dividend yield and P/E ratio of every stock (or of ?stocks=STK1,STK2) at every
+    price of ?prices=10,20.5,30, along with each stock's VWSP.
+
+    :return: JSON response with the price grid and the metrics per stock.
+    """
+    try:
+        try:
+            prices = [float(price) for price in request.args.get("prices", "").split(",") if price.strip()]
+        except ValueError:
+            raise ValueError("Prices must be numbers.")
+        if not prices:
+            raise ValueError("Provide at least one price, e.g. ?prices=10,20.5,30.")
+        stock_ids = [stock_id for stock_id in request.args.get("stocks", "").split(",") if stock_id] or None
+        stock_count = len(stock_ids) if stock_ids is not None else StockRegistry.count()
+        if stock_count * len(prices) > MAX_BULK_ITEMS:
+            raise ValueError(f"At most {MAX_BULK_ITEMS} stock/price combinations per request.")
+        return jsonify(StockUtils.calculate_metrics_grid(prices, stock_ids)), HTTPStatus.OK
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events stream of VWSP and GBCE All Share Index changes, fed by the snapshot consumer.
+    ?stocks=STK1,STK2 (default: every stock), &index=0 to leave out the index, &interval=SECONDS
+    between updates (at least STREAM_MIN_INTERVAL). The first event holds the current values.
+
+    Each client holds a request thread in this mode; for many clients use the asyncio serving mode.
+    """
+    wake = threading.Event()
+    try:
+        subscription = stream_hub.subscribe(wake=wake.set, **stream_options(request.args))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except OverflowError as oe:
+        return jsonify({"error": str(oe)}), HTTPStatus.SERVICE_UNAVAILABLE
+
+    def events():
+        while True:
+            if not wake.wait(HEARTBEAT_SECONDS):
+                yield b": keep-alive\n\n"  # fails once the client has gone
+                continue
+            time.sleep(subscription.send_delay(time.monotonic()))  # updates arriving meanwhile are conflated
+            wake.clear()
+            updates = stream_hub.take(subscription)
+            if updates:
+                yield format_event(updates)
+
+    response = Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    # the server closes the response however the request ends, also when the client went away before the
+    # generator was started, where a finally block in it would never run
+    response.call_on_close(lambda: stream_hub.unsubscribe(subscription))
+    return response
+
 
+def run_flask(host='0.0.0.0', port=5000, snapshot_address="tcp://localhost:5556", debug=True):
+    """
+    Flask serving mode: the snapshot consumer runs in a thread next to the Flask server.
+    """
     # Initialize the TradeSnapshotSubscriber
-    subscriber = TradeSnapshotSubscriber(address="tcp://localhost:5556")
+    subscriber = TradeSnapshotSubscriber(address=snapshot_address, listener=stream_hub.on_vwsp)
 
     # Start the subscriber in a separate thread
-    subscriber_thread = threading.Thread(target=subscriber.consume_snapshots)
+    subscriber_thread = threading.Thread(target=subscriber.consume_snapshots, daemon=True)
     subscriber_thread.start()
 
-    time.sleep(5)  # Give some time for the subscriber to start
-
     # Run the Flask application
-    publisher_thread = threading.Thread(target=app.run(debug=True, host='0.0.0.0', port=5000))
-    publisher_thread.start()
+    app.run(debug=debug, host=host, port=port)
 
-    # Wait for both threads to finish
-    publisher_thread.join()
-    subscriber_thread.join()
-    
\ No newline at end of file
+
+if __name__ == '__main__':
+    if SERVING_MODE == "asyncio":
+        from ssmts.services.async_market_metrics import run
+        run()
+    else:
+        run_flask()
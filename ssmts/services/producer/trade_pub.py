@@ -1,13 +1,19 @@
+import argparse
 import logging
+import math
 import zmq
 import random
 import time
 import uuid
 from datetime import datetime
-from ssmts.config.constants import TradeType
+from itertools import accumulate
+from statistics import NormalDist
+from ssmts.config.constants import TRADE_SIDES, TradeType
 from ssmts.data.loaders.stock_loader import StockLoader
 from ssmts.data.store.stock_registry import StockRegistry
-from ssmts.utility.trade_utils import generate_unique_id
+from ssmts.utility.codec import from_epoch_ns, get_codec, topic
+from ssmts.utility.tracing import TraceSampler
+from ssmts.utility.trade_utils import next_trade_id, require_node_id
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -15,15 +21,95 @@ logger = logging.getLogger(__name__)
 print("Debugging: Logger initialized.")
 logger.info("TradePublisher initialized.")
 
+SEND_HWM = 100_000  # messages zmq may queue per subscriber before the PUB socket drops
+STEP_LEVELS = 256  # price steps are drawn from this many quantiles of the normal distribution
+LOAD_CHUNK_SECONDS = 0.01  # load mode: trades are generated in chunks covering this much schedule
+SLEEP_RESOLUTION = 0.001  # load mode: trades due sooner than this are sent right away
+
+
+class SyntheticTradeGenerator:
+    """
+    Seeded bulk generator of synthetic trades, for load testing.
+
+    * Symbol popularity is skewed (Zipf): the stock of rank r is picked with weight 1 / r^skew,
+      the ranks being a seeded shuffle of the stocks.
+    * Prices follow a multiplicative random walk per stock, starting from its currentPrice and
+      pulled back towards it by ``reversion`` on every trade.
+    * Arrivals are a Poisson process: exponentially distributed gaps at the target rate.
+
+    Each batch draws every field with one bulk call (random.choices with k=, getrandbits) instead of
+    one call per trade; price steps come from a precomputed table of normal quantiles.
+    """
+    def __init__(self, stocks: dict, seed=None, skew=1.0, volatility=0.001, reversion=0.01, max_quantity=100):
+        """
+        :param stocks: Stock id -> reference (current) price.
+        :param volatility: Standard deviation of the log price step of one trade.
+        """
+        if not stocks:
+            raise ValueError("No stocks to generate trades for.")
+        self.rng = random.Random(seed)
+        self.stock_ids = sorted(stocks)
+        self.rng.shuffle(self.stock_ids)  # rank -> stock
+        self.reference = [float(stocks[stock_id]) for stock_id in self.stock_ids]
+        self.prices = list(self.reference)
+        self.cum_weights = list(accumulate(1 / rank ** skew for rank in range(1, len(self.stock_ids) + 1)))
+        normal = NormalDist()
+        self.steps = [math.exp(volatility * normal.inv_cdf((level + 0.5) / STEP_LEVELS)) for level in range(STEP_LEVELS)]
+        self.reversion = reversion
+        self.quantities = range(1, max_quantity + 1)
+
+    def arrivals(self, rate: float, count: int, start: float = 0.0) -> list[float]:
+        """
+        Arrival times (seconds) of the next ``count`` trades of a Poisson process at ``rate`` per second.
+        """
+        expovariate = self.rng.expovariate
+        return list(accumulate((expovariate(rate) for _ in range(count)), initial=start))[1:]
+
+    def batch(self, timestamps: list) -> list[dict]:
+        """
+        One trade per timestamp, as the dicts the codecs encode.
+        """
+        count = len(timestamps)
+        rng = self.rng
+        ranks = rng.choices(range(len(self.stock_ids)), cum_weights=self.cum_weights, k=count)
+        steps = rng.choices(self.steps, k=count)
+        quantities = rng.choices(self.quantities, k=count)
+        sides = format(rng.getrandbits(count), f"0{count}b") if count else ""
+        prices, reference, reversion, stock_ids = self.prices, self.reference, self.reversion, self.stock_ids
+        trades = []
+        for rank, step, quantity, side, timestamp in zip(ranks, steps, quantities, sides, timestamps):
+            price = prices[rank] * step
+            price += (reference[rank] - price) * reversion
+            prices[rank] = price
+            trades.append({
+                "tradeId": next_trade_id(),
+                "timestamp": timestamp,
+                "indicator": TRADE_SIDES[side == "1"],
+                "stockId": stock_ids[rank],
+                "price": max(round(price, 2), 0.01),
+                "quantity": quantity,
+            })
+        return trades
+
+
 class TradePublisher:
-    def __init__(self, address="tcp://localhost:5555", batch_size=10, total_trades= 200, interval=2):
+    def __init__(self, address="tcp://localhost:5555", batch_size=10, total_trades= 200, interval=2, codec=None, context=None,
+                 node_id=None):
+        """
+        :param node_id: Trade id node of this producer (see ssmts.utility.trade_utils), unique among the
+            producers; defaults to SSMTS_TRADE_ID_NODE, one of the two must be set.
+        """
+        self.node_id = require_node_id(node_id)
         StockLoader.load()
-        self.context = zmq.Context()
+        self.codec = get_codec(codec)  # wire format, see ssmts.utility.codec
+        self.context = context or zmq.Context()  # share a context with the subscriber for inproc://
         self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, SEND_HWM)
         self.socket.bind(address)
         self.batch_size = batch_size
         self.total_trades = total_trades
         self.interval = interval
+        self.tracer = TraceSampler()  # stamps sampled trades for end-to-end latency tracing
 
     def generate_trade(self):
         """
@@ -33,7 +119,7 @@ class TradePublisher:
 
         stock = random.choice(list(_stocks.keys()))
         action = random.choice([t.value for t in TradeType])
-        trade_id = generate_unique_id()
+        trade_id = next_trade_id()
         timestamp = datetime.now().isoformat()
         trade = {
             "tradeId": trade_id,
@@ -52,16 +138,91 @@ class TradePublisher:
         for _ in range(self.total_trades):
             trades = [self.generate_trade() for _ in range(self.batch_size)]
             for trade in trades:
-                self.socket.send_string(f'{trade}')
+                self.tracer.stamp(trade)
+                self.socket.send_multipart([topic(trade["stockId"]), self.codec.encode_trade(trade)])
                 logger.info(f"{trade['indicator']} {trade['quantity']} trades of {trade['stockId']} at price: {trade['price']} at {trade['timestamp']}")
                 time.sleep(1) #generate a trade every second
             time.sleep(self.interval)
 
+    def generate_load(self, rate, duration=None, total_trades=None, seed=None, skew=1.0, volatility=0.001,
+                      report_interval=1.0):
+        """
+        Load generator mode: publish synthetic trades (see SyntheticTradeGenerator) as an open loop
+        Poisson process at ``rate`` trades/s. Trades are sent at their scheduled arrival time, and
+        stamped with it; when sending falls behind, the backlog goes out right away instead of
+        the arrivals slowing down. Achieved against target throughput is logged every report_interval.
+
+        :param duration: Seconds of schedule to publish; with total_trades, whichever ends first.
+        :return: trades, seconds, target and achieved rates, shortfall and the worst lag behind schedule.
+        """
+        if duration is None and total_trades is None:
+            raise ValueError("Give a duration or a number of trades.")
+        stocks = {stock_id: stock.currentPrice for stock_id, stock in StockRegistry.get_all().items()}
+        generator = SyntheticTradeGenerator(stocks, seed=seed, skew=skew, volatility=volatility)
+        text_timestamps = self.codec.NAME == "text"  # the text format carries ISO timestamps
+        send, more, encode = self.socket.send, int(zmq.SNDMORE), self.codec.encode_trade
+        stamp = self.tracer.stamp
+        topics = {stock_id: topic(stock_id) for stock_id in stocks}
+        chunk = max(1, int(rate * LOAD_CHUNK_SECONDS))
+        sent = reported = 0
+        max_lag = 0.0
+        schedule = 0.0  # arrival time of the last trade generated, seconds since the start
+        start, start_ns = time.perf_counter(), time.time_ns()
+        last_report = 0.0
+        while total_trades is None or sent < total_trades:
+            count = chunk if total_trades is None else min(chunk, total_trades - sent)
+            arrivals = generator.arrivals(rate, count, schedule)
+            schedule = arrivals[-1]
+            if duration is not None and schedule >= duration:
+                arrivals = [arrival for arrival in arrivals if arrival < duration]
+            timestamps = [start_ns + int(arrival * 1e9) for arrival in arrivals]
+            if text_timestamps:
+                timestamps = [from_epoch_ns(timestamp).isoformat() for timestamp in timestamps]
+            for arrival, trade in zip(arrivals, generator.batch(timestamps)):
+                now = time.perf_counter() - start
+                if arrival - now > SLEEP_RESOLUTION:
+                    time.sleep(arrival - now)
+                elif now - arrival > max_lag:
+                    max_lag = now - arrival
+                stamp(trade)
+                send(topics[trade["stockId"]], more)
+                send(encode(trade))
+            sent += len(arrivals)
+            now = time.perf_counter() - start
+            if now - last_report >= report_interval:
+                logger.info(f"Load: target {rate:,.0f} trades/s, achieved {(sent - reported) / (now - last_report):,.0f} "
+                            f"trades/s over the last {now - last_report:.1f}s ({sent} trades sent, "
+                            f"{max(0.0, now - schedule) * 1e3:.1f}ms behind schedule).")
+                reported, last_report = sent, now
+            if duration is not None and schedule >= duration:
+                break
+        elapsed = time.perf_counter() - start
+        achieved = sent / elapsed if elapsed else 0.0
+        stats = {"trades": sent, "seconds": elapsed, "target_rate": rate, "achieved_rate": achieved,
+                 "shortfall": max(0.0, 1 - achieved / rate), "max_lag_ms": max_lag * 1e3}
+        logger.info(f"Load generation done: {stats}")
+        return stats
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish random trades, or synthetic load with --rate.")
+    parser.add_argument("--rate", type=float, help="load generator mode: target trades/s (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, help="load generator mode: seconds to run (default: until interrupted)")
+    parser.add_argument("--trades", type=int, help="load generator mode: stop after this many trades")
+    parser.add_argument("--seed", type=int, help="load generator mode: random seed, for reproducible load")
+    parser.add_argument("--skew", type=float, default=1.0, help="load generator mode: Zipf exponent of symbol popularity")
+    parser.add_argument("--volatility", type=float, default=0.001, help="load generator mode: log price step per trade")
+    parser.add_argument("--codec", help="wire codec, defaults to SSMTS_WIRE_CODEC")
+    parser.add_argument("--node-id", type=int, help="trade id node of this producer, defaults to SSMTS_TRADE_ID_NODE")
+    args = parser.parse_args()
     logger.info("Starting TradePublisher...")
-    publisher = TradePublisher()
+    publisher = TradePublisher(codec=args.codec, node_id=args.node_id)
     try:
-        publisher.publish_trades()
+        if args.rate:
+            time.sleep(1)  # let subscribers connect
+            duration = args.duration if args.duration is not None or args.trades is not None else math.inf
+            publisher.generate_load(args.rate, duration=duration, total_trades=args.trades, seed=args.seed,
+                                    skew=args.skew, volatility=args.volatility)
+        else:
+            publisher.publish_trades()
     except KeyboardInterrupt:
         logger.info("Shutting down publisher...")
-    
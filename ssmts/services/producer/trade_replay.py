@@ -0,0 +1,247 @@
+"""
+Replays recorded trades on the trade socket, at their recorded pace, N times faster or as fast as possible.
+
+Recordings are read as a stream, never loaded whole:
+    * a trade journal directory (see ssmts.data.store.trade_journal),
+    * JSON Lines, one trade per line: {"tradeId", "stockId", "timestamp", "indicator", "price", "quantity"},
+    * CSV with those columns as header.
+Files ending in .gz are decompressed on the fly. Trade ids in their 19 digit string form are read
+back as the integers they stand for (see ssmts.utility.trade_utils.trade_id_key).
+
+Each trade is sent when its offset from the first recorded trade, divided by the speed, has
+elapsed, so the recorded inter-arrival gaps (and bursts) are kept. By default the timestamps are
+moved to replay time, so the trades fall inside the consumers' VWSP window.
+
+Usage: python -m ssmts.services.producer.trade_replay RECORDING [--speed 1|10|max] [--address ADDRESS]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+
+import zmq
+
+from ssmts.config.constants import TRADE_SIDES
+from ssmts.data.loaders.record_reader import open_text
+from ssmts.data.store.trade_journal import TradeJournal
+from ssmts.utility.codec import from_epoch_ns, get_codec, to_epoch_ns, topic
+from ssmts.utility.tracing import TraceSampler
+from ssmts.utility.trade_utils import trade_id_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEND_HWM = 100_000  # messages zmq may queue per subscriber before the PUB socket drops
+SLEEP_RESOLUTION = 0.001  # trades due sooner than this are sent right away instead of sleeping
+LATE_THRESHOLD = 0.001  # a trade sent more than this after its due time counts as late
+
+
+def _trade(data: dict) -> tuple[int, dict]:
+    return to_epoch_ns(data["timestamp"]), {
+        "tradeId": trade_id_key(data["tradeId"]),
+        "stockId": data["stockId"],
+        "indicator": data["indicator"],
+        "price": float(data["price"]),
+        "quantity": int(data["quantity"]),
+    }
+
+
+def read_jsonl(path: str):
+    """
+    Stream (timestamp ns, trade) from a JSON Lines recording. Blank lines are skipped.
+    """
+    with open_text(path) as file:
+        for line in file:
+            if line.strip():
+                yield _trade(json.loads(line))
+
+
+def read_csv(path: str):
+    """
+    Stream (timestamp ns, trade) from a CSV recording with a header row.
+    """
+    with open_text(path) as file:
+        for row in csv.DictReader(file):
+            yield _trade(row)
+
+
+def read_journal(directory: str):
+    """
+    Stream (timestamp ns, trade) from a trade journal directory, without changing its files.
+    """
+    for frame in TradeJournal(directory).read_frames(truncate=False):
+        stock_ids = frame.stock_ids
+        for trade_id, timestamp, stock, quantity, price, side in zip(
+                frame.trade_ids, frame.timestamps, frame.stocks, frame.quantities, frame.prices, frame.sides):
+            yield timestamp, {"tradeId": trade_id, "stockId": stock_ids[stock], "indicator": TRADE_SIDES[side],
+                              "price": price, "quantity": quantity}
+
+
+def read_recording(path: str):
+    """
+    Stream (timestamp ns, trade) from a recording, picking the reader from the path.
+    """
+    if os.path.isdir(path):
+        return read_journal(path)
+    if path.removesuffix(".gz").endswith(".csv"):
+        return read_csv(path)
+    return read_jsonl(path)
+
+
+def parse_speed(value) -> float:
+    """
+    "max" (or 0) for as fast as possible, otherwise a positive multiple of real time ("10", "10x").
+    """
+    if str(value).lower() in ("max", "0"):
+        return 0.0
+    speed = float(str(value).lower().rstrip("x"))
+    if speed <= 0:
+        raise ValueError("Speed must be positive, or 'max'.")
+    return speed
+
+
+class TradeReplayer:
+    """
+    Publishes a recorded trade stream on the trade socket, like TradePublisher does with random trades.
+    """
+    def __init__(self, recording, address="tcp://localhost:5555", speed=1.0, codec=None, context=None,
+                 retime=True, connect_wait=1.0):
+        """
+        :param recording: Path of a recording (see the module docstring), or an iterable of
+            (timestamp ns, trade dict) in recorded order.
+        :param speed: Multiple of real time; 0 (or "max") sends as fast as possible.
+        :param retime: Move the trade timestamps to the time each trade is sent (keeping their
+            spacing at the replay speed), instead of sending the recorded timestamps.
+        :param connect_wait: Seconds to wait after binding, so subscribers are connected before
+            the first trade goes out.
+        """
+        self.recording = read_recording(recording) if isinstance(recording, str) else recording
+        self.speed = parse_speed(speed)
+        self.codec = get_codec(codec)
+        self.context = context or zmq.Context()
+        self.ownsContext = context is None
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, SEND_HWM)
+        self.socket.bind(address)
+        self.retime = retime
+        self.connect_wait = connect_wait
+        self.tracer = TraceSampler()  # stamps sampled trades for end-to-end latency tracing
+
+    def replay(self) -> dict:
+        """
+        Send every trade of the recording on schedule.
+
+        :return: Replay stats, see report().
+        """
+        if self.connect_wait:
+            time.sleep(self.connect_wait)
+        speed = self.speed
+        text_timestamps = self.codec.NAME == "text"  # the text format carries ISO timestamps
+        send = self.socket.send  # two sends instead of send_multipart, which costs as much as encoding
+        more = int(zmq.SNDMORE)
+        encode = self.codec.encode_trade
+        stamp = self.tracer.stamp
+        topics = {}  # stock id -> topic frame
+        first_ts = None
+        last_offset = 0.0
+        sent = late = 0
+        max_lateness = 0.0
+        recorded_per_second = {}  # recorded second -> trades
+        sent_per_second = {}  # wall clock second of the replay -> trades sent
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        for timestamp, trade in self.recording:
+            if first_ts is None:
+                first_ts = timestamp
+            offset = max((timestamp - first_ts) / 1e9, last_offset)  # out of order trades go out right away
+            last_offset = offset
+            second = int(offset)
+            recorded_per_second[second] = recorded_per_second.get(second, 0) + 1
+            due = offset / speed if speed else 0.0
+            now = time.perf_counter() - start
+            if due - now > SLEEP_RESOLUTION:
+                time.sleep(due - now)
+                now = time.perf_counter() - start
+            elif speed and now - due > LATE_THRESHOLD:
+                late += 1
+                max_lateness = max(max_lateness, now - due)
+            if self.retime:
+                timestamp = start_ns + int(due * 1e9 if speed else now * 1e9)
+            trade["timestamp"] = from_epoch_ns(timestamp).isoformat() if text_timestamps else timestamp
+            stock_id = trade["stockId"]
+            stock_topic = topics.get(stock_id)
+            if stock_topic is None:
+                stock_topic = topics[stock_id] = topic(stock_id)
+            stamp(trade)
+            send(stock_topic, more)
+            send(encode(trade))
+            sent += 1
+            wall_second = int(now)
+            sent_per_second[wall_second] = sent_per_second.get(wall_second, 0) + 1
+        elapsed = time.perf_counter() - start
+        return self.report(sent, last_offset, elapsed, late, max_lateness, recorded_per_second, sent_per_second)
+
+    def report(self, sent, recorded_seconds, elapsed, late, max_lateness, recorded_per_second, sent_per_second) -> dict:
+        """
+        Achieved against target throughput.
+
+        :return: trades; recorded and target durations; target, achieved and peak (busiest second)
+            rates; shortfall (fraction of the target rate not achieved, None at max speed); trades
+            sent more than LATE_THRESHOLD after their due time and the worst lateness.
+        """
+        speed = self.speed
+        target_seconds = recorded_seconds / speed if speed else None
+        target_rate = sent / target_seconds if target_seconds else None
+        achieved_rate = sent / elapsed if elapsed else 0.0
+        return {
+            "trades": sent,
+            "speed": speed or "max",
+            "recorded_seconds": recorded_seconds,
+            "target_seconds": target_seconds,
+            "elapsed_seconds": elapsed,
+            "target_rate": target_rate,
+            "achieved_rate": achieved_rate,
+            "shortfall": max(0.0, 1 - achieved_rate / target_rate) if target_rate else None,
+            "target_peak_rate": max(recorded_per_second.values(), default=0) * speed if speed else None,
+            "achieved_peak_rate": max(sent_per_second.values(), default=0),
+            "late_trades": late,
+            "max_lateness_ms": max_lateness * 1e3,
+        }
+
+    def close(self):
+        self.socket.close(linger=1000)  # let queued trades go out
+        if self.ownsContext:
+            self.context.term()
+
+
+def format_report(stats: dict) -> str:
+    rate = lambda value: "n/a" if value is None else f"{value:,.0f}/s"
+    shortfall = "n/a" if stats["shortfall"] is None else f"{stats['shortfall']:.1%}"
+    return (f"Replayed {stats['trades']} trades at speed {stats['speed']} in {stats['elapsed_seconds']:.2f}s "
+            f"(recorded span {stats['recorded_seconds']:.2f}s)\n"
+            f"  throughput: target {rate(stats['target_rate'])}, achieved {rate(stats['achieved_rate'])}, "
+            f"shortfall {shortfall}\n"
+            f"  busiest second: target {rate(stats['target_peak_rate'])}, achieved {rate(stats['achieved_peak_rate'])}\n"
+            f"  late trades (> {LATE_THRESHOLD * 1e3:g}ms): {stats['late_trades']}, worst {stats['max_lateness_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="trade journal directory, .jsonl or .csv file (optionally .gz)")
+    parser.add_argument("--speed", default="1", help="multiple of real time (1, 10, 0.5...) or 'max'")
+    parser.add_argument("--address", default="tcp://*:5555", help="address the trade socket binds to")
+    parser.add_argument("--codec", default=None, help="wire codec, defaults to SSMTS_WIRE_CODEC")
+    parser.add_argument("--keep-timestamps", action="store_true", help="send the recorded timestamps unchanged")
+    parser.add_argument("--connect-wait", type=float, default=1.0, help="seconds to wait for subscribers to connect")
+    args = parser.parse_args()
+    replayer = TradeReplayer(args.recording, address=args.address, speed=args.speed, codec=args.codec,
+                             retime=not args.keep_timestamps, connect_wait=args.connect_wait)
+    try:
+        print(format_report(replayer.replay()))
+    except KeyboardInterrupt:
+        logger.info("Replay interrupted.")
+    finally:
+        replayer.close()
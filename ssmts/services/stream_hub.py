@@ -0,0 +1,179 @@
+"""
+Server push of live VWSP and GBCE All Share Index updates (Server-Sent Events).
+
+The snapshot consumer calls StreamHub.on_vwsp after each update it applies; the hub fans the
+changed values out to the subscribed clients. Every client has its own pending updates, keyed by
+stock (latest value wins), so a client that reads slowly or asks for a long interval gets fewer,
+conflated updates instead of a growing backlog: what is pending for a client is bounded by the
+stocks it subscribed to. The transports (a generator per client in Flask mode, a coroutine per
+client in asyncio mode) wait for the client's wake-up, honour its minimum interval and send
+everything pending as one event.
+"""
+
+import json
+import threading
+import time
+
+from ssmts.config.constants import STREAM_MAX_CLIENTS, STREAM_MIN_INTERVAL
+from ssmts.data.store.stock_registry import StockRegistry
+
+INDEX_KEY = None  # key of the GBCE All Share Index; the other keys are stock ids
+HEARTBEAT_SECONDS = 15.0  # comment line sent to idle clients, so dead connections are noticed
+STALL_SECONDS = 10.0  # a client whose send buffer stays over the cap this long is disconnected
+MAX_STREAM_STOCKS = 1_000  # stocks one client may list, beyond that subscribe to all of them
+
+
+class StreamSubscription:
+    """
+    One streaming client: what it subscribed to and the updates not sent to it yet.
+    """
+    __slots__ = ('stocks', 'index', 'min_interval', 'pending', 'last_sent', 'wake')
+
+    def __init__(self, stocks, index, min_interval, wake):
+        self.stocks = stocks  # frozenset of stock ids, or None for every stock
+        self.index = index
+        self.min_interval = min_interval
+        self.pending = {}
+        self.last_sent = 0.0  # time.monotonic() of the last update sent
+        self.wake = wake
+
+    def wants(self, key) -> bool:
+        if key is INDEX_KEY:
+            return self.index
+        return self.stocks is None or key in self.stocks
+
+    def send_delay(self, now: float) -> float:
+        """
+        Seconds to wait before the next update may be sent, to keep to the client's rate limit.
+        """
+        return max(0.0, self.last_sent + self.min_interval - now)
+
+
+def stream_options(args) -> dict:
+    """
+    Subscription options from the /stream query: ?stocks=STK1,STK2 (default: every stock),
+    &index=0 to leave out the All Share Index, &interval=SECONDS between updates.
+    """
+    stocks = [stock_id for stock_id in args.get("stocks", "").split(",") if stock_id]
+    if len(stocks) > MAX_STREAM_STOCKS:
+        raise ValueError(f"At most {MAX_STREAM_STOCKS} stocks per stream; leave out ?stocks= to stream all of them.")
+    try:
+        interval = float(args.get("interval", STREAM_MIN_INTERVAL))
+    except ValueError:
+        raise ValueError("Interval must be a number of seconds.")
+    return {
+        "stocks": stocks or None,
+        "index": args.get("index", "1") not in ("0", "false"),
+        "min_interval": max(interval, STREAM_MIN_INTERVAL),
+    }
+
+
+def format_event(updates: dict) -> bytes:
+    """
+    One SSE "update" event carrying every pending value, e.g.
+    ``{"vwsp": {"STK1": 101.5}, "gbce_index": 98.2}``.
+    """
+    data = {"vwsp": {key: value for key, value in updates.items() if key is not INDEX_KEY}}
+    if INDEX_KEY in updates:
+        data["gbce_index"] = updates[INDEX_KEY]
+    return b"event: update\ndata: " + json.dumps(data, separators=(",", ":")).encode() + b"\n\n"
+
+
+class StreamHub:
+    """
+    Fans VWSP and All Share Index changes out to streaming clients.
+    """
+    def __init__(self, max_clients: int = STREAM_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._lock = threading.Lock()  # the consumer publishes from its own thread in Flask mode
+        self._values = {}  # key -> last published value
+        self._by_stock = {}  # stock id -> subscriptions listing it
+        self._all_stocks = set()  # subscriptions to every stock
+        self._index = set()  # subscriptions to the index
+        self.clients = 0
+        self.stats = {"published": 0, "offered": 0, "dropped_clients": 0}
+
+    def subscribe(self, stocks=None, index=True, min_interval=STREAM_MIN_INTERVAL, wake=None) -> StreamSubscription:
+        """
+        Register a client. Its first update holds the current value of everything it subscribed to.
+
+        :param stocks: Stock ids to stream, None for every stock.
+        :param wake: Callable invoked (from the publishing thread) when updates are pending.
+        :raises OverflowError: When the hub already serves max_clients clients.
+        """
+        subscription = StreamSubscription(frozenset(stocks) if stocks is not None else None, index, min_interval, wake)
+        with self._lock:
+            if self.clients >= self.max_clients:
+                raise OverflowError(f"Too many streaming clients (at most {self.max_clients}).")
+            self.clients += 1
+            if subscription.stocks is None:
+                self._all_stocks.add(subscription)
+            else:
+                for stock_id in subscription.stocks:
+                    self._by_stock.setdefault(stock_id, set()).add(subscription)
+            if index:
+                self._index.add(subscription)
+            subscription.pending = {key: value for key, value in self._values.items() if subscription.wants(key)}
+        if subscription.pending and wake is not None:
+            wake()
+        return subscription
+
+    def unsubscribe(self, subscription: StreamSubscription, dropped: bool = False) -> None:
+        """
+        :param dropped: The client was disconnected for falling behind, counted in stats.
+        """
+        with self._lock:
+            if subscription.stocks is None:
+                self._all_stocks.discard(subscription)
+            else:
+                for stock_id in subscription.stocks:
+                    subscribers = self._by_stock.get(stock_id)
+                    if subscribers is not None:
+                        subscribers.discard(subscription)
+                        if not subscribers:
+                            del self._by_stock[stock_id]
+            self._index.discard(subscription)
+            self.clients -= 1
+            if dropped:
+                self.stats["dropped_clients"] += 1
+
+    def publish(self, key, value) -> None:
+        """
+        Offer a new value to the clients subscribed to it; unchanged values are not sent.
+        """
+        with self._lock:
+            if key in self._values and self._values[key] == value:
+                return
+            self._values[key] = value
+            self.stats["published"] += 1
+            groups = (self._index,) if key is INDEX_KEY else (self._all_stocks, self._by_stock.get(key, ()))
+            for subscribers in groups:
+                for subscription in subscribers:
+                    was_idle = not subscription.pending
+                    subscription.pending[key] = value
+                    if was_idle and subscription.wake is not None:
+                        subscription.wake()  # already woken if updates were pending
+                self.stats["offered"] += len(subscribers)
+
+    def on_vwsp(self, stock_id: str, vwsp: float) -> None:
+        """
+        Snapshot consumer listener: a stock's VWSP (and so the All Share Index) changed.
+        """
+        self.publish(stock_id, vwsp)
+        try:
+            self.publish(INDEX_KEY, StockRegistry.all_share_index())
+        except ValueError:
+            pass  # no stocks, or a price the index can not be computed with
+
+    def take(self, subscription: StreamSubscription) -> dict:
+        """
+        Hand over a client's pending updates, and count them as sent now.
+        """
+        with self._lock:
+            updates, subscription.pending = subscription.pending, {}
+        if updates:
+            subscription.last_sent = time.monotonic()
+        return updates
+
+
+stream_hub = StreamHub()  # fed by the market metrics snapshot consumer
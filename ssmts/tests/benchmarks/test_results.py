@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from ssmts.benchmarks import results
+
+
+class TestBenchmarkResults(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {
+            "latency": results.metric(100.0, "us"),
+            "throughput": results.metric(1000.0, "trades/s", higher_is_better=True),
+            "removed": results.metric(5.0, "us"),
+        }
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            document = results.save(self.baseline, path)
+            self.assertIn("python", document["meta"])
+            self.assertEqual(results.load(path), self.baseline)
+
+    def test_compare_flags_regressions_in_both_directions(self):
+        current = {
+            "latency": results.metric(125.0, "us"),
+            "throughput": results.metric(800.0, "trades/s", higher_is_better=True),
+            "added": results.metric(1.0, "us"),
+        }
+        rows = {row["name"]: row for row in results.compare(current, self.baseline, threshold=0.1)}
+        self.assertEqual(set(rows), {"latency", "throughput"})
+        self.assertAlmostEqual(rows["latency"]["slowdown"], 0.25)
+        self.assertAlmostEqual(rows["throughput"]["slowdown"], 0.2)
+        self.assertTrue(rows["latency"]["regression"])
+        self.assertTrue(rows["throughput"]["regression"])
+
+    def test_compare_within_threshold(self):
+        current = {
+            "latency": results.metric(90.0, "us"),
+            "throughput": results.metric(950.0, "trades/s", higher_is_better=True),
+        }
+        rows = results.compare(current, self.baseline, threshold=0.1)
+        self.assertFalse(any(row["regression"] for row in rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,9 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
 import unittest
 from unittest.mock import patch
 from ssmts.data.loaders.stock_loader import StockLoader
@@ -13,6 +19,7 @@ MOCK_DATA = [
     {"stockId": "STK4", "symbol": "GIN", "stockType": "preferred", "lastDivident": 8.0, "fixedDivident": 0.02, "parValue": 100.0, "currentPrice": 90.0},
     {"stockId": "STK5", "symbol": "JOE", "stockType": "common", "lastDivident": 13.0, "fixedDivident": 0.0, "parValue": 250.0, "currentPrice": 110.0},
 ]
+GET_ENTITIES = vars(StockLoader)["getEntities"]  # the real one, before any test class patches it
 
 class TestStockLoader(unittest.TestCase):
 
@@ -67,5 +74,57 @@ class TestStockLoader(unittest.TestCase):
         self.assertEqual(len(StockRegistry.get_all()), 0)
     
 
+class TestStockLoaderFiles(unittest.TestCase):
+
+    def setUp(self):
+        # the real getEntities, whatever another test class left patched; stopped again after each test
+        patcher = patch.object(StockLoader, "getEntities", GET_ENTITIES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = tempfile.mkdtemp()
+        StockRegistry.register()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        StockRegistry.register()
+
+    def _write_csv(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, list(MOCK_DATA[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def test_load_csv_in_chunks(self):
+        path = self._write_csv("universe.csv", MOCK_DATA)
+        with self.assertLogs("ssmts.data.loaders.base_loader", "INFO") as logs:
+            self.assertEqual(StockLoader.load(path, chunk_size=2), 5)
+        self.assertEqual(len(logs.output), 1)  # one summary line, not one per stock
+        stock = StockRegistry.get("STK4")
+        self.assertEqual((stock.symbol, stock.fixedDivident, stock.currentPrice), ("GIN", 0.02, 90.0))
+        self.assertEqual(len(StockRegistry.reference_data()), 5)
+        expected = (100.0 * 120.0 * 80.0 * 90.0 * 110.0) ** (1 / 5)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), expected)
+
+    def test_load_gzipped_jsonl(self):
+        path = os.path.join(self.directory, "universe.jsonl.gz")
+        with gzip.open(path, "wt") as file:
+            for record in MOCK_DATA:
+                file.write(json.dumps(record) + "\n\n")
+        self.assertEqual(StockLoader.load(path), 5)
+        self.assertEqual(StockRegistry.get("STK2").currentPrice, 120.0)
+
+    def test_bad_value_names_the_line(self):
+        rows = [dict(MOCK_DATA[0]), dict(MOCK_DATA[1], parValue="n/a")]
+        with self.assertRaisesRegex(ValueError, "line 3"):
+            StockLoader.load(self._write_csv("bad.csv", rows))
+
+    def test_universe_file_replaces_the_default_stocks(self):
+        path = self._write_csv("universe.csv", MOCK_DATA[:2])
+        with patch("ssmts.data.loaders.stock_loader.STOCK_UNIVERSE", path):
+            self.assertEqual([stock["stockId"] for stock in StockLoader.getEntities()], ["STK1", "STK2"])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime
+
+from ssmts.data.store.columnar_trade_registry import ColumnarTradeRegistry
+from ssmts.models.trade import Trade
+
+
+class TestColumnarTradeRegistry(unittest.TestCase):
+
+    def setUp(self):
+        ColumnarTradeRegistry.register()
+        self.timestamp = datetime(2024, 5, 1, 9, 30, 15, 123456)
+
+    def tearDown(self):
+        ColumnarTradeRegistry.UnregisterAll()
+
+    def _trade(self, trade_id, stock_id="STK1", quantity=10, price=99.5, indicator="BUY"):
+        return Trade(trade_id, stock_id, self.timestamp, quantity, price, indicator)
+
+    def test_add_and_get(self):
+        trade = self._trade("T1", stock_id="STK3", indicator="SELL")
+        ColumnarTradeRegistry.add(trade.tradeId, trade)
+        self.assertEqual(ColumnarTradeRegistry.get("T1"), trade)
+        with self.assertRaises(ValueError):
+            ColumnarTradeRegistry.get("T2")
+
+    def test_overwrite_existing_trade(self):
+        ColumnarTradeRegistry.add("T1", self._trade("T1", quantity=10))
+        ColumnarTradeRegistry.add("T1", self._trade("T1", quantity=20))
+        self.assertEqual(ColumnarTradeRegistry.get("T1").quantity, 20)
+        self.assertEqual(len(ColumnarTradeRegistry.get_all()), 1)
+
+    def test_get_all_is_lazy_mapping(self):
+        for i in range(5):
+            ColumnarTradeRegistry.add(f"T{i}", self._trade(f"T{i}", stock_id=f"STK{i % 2}"))
+        trades = ColumnarTradeRegistry.get_all()
+        self.assertEqual(list(trades), [f"T{i}" for i in range(5)])
+        self.assertEqual(trades["T3"].stockId, "STK1")
+        self.assertNotIn("T9", trades)
+
+    def test_unregister(self):
+        ColumnarTradeRegistry.add("T1", self._trade("T1"))
+        ColumnarTradeRegistry.add("T2", self._trade("T2"))
+        ColumnarTradeRegistry.unregister("T1")
+        self.assertEqual(list(ColumnarTradeRegistry.get_all()), ["T2"])
+        with self.assertRaises(ValueError):
+            ColumnarTradeRegistry.unregister("T1")
+
+    def test_bytes_per_trade(self):
+        self.assertEqual(ColumnarTradeRegistry.bytes_per_trade(), 0.0)
+        for i in range(1000):
+            ColumnarTradeRegistry.add(f"T{i}", self._trade(f"T{i}"))
+        usage = ColumnarTradeRegistry.memory_usage()
+        self.assertEqual(usage["trades"], 1000)
+        self.assertGreater(ColumnarTradeRegistry.bytes_per_trade(), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import math
+import unittest
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.models.stock import Stock
+
+
+class TestStockRegistryAllShareIndex(unittest.TestCase):
+
+    def setUp(self):
+        StockRegistry.register()
+
+    def tearDown(self):
+        StockRegistry.register()
+
+    def _add(self, stock_id, price):
+        StockRegistry.add(stock_id, Stock(stockId=stock_id, currentPrice=price))
+
+    def test_index_follows_price_updates(self):
+        self._add("STK1", 100.0)
+        self._add("STK2", 400.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 200.0)
+
+        StockRegistry.update_stock_price("STK1", 25.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)
+        StockRegistry.update_stock_price("NOPE", 1.0)  # not registered: logged, nothing changes
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)
+
+    def test_replace_and_unregister(self):
+        self._add("STK1", 100.0)
+        self._add("STK2", 400.0)
+        self._add("STK2", 100.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)
+        StockRegistry.unregister("STK2")
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)
+
+    def test_stocks_are_plain_models(self):
+        self._add("STK1", 100.0)
+        with StockRegistry.lock().read:  # setting a price does not go near the registry (or its write side)
+            Stock(stockId="STK1", currentPrice=5.0).set_current_price(7.0)
+            StockRegistry.get("STK1").set_current_price(7.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)  # only update_stock_price moves the index
+
+    def test_large_universe_is_stable(self):
+        for i in range(5000):
+            self._add(f"STK{i}", 1000.0 if i % 2 else 0.001)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 1.0)
+        for i in range(5000):
+            self._add(f"BIG{i}", 1e300)
+        # the plain product of all prices has long overflowed
+        self.assertTrue(math.isinf(math.prod(s.currentPrice for s in StockRegistry.get_all().values())))
+        self.assertAlmostEqual(StockRegistry.all_share_index() / 1e150, 1.0)
+
+    def test_add_many_keeps_the_index_and_reference_data(self):
+        self._add("STK1", 400.0)
+        self.assertEqual(len(StockRegistry.reference_data()), 1)
+        StockRegistry.add_many([("STK1", Stock(stockId="STK1", currentPrice=100.0)),
+                                ("STK2", Stock(stockId="STK2", currentPrice=400.0)),
+                                ("STK2", Stock(stockId="STK2", currentPrice=25.0))])
+        self.assertEqual(len(StockRegistry.get_all()), 2)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 50.0)
+        self.assertEqual(len(StockRegistry.reference_data()), 2)
+        StockRegistry.update_stock_price("STK2", 100.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 100.0)
+
+    def test_invalid_prices(self):
+        with self.assertRaises(ValueError):
+            StockRegistry.all_share_index()
+        self._add("STK1", 0.0)
+        with self.assertRaises(ValueError):
+            StockRegistry.all_share_index()
+        StockRegistry.update_stock_price("STK1", 10.0)
+        self.assertAlmostEqual(StockRegistry.all_share_index(), 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from ssmts.data.store.columnar_trade_registry import ColumnarTradeRegistry
+from ssmts.data.store.trade_journal import TradeJournal, decode_segment, encode_segment
+from ssmts.data.store.trade_registry import TradeRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.trade import Trade
+from ssmts.models.trade_snapshot import TradeSnapShot
+
+
+class TestTradeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = datetime.now().replace(microsecond=0)
+        TradeSnapShotRegistry.register()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        for store in (TradeRegistry, ColumnarTradeRegistry, TradeSnapShotRegistry):
+            store.register()
+
+    def _trades(self, start, count, stock_id="STK1", age=timedelta()):
+        return [Trade(f"T{i}", stock_id, self.now - age, 10 + i % 3, 100.0 + i, "BUY" if i % 2 else "SELL")
+                for i in range(start, start + count)]
+
+    def _journal(self, batches, **options):
+        journal = TradeJournal(self.directory, **options)
+        for batch in batches:
+            journal.append(batch)
+        journal.close()
+        return journal
+
+    def test_recovery_rebuilds_store_snapshots_and_windows(self):
+        old = self._trades(0, 5, "STK2", age=timedelta(days=1))  # outside the VWSP window
+        batches = [self._trades(0, 10) + old, self._trades(10, 10)]
+        self._journal(batches, fsync="always")
+        for store in (TradeRegistry, ColumnarTradeRegistry):
+            store.register()
+            TradeSnapShotRegistry.register()
+            stats = TradeJournal(self.directory).recover(store)
+            self.assertEqual(stats["trades"], 25)
+            self.assertEqual(stats["stocks"], 2)
+            trade = store.get("T12")
+            self.assertEqual((trade.stockId, trade.price, trade.quantity, trade.indicator, trade.timeStamp),
+                             ("STK1", 112.0, 10, "SELL", self.now))
+
+            snapshot = TradeSnapShotRegistry.get("STK1")
+            self.assertEqual([t.tradeId for t in snapshot.trades], [f"T{i}" for i in range(20 - TradeSnapShot.MAX_LENGTH, 20)])
+            stk1 = batches[0][:10] + batches[1]
+            expected = sum(t.price * t.quantity for t in stk1) / sum(t.quantity for t in stk1)
+            self.assertAlmostEqual(TradeSnapShotRegistry.get_vwsp("STK1"), expected)
+            self.assertEqual(len(TradeSnapShotRegistry.get("STK2").trades), 5)
+            with self.assertRaises(ValueError):
+                TradeSnapShotRegistry.get_vwsp("STK2")  # a day old: restored, but out of the window
+            stk1_horizons, stk2_horizons = TradeSnapShotRegistry.get_vwap_horizons_many(["STK1", "STK2"])
+            self.assertAlmostEqual(stk1_horizons["1h"], expected)
+            self.assertIsNone(stk2_horizons["1h"])
+
+    def test_segments_roll_and_stand_alone(self):
+        journal = self._journal([self._trades(i * 10, 10, f"STK{i % 3}") for i in range(6)], segment_bytes=300)
+        self.assertGreater(len(journal.segments()), 1)
+        os.remove(journal.segments()[0])  # e.g. dropped by retention
+        frames = list(TradeJournal(self.directory).read_frames())
+        self.assertEqual([frame.stock_ids[frame.stocks[0]] for frame in frames][-3:], ["STK0", "STK1", "STK2"])
+
+    def test_frames_share_their_segment_stock_table(self):
+        self._journal([self._trades(0, 5, "STK1"), self._trades(5, 5, "STK2"), self._trades(10, 5, "STK1")])
+        frames = list(TradeJournal(self.directory).read_frames())
+        self.assertTrue(all(frame.stock_ids is frames[0].stock_ids for frame in frames))  # not a copy per frame
+        self.assertEqual(frames[0].stock_ids, ["STK1", "STK2"])
+        self.assertEqual([frame.stock_ids[frame.stocks[0]] for frame in frames], ["STK1", "STK2", "STK1"])
+        ColumnarTradeRegistry.add_columns(frames[1].trade_ids, frames[1].stock_ids, frames[1].timestamps,
+                                          frames[1].stocks, frames[1].quantities, frames[1].prices, frames[1].sides)
+        self.assertEqual(ColumnarTradeRegistry.get("T7").stockId, "STK2")
+
+    def test_integer_trade_ids_are_a_column(self):
+        ints = [Trade(2 ** 62 + i, "STK1", self.now, 1, 1.0, "BUY") for i in range(3)]
+        strings = [Trade(str(2 ** 62 + i), "STK1", self.now, 1, 1.0, "BUY") for i in range(3)]
+        self.assertEqual(decode_segment(encode_segment(ints))[0].trade_ids, [2 ** 62, 2 ** 62 + 1, 2 ** 62 + 2])
+        self.assertEqual(decode_segment(encode_segment(strings))[0].trade_ids, [str(2 ** 62 + i) for i in range(3)])
+        self.assertLess(len(encode_segment(ints)), len(encode_segment(strings)))
+        mixed = decode_segment(encode_segment(ints[:1] + strings[1:]))[0]
+        self.assertEqual(mixed.trade_ids, [str(2 ** 62 + i) for i in range(3)])  # stored as strings
+
+        self._journal([ints])
+        TradeJournal(self.directory).recover(TradeRegistry)
+        self.assertEqual(TradeRegistry.get(2 ** 62 + 1).tradeId, 2 ** 62 + 1)
+
+    def test_reads_version_1_segments(self):
+        segment = bytearray(encode_segment(self._trades(0, 3)))
+        segment[4] = 1  # version 1 segments have the same layout, with string trade ids only
+        self.assertEqual(decode_segment(bytes(segment))[0].trade_ids, ["T0", "T1", "T2"])
+        segment[4] = 9
+        with self.assertRaises(ValueError):
+            decode_segment(bytes(segment))
+
+    def test_torn_frame_is_truncated_and_journal_continues(self):
+        journal = self._journal([self._trades(0, 10), self._trades(10, 10)], fsync="never")
+        path = journal.segments()[0]
+        intact = os.path.getsize(path)
+        with open(path, "r+b") as file:
+            file.truncate(intact - 7)  # the second frame was cut short by a crash
+
+        recovered = TradeJournal(self.directory)
+        self.assertEqual(recovered.recover(ColumnarTradeRegistry)["trades"], 10)
+        self.assertLess(os.path.getsize(path), intact - 7)
+        recovered.append(self._trades(20, 5))
+        recovered.close()
+
+        ColumnarTradeRegistry.register()
+        self.assertEqual(TradeJournal(self.directory).recover(ColumnarTradeRegistry)["trades"], 15)
+        self.assertIn("T22", ColumnarTradeRegistry.get_all())
+
+    def test_corrupt_frame_stops_replay(self):
+        journal = self._journal([self._trades(0, 10), self._trades(10, 10)])
+        path = journal.segments()[0]
+        with open(path, "r+b") as file:
+            file.seek(-3, os.SEEK_END)
+            file.write(b"\xff\xff\xff")
+        frames = list(TradeJournal(self.directory).read_frames(truncate=False))
+        self.assertEqual(len(frames), 1)
+
+    def test_rejects_unknown_fsync_policy_and_nul_ids(self):
+        with self.assertRaises(ValueError):
+            TradeJournal(self.directory, fsync="sometimes")
+        journal = TradeJournal(self.directory)
+        with self.assertRaises(ValueError):
+            journal.append([Trade("T\x00", "STK9", self.now, 1, 1.0, "BUY")])
+        self.assertNotIn("STK9", journal.stock_table)
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from ssmts.data.store.trade_registry import TradeRegistry
+from ssmts.models.trade import Trade
+
+
+def make_trade(i, age=timedelta(), stock_id="STK1"):
+    return Trade(f"T{i}", stock_id, datetime.now() - age, 1 + i % 5, 100.0 + i, "BUY" if i % 2 else "SELL")
+
+
+class TestTradeRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        TradeRegistry.register()
+
+    def tearDown(self):
+        TradeRegistry.configure_retention()
+        TradeRegistry.register()
+        shutil.rmtree(self.directory)
+
+    def test_unlimited_by_default(self):
+        TradeRegistry.configure_retention()
+        for i in range(50):
+            TradeRegistry.add(f"T{i}", make_trade(i))
+        stats = TradeRegistry.stats()
+        self.assertEqual((stats["trades"], stats["evicted"]), (50, 0))
+        self.assertGreater(stats["bytes"], 50 * 100)
+
+    def test_unlimited_store_keeps_a_running_byte_estimate(self):
+        TradeRegistry.configure_retention()
+        TradeRegistry.add("T0", make_trade(0))
+        TradeRegistry.add_many((f"T{i}", make_trade(i)) for i in range(1, 20))
+        TradeRegistry.add("T5", Trade(10 ** 30, "STK1", datetime.now(), 1, 1.0, "BUY"))  # overwritten, with a longer id
+        TradeRegistry.unregister("T7")
+        expected = sum(map(TradeRegistry._trade_bytes, TradeRegistry.get_all().values()))
+        with patch.object(TradeRegistry, "_trade_bytes", side_effect=AssertionError("stats() walked the store")):
+            self.assertEqual(TradeRegistry.stats()["bytes"], expected)
+
+    def test_count_limit_evicts_the_oldest_trades(self):
+        TradeRegistry.configure_retention(max_trades=10)
+        for i in range(25):
+            TradeRegistry.add(f"T{i}", make_trade(i))
+        self.assertEqual(list(TradeRegistry.get_all()), [f"T{i}" for i in range(15, 25)])
+        self.assertEqual(TradeRegistry.stats()["evicted"], 15)
+        with self.assertRaises(ValueError):
+            TradeRegistry.get("T0")
+
+    def test_age_limit_uses_trade_timestamps(self):
+        TradeRegistry.configure_retention(max_age=60)
+        for i in range(5):
+            TradeRegistry.add(f"T{i}", make_trade(i, age=timedelta(minutes=5)))
+        TradeRegistry.add("T5", make_trade(5))
+        self.assertEqual(list(TradeRegistry.get_all()), ["T5"])
+
+    def test_byte_budget(self):
+        TradeRegistry.configure_retention(max_trades=1000)
+        for i in range(20):
+            TradeRegistry.add(f"T{i}", make_trade(i))
+        budget = TradeRegistry.stats()["bytes"] // 2
+        TradeRegistry.configure_retention(max_bytes=budget)
+        TradeRegistry.add("T20", make_trade(20))
+        stats = TradeRegistry.stats()
+        self.assertLessEqual(stats["bytes"], budget)
+        self.assertIn("T20", TradeRegistry.get_all())
+        self.assertEqual(stats["trades"] + stats["evicted"], 21)
+
+    def test_overwritten_trade_is_kept_until_its_latest_version_expires(self):
+        TradeRegistry.configure_retention(max_trades=3)
+        for i in range(3):
+            TradeRegistry.add(f"T{i}", make_trade(i))
+        TradeRegistry.add("T0", make_trade(0))  # T0 is now the newest
+        TradeRegistry.add("T3", make_trade(3))
+        self.assertEqual(sorted(TradeRegistry.get_all()), ["T0", "T2", "T3"])
+        self.assertEqual(TradeRegistry.stats()["evicted"], 1)
+
+    def test_evicted_trades_are_spilled_and_still_found_by_id(self):
+        TradeRegistry.configure_retention(max_trades=10, spill_dir=self.directory, spill_segment_trades=8)
+        for i in range(40):
+            TradeRegistry.add(f"T{i}", make_trade(i, stock_id=f"STK{i % 3}"))
+        stats = TradeRegistry.stats()
+        self.assertEqual((stats["trades"], stats["evicted"], stats["spilled"]), (10, 30, 30))
+        self.assertEqual(stats["spill_segments"], 3)
+        self.assertGreater(stats["spill_disk_bytes"], 0)
+        for i in (0, 7, 23, 29):  # in segments and still pending
+            trade = TradeRegistry.get(f"T{i}")
+            self.assertEqual((trade.stockId, trade.price, trade.quantity), (f"STK{i % 3}", 100.0 + i, 1 + i % 5))
+        self.assertEqual(TradeRegistry.get("T35").tradeId, "T35")
+        with self.assertRaises(ValueError):
+            TradeRegistry.get("T99")
+
+    def test_spilled_integer_ids_are_found(self):
+        TradeRegistry.configure_retention(max_trades=2, spill_dir=self.directory, spill_segment_trades=4)
+        for i in range(10):
+            trade = make_trade(i)
+            trade.tradeId = 2 ** 62 + i
+            TradeRegistry.add(trade.tradeId, trade)
+        self.assertEqual(TradeRegistry.get(2 ** 62 + 1).price, 101.0)
+        with self.assertRaises(ValueError):
+            TradeRegistry.get(2 ** 62 + 99)
+
+    def test_register_empties_the_spill(self):
+        TradeRegistry.configure_retention(max_trades=1, spill_dir=self.directory, spill_segment_trades=1)
+        for i in range(3):
+            TradeRegistry.add(f"T{i}", make_trade(i))
+        TradeRegistry.register()
+        self.assertEqual(TradeRegistry.stats()["spilled"], 0)
+        with self.assertRaises(ValueError):
+            TradeRegistry.get("T0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import random
+import unittest
+from datetime import datetime
+
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.data.store.vwap_horizons import VwapHorizons, horizon_label
+from ssmts.models.trade import Trade
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVwapHorizons(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(10_000.0)
+        self.horizons = VwapHorizons(horizons=(60, 300, 900, 3600), clock=self.clock)
+
+    def test_every_horizon_from_one_feed(self):
+        self.horizons.add(10_000.0 - 3000, 40.0, 100)  # 1h only
+        self.horizons.add(10_000.0 - 600, 30.0, 100)  # 15m and 1h
+        self.horizons.add(10_000.0 - 120, 20.0, 100)  # 5m, 15m and 1h
+        self.horizons.add(10_000.0 - 10, 10.0, 100)  # every horizon
+        self.assertEqual(self.horizons.vwaps(), {"1m": 10.0, "5m": 15.0, "15m": 20.0, "1h": 25.0})
+
+    def test_buckets_expire_per_horizon(self):
+        self.horizons.add(10_000.0, 10.0, 100)
+        self.horizons.add(10_030.5, 20.0, 300)
+        self.clock.now = 10_075.0  # the first trade left the 1m horizon only
+        vwaps = self.horizons.vwaps()
+        self.assertAlmostEqual(vwaps["1m"], 20.0)
+        self.assertAlmostEqual(vwaps["1h"], (10 * 100 + 20 * 300) / 400)
+        self.clock.now = 10_000.0 + 3700
+        self.assertEqual(self.horizons.vwaps(), {"1m": None, "5m": None, "15m": None, "1h": None})
+        self.assertEqual(self.horizons.head, 10_030)  # reads do not move the ring forward
+        self.horizons.add(self.clock.now, 5.0, 10)  # the ring is reused after the gap
+        self.assertEqual(self.horizons.volume, [10, 10, 10, 10])
+        self.assertEqual(self.horizons.vwaps()["1h"], 5.0)
+
+    def test_late_and_stale_trades(self):
+        self.horizons.add(10_000.0, 10.0, 100)
+        self.horizons.add(10_000.0 - 200, 20.0, 100)  # late, outside the 1m horizon
+        self.horizons.add(10_000.0 - 4000, 99.0, 100)  # older than the longest horizon
+        vwaps = self.horizons.vwaps()
+        self.assertEqual(vwaps["1m"], 10.0)
+        self.assertEqual(vwaps["5m"], 15.0)
+        self.assertEqual(vwaps["1h"], 15.0)
+
+    def test_matches_recomputing_from_raw_trades(self):
+        rng = random.Random(3)
+        trades = []
+        now = 10_000.0
+        for _ in range(5000):
+            now += rng.expovariate(1 / 3)  # about one trade every 3 seconds, with gaps
+            trade = (now - rng.uniform(0, 30), rng.uniform(1, 100), rng.randint(1, 500))
+            self.clock.now = now
+            self.horizons.add(*trade)
+            trades.append(trade)
+            if rng.random() < 0.05:
+                vwaps = self.horizons.vwaps()
+                for horizon in (60, 300, 900, 3600):
+                    # trades are bucketed by second: a bucket is in the horizon if it is one of its newest
+                    first = int(now) - horizon + 1
+                    inside = [(price, quantity) for ts, price, quantity in trades if int(ts) >= first]
+                    volume = sum(quantity for _, quantity in inside)
+                    expected = sum(price * quantity for price, quantity in inside) / volume if volume else None
+                    if expected is None:
+                        self.assertIsNone(vwaps[horizon_label(horizon)])
+                    else:
+                        self.assertAlmostEqual(vwaps[horizon_label(horizon)], expected, places=6)
+
+    def test_coarser_buckets(self):
+        horizons = VwapHorizons(horizons=(60, 300), bucket_seconds=10, clock=self.clock)
+        self.assertEqual(horizons.size, 30)
+        horizons.add(10_000.0, 10.0, 100)
+        self.clock.now = 10_065.0  # same bucket boundary rules, in 10 second steps
+        self.assertEqual(horizons.vwaps(), {"1m": None, "5m": 10.0})
+
+    def test_invalid_horizons(self):
+        with self.assertRaises(ValueError):
+            VwapHorizons(horizons=())
+        with self.assertRaises(ValueError):
+            VwapHorizons(horizons=(60, 45), bucket_seconds=10)
+        with self.assertRaises(ValueError):
+            VwapHorizons(bucket_seconds=0)
+
+    def test_horizon_labels(self):
+        self.assertEqual([horizon_label(h) for h in (60, 300, 900, 3600, 90, 7200)],
+                         ["1m", "5m", "15m", "1h", "90s", "2h"])
+
+
+class TestTradeSnapShotRegistryVwapHorizons(unittest.TestCase):
+
+    def setUp(self):
+        TradeSnapShotRegistry.register()
+
+    def tearDown(self):
+        TradeSnapShotRegistry.register()
+
+    def test_reads_share_the_read_lock(self):
+        TradeSnapShotRegistry.update_trade("STK1", Trade("T1", "STK1", datetime.now(), 10, 7.0, "BUY"))
+        with TradeSnapShotRegistry.lock().read:  # e.g. another reader: taking the write side would fail here
+            self.assertEqual(TradeSnapShotRegistry.get_vwap_horizons_many(["STK1"])[0]["1m"], 7.0)
+
+    def test_update_trade_feeds_the_horizons(self):
+        for i in range(40):
+            trade = Trade(f"T{i}", "STK1", datetime.now(), 1 if i < 20 else 3, 10.0 if i < 20 else 20.0, "BUY")
+            TradeSnapShotRegistry.update_trade("STK1", trade)
+        TradeSnapShotRegistry.update_trades("STK2", [Trade("T40", "STK2", datetime.now(), 5, 7.0, "SELL")])
+        vwaps, vwaps_2, missing = TradeSnapShotRegistry.get_vwap_horizons_many(["STK1", "STK2", "NOPE"])
+        for horizon in ("1m", "5m", "15m", "1h"):
+            self.assertAlmostEqual(vwaps[horizon], (20 * 10 + 60 * 20) / 80)
+            self.assertEqual(vwaps_2[horizon], 7.0)
+        self.assertIsNone(missing)
+
+
+if __name__ == '__main__':
+    unittest.main()
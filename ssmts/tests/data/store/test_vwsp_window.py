@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime, timedelta
+
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.data.store.vwsp_window import VwspWindow
+from ssmts.models.trade import Trade
+from ssmts.models.trade_snapshot import TradeSnapShot
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVwspWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1_000.0)
+        self.window = VwspWindow(window_seconds=900, clock=self.clock)
+
+    def test_vwsp_over_window(self):
+        self.window.add(900.0, 10.0, 100)
+        self.window.add(950.0, 20.0, 300)
+        self.assertAlmostEqual(self.window.vwsp(), (10 * 100 + 20 * 300) / 400)
+
+    def test_trades_expire_as_time_advances(self):
+        self.window.add(200.0, 10.0, 100)
+        self.window.add(950.0, 20.0, 300)
+        self.clock.now = 1_150.0  # the first trade is now older than 15 minutes
+        self.assertAlmostEqual(self.window.vwsp(), 20.0)
+        self.assertEqual(len(self.window), 1)
+        self.clock.now = 2_000.0
+        with self.assertRaises(ValueError):
+            self.window.vwsp()
+        self.assertEqual(self.window.notional, 0.0)
+
+    def test_stale_trades_are_ignored(self):
+        self.window.add(50.0, 10.0, 100)
+        self.assertEqual(len(self.window), 0)
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            VwspWindow(window_seconds=0)
+
+
+class TestTradeSnapShotRegistryVwsp(unittest.TestCase):
+
+    def setUp(self):
+        TradeSnapShotRegistry.register()
+
+    def tearDown(self):
+        TradeSnapShotRegistry.register()
+
+    def test_window_is_not_limited_to_snapshot_length(self):
+        for i in range(40):
+            trade = Trade(f"T{i}", "STK1", datetime.now(), 1 if i < 20 else 3, 10.0 if i < 20 else 20.0, "BUY")
+            TradeSnapShotRegistry.update_trade("STK1", trade)
+        self.assertEqual(len(TradeSnapShotRegistry.get("STK1").trades), 15)
+        self.assertAlmostEqual(TradeSnapShotRegistry.get_vwsp("STK1"), (20 * 10 + 60 * 20) / 80)
+
+    def test_register_resets_the_windows(self):
+        TradeSnapShotRegistry.update_trade("STK1", Trade("T1", "STK1", datetime.now(), 10, 50.0, "BUY"))
+        TradeSnapShotRegistry.register()
+        with self.assertRaises(ValueError):
+            TradeSnapShotRegistry.get_vwsp("STK1")
+        self.assertEqual(TradeSnapShotRegistry.get_vwap_horizons_many(["STK1"]), [None])
+        self.assertEqual(TradeSnapShotRegistry.drain_updated(), [])
+        # a snapshot of older trades is not filtered out by the dropped window's last timestamp
+        snapshot = TradeSnapShot("STK1", datetime.now(), [Trade("T0", "STK1", datetime.now() - timedelta(seconds=5), 10, 40.0, "BUY")])
+        TradeSnapShotRegistry.add("STK1", snapshot)
+        self.assertAlmostEqual(TradeSnapShotRegistry.get_vwsp("STK1"), 40.0)
+
+    def test_reads_share_the_read_lock(self):
+        TradeSnapShotRegistry.update_trade("STK1", Trade("T1", "STK1", datetime.now(), 10, 50.0, "BUY"))
+        with TradeSnapShotRegistry.lock().read:  # e.g. another reader: taking the write side would fail here
+            self.assertAlmostEqual(TradeSnapShotRegistry.get_vwsp("STK1"), 50.0)
+            self.assertEqual(TradeSnapShotRegistry.get_vwsp_many(["STK1", "NOPE"]), [50.0, None])
+
+    def test_unknown_stock(self):
+        with self.assertRaises(ValueError):
+            TradeSnapShotRegistry.get_vwsp("NOPE")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime
+
+from ssmts.models.compact import CompactStock, CompactTrade, CompactTradeSnapShot
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.models.trade_snapshot import TradeSnapShot
+
+
+class TestCompactModels(unittest.TestCase):
+
+    def setUp(self):
+        self.timestamp = datetime(2024, 5, 1, 9, 30, 15, 123456)
+        self.trade_data = {
+            "tradeId": "T1",
+            "stockId": "STK1",
+            "timestamp": self.timestamp.isoformat(),
+            "quantity": 10,
+            "price": 99.5,
+            "indicator": "BUY",
+        }
+
+    def test_trade_has_no_dict(self):
+        trade = CompactTrade.from_dict(self.trade_data)
+        self.assertFalse(hasattr(trade, "__dict__"))
+        self.assertIsInstance(trade, Trade)
+
+    def test_trade_timestamp_is_lazy(self):
+        trade = CompactTrade.from_dict(self.trade_data)
+        self.assertIsNone(trade._timeStamp)
+        self.assertEqual(trade.to_dict(), self.trade_data)  # round trip without parsing
+        self.assertIsNone(trade._timeStamp)
+        self.assertEqual(trade.timeStamp, self.timestamp)
+
+    def test_trade_epoch_ns_timestamp(self):
+        epoch_ns = int(self.timestamp.timestamp()) * 1_000_000_000 + self.timestamp.microsecond * 1000
+        trade = CompactTrade("T1", "STK1", epoch_ns, 10, 99.5, "BUY")
+        self.assertEqual(trade.timeStamp, self.timestamp)
+        self.assertEqual(trade, Trade.from_dict(self.trade_data))
+
+    def test_trade_validation(self):
+        for field, value in (("quantity", 0), ("price", -1), ("indicator", "HOLD")):
+            with self.assertRaises(ValueError):
+                CompactTrade.from_dict(dict(self.trade_data, **{field: value}))
+
+    def test_stock(self):
+        stock = CompactStock.from_dict({"stockId": "STK1", "symbol": "TEA", "stockType": "common",
+                                        "lastDivident": 0.0, "fixedDivident": 0.0, "parValue": 100.0,
+                                        "currentPrice": 100.0})
+        self.assertFalse(hasattr(stock, "__dict__"))
+        self.assertIsInstance(stock, Stock)
+        self.assertEqual(stock, Stock.from_dict(stock.to_dict()))
+        with self.assertRaises(ValueError):
+            stock.set_current_price(-1)
+
+    def test_snapshot(self):
+        snapshot = CompactTradeSnapShot.from_dict({
+            "stockId": "STK1",
+            "snapshot_time": self.timestamp.isoformat(),
+            "trades": [dict(self.trade_data, tradeId=f"T{i}") for i in range(20)],
+        })
+        self.assertIsInstance(snapshot, TradeSnapShot)
+        self.assertEqual(len(snapshot.trades), TradeSnapShot.MAX_LENGTH)
+        self.assertEqual(snapshot.snapshot_time, self.timestamp)
+        self.assertEqual(snapshot.to_dict()["trades"][-1]["tradeId"], "T19")
+
+
+if __name__ == '__main__':
+    unittest.main()
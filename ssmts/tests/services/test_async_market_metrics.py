@@ -0,0 +1,158 @@
+import asyncio
+import contextlib
+import io
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import zmq
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.async_market_metrics import AsyncWsgiServer, stream_updates
+from ssmts.services.consumer.async_trade_snapshot_sub import AsyncTradeSnapshotSubscriber
+from ssmts.services.market_metrics import app
+from ssmts.services.stream_hub import stream_hub
+from ssmts.utility.codec import BinaryCodec, topic
+
+
+class TestAsyncMarketMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    async def _get(self, reader, writer, path):
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+        await writer.drain()
+        status = (await reader.readline()).decode()
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        return int(status.split()[1]), headers, body
+
+    def test_serves_flask_routes_over_keep_alive(self):
+        async def scenario():
+            server = AsyncWsgiServer(app, "127.0.0.1", 0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = [await self._get(reader, writer, path) for path in ("/", "/no-such-route")]
+            writer.close()
+            await server.close()
+            return responses
+
+        with contextlib.redirect_stdout(io.StringIO()):  # the request hooks print
+            (status, headers, body), (missing, _, _) = asyncio.run(scenario())
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["connection"], "keep-alive")
+        self.assertIn("Welcome", json.loads(body)["message"])
+        self.assertEqual(missing, 404)
+
+    def _exchange(self, request: bytes):
+        """
+        Send raw bytes on a new connection; the status code and the rest of what the server sent until it closed.
+        """
+        async def scenario():
+            server = AsyncWsgiServer(app, "127.0.0.1", 0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            await server.close()
+            return response
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = asyncio.run(scenario())
+        return int(response.split(b" ")[1]), response
+
+    def test_chunked_bodies_are_refused(self):
+        smuggled = b"GET /no-such-route HTTP/1.1\r\nHost: test\r\n\r\n"
+        status, response = self._exchange(
+            b"POST /calculate/bulk HTTP/1.1\r\nHost: test\r\nTransfer-Encoding: chunked\r\n\r\n"
+            + f"{len(smuggled):x}\r\n".encode() + smuggled + b"\r\n0\r\n\r\n")
+        self.assertEqual(status, 501)
+        self.assertEqual(response.count(b"HTTP/1.1"), 1)  # the chunk was not served as a request
+        self.assertIn(b"Connection: close", response)
+
+    def test_bodies_over_the_limit_are_refused(self):
+        with patch("ssmts.services.async_market_metrics.MAX_REQUEST_BODY", 10):
+            status, _ = self._exchange(b"POST /calculate/bulk HTTP/1.1\r\nHost: test\r\nContent-Length: 11\r\n\r\n")
+        self.assertEqual(status, 413)
+
+    def test_malformed_requests_get_a_400(self):
+        for request in (b"GET /\r\n\r\n",  # no version
+                        b"GET / HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+                        b"GET / HTTP/1.1\r\nContent-Length: 1, 2\r\n\r\n",
+                        b"GET / HTTP/1.1\r\nContent-Length: 0\r\nContent-Length: 5\r\n\r\n",
+                        b"GET / HTTP/1.1\r\nContent-Length : 5\r\n\r\n",
+                        b"GET / HTTP/1.1\r\nno colon\r\n\r\n",
+                        b"GET /" + b"a" * 70_000 + b" HTTP/1.1\r\n\r\n"):
+            status, response = self._exchange(request)
+            self.assertEqual(status, 400, request[:60])
+            self.assertIn("error", json.loads(response.partition(b"\r\n\r\n")[2]))
+
+    def test_stream_pushes_updates_until_shutdown(self):
+        async def scenario():
+            server = AsyncWsgiServer(app, "127.0.0.1", 0, streams={"/stream": stream_updates})
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /stream?stocks=STRM1&index=0 HTTP/1.1\r\nHost: test\r\n\r\n")
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            clients = stream_hub.clients
+            stream_hub.publish("STRM1", 1.5)
+            event = await asyncio.wait_for(reader.readuntil(b"\n\n"), 5)
+            await server.close()
+            closed = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return head, clients, event, closed
+
+        head, clients, event, closed = asyncio.run(scenario())
+        self.assertTrue(head.startswith(b"HTTP/1.1 200"))
+        self.assertIn(b"text/event-stream", head)
+        self.assertEqual(clients, 1)
+        self.assertEqual(json.loads(event.split(b"data: ")[1]), {"vwsp": {"STRM1": 1.5}})
+        self.assertEqual(closed, b"")
+        self.assertEqual(stream_hub.clients, 0)
+
+    def test_consumer_applies_snapshots_on_the_event_loop(self):
+        context = zmq.Context()
+        publisher = context.socket(zmq.PUB)
+        port = publisher.bind_to_random_port("tcp://127.0.0.1")
+        codec = BinaryCodec()
+        snapshot = codec.encode_snapshot({"stockId": "STK1", "snapshot_time": datetime.now(), "seq": 1, "trades": [
+            {"tradeId": "T1", "stockId": "STK1", "timestamp": datetime.now(), "indicator": "BUY", "price": 42.0, "quantity": 10}]})
+
+        async def scenario():
+            subscriber = AsyncTradeSnapshotSubscriber(address=f"tcp://127.0.0.1:{port}", syncAddress="tcp://127.0.0.1:1")
+            consumer = asyncio.create_task(subscriber.consume_snapshots())
+            for _ in range(200):
+                publisher.send_multipart([topic("STK1"), snapshot])
+                await asyncio.sleep(0.01)
+                if subscriber.sequences.get("STK1"):
+                    break
+            subscriber.stop()
+            consumer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await consumer
+            subscriber.close()
+            return subscriber.sequences
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sequences = asyncio.run(scenario())
+        publisher.close(linger=0)
+        context.term()
+        self.assertEqual(sequences, {"STK1": 1})
+        self.assertEqual(StockRegistry.get("STK1").currentPrice, 42.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import contextlib
+import io
+import unittest
+from datetime import datetime
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.services.market_metrics import app, response_cache, stream
+from ssmts.services.stream_hub import stream_hub
+from ssmts.utility.metrics import metrics
+
+
+class TestMarketMetricsResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        StockRegistry.register()
+        StockRegistry.add("STK1", Stock(stockId="STK1", stockType="common", lastDivident=8.0, parValue=100.0,
+                                        currentPrice=100.0))
+        response_cache.clear()
+        self.client = app.test_client()
+        self.quiet = contextlib.redirect_stdout(io.StringIO())  # the request hooks print
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        StockRegistry.register()
+        response_cache.clear()
+
+    def test_not_modified_until_the_data_changes(self):
+        for path in ("/stocks", "/stock/STK1", "/gbce-all-share-index"):
+            first = self.client.get(path)
+            self.assertEqual(first.status_code, 200)
+            etag = first.headers["ETag"]
+            again = self.client.get(path, headers={"If-None-Match": etag})
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again.get_data(), b"")
+
+        StockRegistry.update_stock_price("STK1", 50.0)
+        changed = self.client.get("/gbce-all-share-index", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertAlmostEqual(changed.get_json()["gbce_index"], 50.0)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_responses_are_served_from_the_cache(self):
+        body = self.client.get("/stock/STK1").get_data()
+        hits = response_cache.stats["hits"]
+        self.assertEqual(self.client.get("/stock/STK1").get_data(), body)
+        self.assertEqual(response_cache.stats["hits"], hits + 1)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get("/stock/NOPE").status_code, 400)
+        self.assertEqual(len(response_cache), 0)
+
+
+class TestMarketMetricsStream(unittest.TestCase):
+
+    def test_stream_starts_with_current_values(self):
+        stream_hub.publish("FLSK1", 5.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = app.test_client()
+            response = client.get("/stream?stocks=FLSK1&index=0", buffered=False)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(next(iter(response.response)), b'event: update\ndata: {"vwsp":{"FLSK1":5.0}}\n\n')
+            response.close()
+            self.assertEqual(client.get("/stream?interval=soon").status_code, 400)
+        self.assertEqual(stream_hub.clients, 0)
+
+    def test_stream_closed_before_it_started_unsubscribes(self):
+        with app.test_request_context("/stream?stocks=FLSK1"):
+            response = stream()  # the test client would start the generator
+        self.assertEqual(stream_hub.clients, 1)
+        response.close()  # the client went away before the first event
+        self.assertEqual(stream_hub.clients, 0)
+
+
+class TestMarketMetricsInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        StockRegistry.register()
+        self.client = app.test_client()
+        metrics.enable()
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.enable()
+        metrics.reset()
+
+    def test_routes_are_timed(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.client.get("/stock/NOPE")
+            self.client.get("/stock/NOPE")
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["histograms"]["http./stock/<stock_id>"]["count"], 2)
+        self.assertEqual(snapshot["counters"]["http.status.400"], 2)
+        text = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn('ssmts_latency_seconds_count{name="http./stock/<stock_id>"} 2', text)
+
+    def test_reset_and_switch_off(self):
+        self.client.get("/")
+        self.assertEqual(self.client.post("/metrics/reset").status_code, 200)
+        self.assertNotIn("http./", metrics.snapshot()["histograms"])  # the reset request itself is counted
+        self.assertFalse(self.client.post("/metrics/disable").get_json()["enabled"])
+        self.client.get("/")
+        self.assertNotIn("http./", metrics.snapshot()["histograms"])
+        self.assertTrue(self.client.post("/metrics/enable").get_json()["enabled"])
+        self.assertEqual(self.client.post("/metrics/explode").status_code, 404)
+
+
+class TestMarketMetricsVwapHorizons(unittest.TestCase):
+
+    def setUp(self):
+        StockRegistry.register()
+        for stock_id in ("STK1", "STK2"):
+            StockRegistry.add(stock_id, Stock(stockId=stock_id, stockType="common", lastDivident=8.0, parValue=100.0,
+                                              currentPrice=100.0))
+        TradeSnapShotRegistry.register()
+        TradeSnapShotRegistry.update_trades("STK1", [Trade("T1", "STK1", datetime.now(), 100, 10.0, "BUY"),
+                                                     Trade("T2", "STK1", datetime.now(), 300, 20.0, "SELL")])
+        self.client = app.test_client()
+        self.quiet = contextlib.redirect_stdout(io.StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    def test_all_horizons_of_many_stocks(self):
+        body = self.client.get("/trade/vwap-horizons").get_json()
+        self.assertEqual(body["horizons"], ["1m", "5m", "15m", "1h"])
+        self.assertEqual(body["vwap"]["STK1"], {"1m": 17.5, "5m": 17.5, "15m": 17.5, "1h": 17.5})
+        self.assertIsNone(body["vwap"]["STK2"])
+        body = self.client.get("/trade/vwap-horizons?stocks=STK2,NOPE").get_json()
+        self.assertEqual(body["vwap"], {"STK2": None, "NOPE": None})
+
+    def test_one_stock(self):
+        response = self.client.get("/trade/vwap-horizons/STK1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["vwap"]["1h"], 17.5)
+        self.assertEqual(self.client.get("/trade/vwap-horizons/STK2").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import zmq
+
+from ssmts.data.store.trade_registry import TradeRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.consumer.sharded_trade_sub import ShardedTradeSubscriber, shard_for, worker_addresses
+from ssmts.utility.codec import BinaryCodec, MessageType, recv_payload, subscriptions, topic
+
+
+class TestShardedTradeSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.context = zmq.Context()
+        self.router = ShardedTradeSubscriber(shards=3)
+        self.router.shardSockets = []
+        self.pulls = []
+        for shard in range(3):
+            push = self.context.socket(zmq.PUSH)
+            push.bind(f"inproc://test-shard-{shard}")
+            pull = self.context.socket(zmq.PULL)
+            pull.connect(f"inproc://test-shard-{shard}")
+            self.router.shardSockets.append(push)
+            self.pulls.append(pull)
+        self.codec = BinaryCodec()
+
+    def tearDown(self):
+        for sock in self.router.shardSockets + self.pulls:
+            sock.close(linger=0)
+        self.context.term()
+
+    def test_shard_for_is_stable_and_in_range(self):
+        shards = {stock_id: shard_for(stock_id, 4) for stock_id in (f"STK{i}" for i in range(100))}
+        self.assertTrue(all(0 <= shard < 4 for shard in shards.values()))
+        self.assertEqual(len(set(shards.values())), 4)
+        self.assertEqual(shards, {stock_id: shard_for(stock_id, 4) for stock_id in shards})
+
+    def test_worker_addresses_do_not_overlap(self):
+        ports = [address for shard in range(4) for address in worker_addresses(shard, base_port=6000).values()]
+        self.assertEqual(len(ports), len(set(ports)))
+
+    def test_route_keeps_a_stock_on_its_shard(self):
+        for i in range(12):
+            stock_id = f"STK{i % 4}"
+            payload = self.codec.encode_trade({"tradeId": f"T{i}", "stockId": stock_id, "timestamp": datetime.now(),
+                                               "indicator": "BUY", "price": 10.0, "quantity": 1})
+            shard = self.router.route([topic(stock_id), payload])
+            self.assertEqual(shard, shard_for(stock_id, 3))
+            self.assertEqual(self.pulls[shard].recv_multipart(), [topic(stock_id), payload])
+        self.assertEqual(sum(self.router.routed), 12)
+
+    def test_route_untagged_message(self):
+        payload = self.codec.encode_trade({"tradeId": "T1", "stockId": "STK7", "timestamp": datetime.now(),
+                                           "indicator": "BUY", "price": 10.0, "quantity": 1})
+        self.assertEqual(self.router.route([payload]), shard_for("STK7", 3))
+
+    def test_route_discards_unreadable_messages(self):
+        self.assertEqual(self.router.route([b"garbage"]), -1)
+        self.assertEqual(sum(self.router.routed), 0)
+
+    def test_route_forwards_frames_as_received(self):
+        payload = self.codec.encode_trade({"tradeId": 1, "stockId": "STK2", "timestamp": datetime.now(),
+                                           "indicator": "BUY", "price": 10.0, "quantity": 1})
+        frames = [zmq.Frame(topic("STK2")), zmq.Frame(payload)]
+        shard = self.router.route(frames)
+        self.assertEqual(self.router.topic_shards, {topic("STK2"): shard_for("STK2", 3)})
+        self.assertEqual(self.pulls[shard].recv_multipart(), [topic("STK2"), payload])
+
+
+class TestShardedWorkers(unittest.TestCase):
+    """
+    Two workers run as threads of this process, behind the real router and snapshot proxy.
+    """
+    STOCKS = ("STK1", "STK2", "STK3", "STK4", "STK5")
+
+    def setUp(self):
+        port = 20000 + os.getpid() % 20000  # a range of local ports unlikely to be in use
+        self.codec = BinaryCodec()
+        self.context = zmq.Context()
+        self.publisher = self.context.socket(zmq.PUB)
+        self.publisher.bind(f"tcp://127.0.0.1:{port}")
+        self.router = ShardedTradeSubscriber(address=f"tcp://127.0.0.1:{port}", shards=2, base_port=port + 10,
+                                             snapShotPubAddress=f"tcp://127.0.0.1:{port + 1}",
+                                             snapShotSyncAddress=f"tcp://127.0.0.1:{port + 2}",
+                                             idle_timeout=1, worker_class=threading.Thread, codec="binary")
+        self.snapshots = self.context.socket(zmq.SUB)
+        for subscription in subscriptions():
+            self.snapshots.setsockopt(zmq.SUBSCRIBE, subscription)
+        self.snapshots.connect(f"tcp://127.0.0.1:{port + 1}")
+
+    def tearDown(self):
+        self.snapshots.close(linger=0)
+        self.publisher.close(linger=0)
+        self.context.term()
+        TradeRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    def test_snapshots_of_every_shard_are_merged(self):
+        self.assertEqual({shard_for(stock_id, 2) for stock_id in self.STOCKS}, {0, 1})
+        router = threading.Thread(target=self.router.consume_trades)
+        router.start()
+        updated, trade_id = set(), 0
+        deadline = time.monotonic() + 10
+        while updated != set(self.STOCKS) and time.monotonic() < deadline:
+            for stock_id in self.STOCKS:  # again until the slow joining subscriptions are all up
+                trade_id += 1
+                self.publisher.send_multipart([topic(stock_id), self.codec.encode_trade(
+                    {"tradeId": trade_id, "stockId": stock_id, "timestamp": datetime.now(), "indicator": "BUY",
+                     "price": 10.0, "quantity": 1})])
+            while self.snapshots.poll(50):
+                msg_type, message = self.codec.decode(recv_payload(self.snapshots))
+                self.assertIn(msg_type, (MessageType.SNAPSHOT, MessageType.DELTA))
+                updated.add(message["stockId"])
+        router.join(timeout=15)  # the workers exit once idle, then the router
+        self.assertFalse(router.is_alive())
+        self.assertEqual(updated, set(self.STOCKS))
+        self.assertTrue(all(self.router.routed))  # both shards had trades
+        self.assertEqual(set(self.router.topic_shards), {topic(stock_id) for stock_id in self.STOCKS})
+
+
+if __name__ == '__main__':
+    unittest.main()
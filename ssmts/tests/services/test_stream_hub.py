@@ -0,0 +1,85 @@
+import json
+import unittest
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.models.stock import Stock
+from ssmts.services.stream_hub import INDEX_KEY, StreamHub, format_event, stream_options
+
+
+class TestStreamHub(unittest.TestCase):
+
+    def setUp(self):
+        self.hub = StreamHub(max_clients=3)
+        self.wakes = []
+
+    def tearDown(self):
+        StockRegistry.register()
+
+    def _subscribe(self, **kwargs):
+        return self.hub.subscribe(wake=lambda: self.wakes.append(1), **kwargs)
+
+    def test_updates_reach_subscribed_clients_only(self):
+        stk1 = self._subscribe(stocks=["STK1"], index=False)
+        everything = self._subscribe()
+        self.hub.publish("STK1", 10.0)
+        self.hub.publish("STK2", 20.0)
+        self.hub.publish(INDEX_KEY, 14.0)
+        self.assertEqual(self.hub.take(stk1), {"STK1": 10.0})
+        self.assertEqual(self.hub.take(everything), {"STK1": 10.0, "STK2": 20.0, INDEX_KEY: 14.0})
+        self.assertEqual(self.hub.take(stk1), {})
+
+    def test_pending_updates_are_conflated(self):
+        client = self._subscribe(stocks=["STK1"])
+        for price in (10.0, 11.0, 12.0):
+            self.hub.publish("STK1", price)
+        self.assertEqual(len(self.wakes), 1)  # woken once, until the updates are taken
+        self.assertEqual(self.hub.take(client), {"STK1": 12.0})
+
+    def test_unchanged_values_are_not_sent(self):
+        client = self._subscribe(stocks=["STK1"])
+        self.hub.publish("STK1", 10.0)
+        self.hub.take(client)
+        self.hub.publish("STK1", 10.0)
+        self.assertEqual(self.hub.take(client), {})
+
+    def test_new_client_gets_current_values(self):
+        self.hub.publish("STK1", 10.0)
+        self.hub.publish("STK2", 20.0)
+        client = self._subscribe(stocks=["STK2"], index=False)
+        self.assertEqual(self.wakes, [1])
+        self.assertEqual(self.hub.take(client), {"STK2": 20.0})
+
+    def test_client_limit_and_unsubscribe(self):
+        clients = [self._subscribe(stocks=["STK1"]) for _ in range(3)]
+        with self.assertRaises(OverflowError):
+            self._subscribe()
+        self.hub.unsubscribe(clients[0])
+        self.hub.publish("STK1", 10.0)
+        self.assertEqual(self.hub.take(clients[0]), {})
+        self.assertEqual(self.hub.clients, 2)
+        self._subscribe()
+
+    def test_on_vwsp_publishes_the_index(self):
+        StockRegistry.register()
+        StockRegistry.add("STK1", Stock(stockId="STK1", currentPrice=100.0))
+        StockRegistry.add("STK2", Stock(stockId="STK2", currentPrice=400.0))
+        client = self._subscribe()
+        self.hub.on_vwsp("STK1", 100.0)
+        self.assertAlmostEqual(self.hub.take(client)[INDEX_KEY], 200.0)
+
+    def test_stream_options_and_event_format(self):
+        options = stream_options({"stocks": "STK1,STK2", "index": "0", "interval": "0"})
+        self.assertEqual(options["stocks"], ["STK1", "STK2"])
+        self.assertFalse(options["index"])
+        self.assertGreater(options["min_interval"], 0)  # clients can not go below the minimum
+        with self.assertRaises(ValueError):
+            stream_options({"interval": "soon"})
+
+        event = format_event({"STK1": 10.0, INDEX_KEY: 12.0})
+        self.assertTrue(event.startswith(b"event: update\ndata: "))
+        self.assertTrue(event.endswith(b"\n\n"))
+        self.assertEqual(json.loads(event.split(b"data: ")[1]), {"vwsp": {"STK1": 10.0}, "gbce_index": 12.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import time
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+
+import zmq
+
+from ssmts.services.producer.trade_pub import SyntheticTradeGenerator, TradePublisher
+from ssmts.utility.codec import BinaryCodec, recv_payload, subscriptions
+from ssmts.utility.trade_utils import parse_id
+
+STOCKS = {"STK1": 100.0, "STK2": 50.0, "STK3": 250.0, "STK4": 10.0}
+
+
+class TestSyntheticTradeGenerator(unittest.TestCase):
+
+    def _trades(self, seed, count=2000, **options):
+        generator = SyntheticTradeGenerator(STOCKS, seed=seed, **options)
+        return generator.batch(list(range(count)))
+
+    def test_same_seed_same_trades(self):
+        fields = lambda trades: [(t["stockId"], t["price"], t["quantity"], t["indicator"]) for t in trades]
+        self.assertEqual(fields(self._trades(7)), fields(self._trades(7)))
+        self.assertNotEqual(fields(self._trades(7)), fields(self._trades(8)))
+
+    def test_popularity_is_skewed(self):
+        counts = Counter(trade["stockId"] for trade in self._trades(1, count=20_000, skew=1.5))
+        frequencies = sorted(counts.values(), reverse=True)
+        self.assertEqual(len(frequencies), len(STOCKS))
+        self.assertGreater(frequencies[0], 2.5 * frequencies[1])  # 2^1.5 = 2.8 expected
+        uniform = Counter(trade["stockId"] for trade in self._trades(1, count=20_000, skew=0))
+        self.assertLess(max(uniform.values()), 1.1 * min(uniform.values()))
+
+    def test_prices_walk_around_the_current_price(self):
+        trades = self._trades(3, count=20_000, volatility=0.01)
+        for stock_id, reference in STOCKS.items():
+            prices = [trade["price"] for trade in trades if trade["stockId"] == stock_id]
+            self.assertGreater(len(set(prices)), 10)
+            self.assertLess(abs(sum(prices) / len(prices) / reference - 1), 0.2)
+        self.assertEqual({trade["indicator"] for trade in trades}, {"BUY", "SELL"})
+        self.assertTrue(all(1 <= trade["quantity"] <= 100 for trade in trades))
+
+    def test_poisson_arrivals_at_the_target_rate(self):
+        arrivals = SyntheticTradeGenerator(STOCKS, seed=5).arrivals(1000, 10_000, start=2.0)
+        self.assertEqual(arrivals, sorted(arrivals))
+        self.assertGreater(arrivals[0], 2.0)
+        self.assertAlmostEqual((arrivals[-1] - 2.0) / len(arrivals), 0.001, delta=0.0001)
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def test_publishes_at_the_target_rate(self):
+        context = zmq.Context()
+        subscriber = context.socket(zmq.SUB)
+        for prefix in subscriptions():
+            subscriber.setsockopt(zmq.SUBSCRIBE, prefix)
+        publisher = TradePublisher(address="inproc://test-load", codec="binary", context=context, node_id=1)
+        subscriber.connect("inproc://test-load")
+        time.sleep(0.05)
+        try:
+            stats = publisher.generate_load(2000, duration=0.3, seed=1, report_interval=0.1)
+            self.assertGreater(stats["trades"], 400)
+            self.assertGreaterEqual(stats["seconds"], 0.28)
+            self.assertLess(stats["shortfall"], 0.5)
+            codec = BinaryCodec()
+            trades = [codec.decode(recv_payload(subscriber, zmq.NOBLOCK))[1] for _ in range(stats["trades"])]
+            self.assertEqual(len({trade["tradeId"] for trade in trades}), stats["trades"])
+            self.assertIsInstance(trades[0]["tradeId"], int)
+            self.assertTrue(all(parse_id(trade["tradeId"])["node_id"] == 1 for trade in trades))
+            self.assertLess(abs(trades[0]["timestamp"] - datetime.now()), timedelta(seconds=5))
+        finally:
+            subscriber.close(linger=0)
+            publisher.socket.close(linger=0)
+            context.term()
+
+
+if __name__ == '__main__':
+    unittest.main()
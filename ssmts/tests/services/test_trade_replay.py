@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import zmq
+
+from ssmts.data.store.trade_journal import TradeJournal
+from ssmts.models.trade import Trade
+from ssmts.services.producer.trade_replay import TradeReplayer, parse_speed, read_recording
+from ssmts.utility.codec import BinaryCodec, TextCodec, from_epoch_ns, recv_payload, subscriptions, to_epoch_ns
+from ssmts.utility.trade_utils import format_id
+
+START = datetime(2024, 3, 1, 9, 30)
+FIELDS = ("tradeId", "stockId", "timestamp", "indicator", "price", "quantity")
+
+
+def recorded_trades(gaps=(0.0, 0.1, 0.0, 0.2)):
+    trades, offset = [], 0.0
+    for i, gap in enumerate(gaps):
+        offset += gap
+        trades.append({"tradeId": f"T{i}", "stockId": f"STK{i % 2}", "timestamp": (START + timedelta(seconds=offset)).isoformat(),
+                       "indicator": "BUY" if i % 2 else "SELL", "price": 10.0 + i, "quantity": 5 + i})
+    return trades
+
+
+class TestRecordings(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.trades = recorded_trades()
+        self.expected = [(to_epoch_ns(trade["timestamp"]), {k: v for k, v in trade.items() if k != "timestamp"})
+                         for trade in self.trades]
+
+    def _read(self, path):
+        return [(timestamp, {k: v for k, v in trade.items() if k != "timestamp"})
+                for timestamp, trade in read_recording(path)]
+
+    def test_jsonl_recording(self):
+        path = os.path.join(self.directory, "trades.jsonl")
+        with open(path, "w") as file:
+            file.write("\n".join(json.dumps(trade) for trade in self.trades) + "\n\n")
+        self.assertEqual(self._read(path), self.expected)
+
+    def test_csv_recording(self):
+        path = os.path.join(self.directory, "trades.csv")
+        with open(path, "w") as file:
+            file.write(",".join(FIELDS) + "\n")
+            file.writelines(",".join(str(trade[field]) for field in FIELDS) + "\n" for trade in self.trades)
+        self.assertEqual(self._read(path), self.expected)
+
+    def test_journal_recording(self):
+        journal = TradeJournal(os.path.join(self.directory, "journal"), fsync="never")
+        journal.append([Trade(trade["tradeId"], trade["stockId"], datetime.fromisoformat(trade["timestamp"]),
+                              trade["quantity"], trade["price"], trade["indicator"]) for trade in self.trades])
+        journal.close()
+        self.assertEqual(self._read(os.path.join(self.directory, "journal")), self.expected)
+
+    def test_string_form_trade_ids_are_read_as_integers(self):
+        path = os.path.join(self.directory, "trades.jsonl")
+        with open(path, "w") as file:
+            file.write(json.dumps(dict(self.trades[0], tradeId=format_id(2 ** 62))) + "\n")
+            file.write(json.dumps(dict(self.trades[1], tradeId=2 ** 62 + 1)) + "\n")
+        self.assertEqual([trade["tradeId"] for _, trade in read_recording(path)], [2 ** 62, 2 ** 62 + 1])
+
+    def test_parse_speed(self):
+        self.assertEqual(parse_speed("max"), 0.0)
+        self.assertEqual(parse_speed("10x"), 10.0)
+        self.assertEqual(parse_speed(0.5), 0.5)
+        with self.assertRaises(ValueError):
+            parse_speed("-2")
+
+
+class TestTradeReplayer(unittest.TestCase):
+
+    def setUp(self):
+        self.context = zmq.Context()
+        self.subscriber = self.context.socket(zmq.SUB)
+        for prefix in subscriptions():
+            self.subscriber.setsockopt(zmq.SUBSCRIBE, prefix)
+        self.subscriber.setsockopt(zmq.RCVTIMEO, 2000)
+
+    def tearDown(self):
+        self.subscriber.close(linger=0)
+        self.context.term()
+
+    def _replay(self, speed, codec="binary", **kwargs):
+        recording = [(to_epoch_ns(trade["timestamp"]), trade) for trade in recorded_trades()]
+        replayer = TradeReplayer(recording, address="inproc://test-replay", speed=speed, codec=codec,
+                                 context=self.context, connect_wait=0, **kwargs)
+        self.subscriber.connect("inproc://test-replay")
+        time.sleep(0.05)
+        try:
+            stats = replayer.replay()
+        finally:
+            replayer.close()
+        codec = BinaryCodec() if codec == "binary" else TextCodec()
+        received = [codec.decode(recv_payload(self.subscriber))[1] for _ in range(stats["trades"])]
+        return stats, received
+
+    def test_keeps_the_recorded_gaps_at_the_replay_speed(self):
+        stats, received = self._replay(speed=2, retime=True)
+        self.assertEqual([trade["tradeId"] for trade in received], ["T0", "T1", "T2", "T3"])
+        self.assertAlmostEqual(stats["recorded_seconds"], 0.3)
+        self.assertAlmostEqual(stats["target_seconds"], 0.15)
+        self.assertGreaterEqual(stats["elapsed_seconds"], 0.145)
+        self.assertEqual(stats["target_peak_rate"], 8)  # every trade within the first recorded second, at 2x
+        gaps = [(to_epoch_ns(b["timestamp"]) - to_epoch_ns(a["timestamp"])) / 1e9 for a, b in zip(received, received[1:])]
+        for gap, expected in zip(gaps, (0.05, 0.0, 0.1)):
+            self.assertAlmostEqual(gap, expected, delta=0.001)
+        self.assertLess(abs(to_epoch_ns(received[0]["timestamp"]) - time.time_ns()) / 1e9, 5)
+
+    def test_max_speed_keeps_recorded_timestamps(self):
+        stats, received = self._replay(speed="max", codec="text", retime=False)
+        self.assertEqual(stats["speed"], "max")
+        self.assertIsNone(stats["shortfall"])
+        self.assertLess(stats["elapsed_seconds"], 0.3)
+        self.assertEqual([from_epoch_ns(to_epoch_ns(trade["timestamp"])) for trade in received],
+                         [datetime.fromisoformat(trade["timestamp"]) for trade in recorded_trades()])
+
+    def test_reports_shortfall_against_the_target_rate(self):
+        replayer = TradeReplayer([], address="inproc://test-report", speed=10, context=self.context, connect_wait=0)
+        stats = replayer.report(1000, 10.0, 2.0, 3, 0.004, {0: 400, 1: 600}, {0: 500, 1: 500})
+        replayer.close()
+        self.assertEqual(stats["target_rate"], 1000)
+        self.assertEqual(stats["achieved_rate"], 500)
+        self.assertEqual(stats["shortfall"], 0.5)
+        self.assertEqual(stats["target_peak_rate"], 6000)
+        self.assertEqual(stats["achieved_peak_rate"], 500)
+        self.assertEqual(stats["max_lateness_ms"], 4.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.consumer.trade_snapshot_sub import TradeSnapshotSubscriber
+from ssmts.utility.codec import BinaryCodec
+
+
+class TestTradeSnapshotSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.subscriber = TradeSnapshotSubscriber(address="tcp://localhost:15556", syncAddress="tcp://localhost:15557")
+        self.codec = BinaryCodec()
+
+    def tearDown(self):
+        self.subscriber.socket.close(linger=0)
+        self.subscriber.context.term()
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    def _trade(self, trade_id, price):
+        return {"tradeId": trade_id, "stockId": "STK1", "timestamp": datetime.now(),
+                "indicator": "BUY", "price": price, "quantity": 10}
+
+    def _snapshot(self, seq, trades, epoch=1):
+        return self.codec.encode_snapshot({"stockId": "STK1", "snapshot_time": datetime.now(), "seq": seq,
+                                           "epoch": epoch, "trades": trades})
+
+    def _delta(self, seq, trades, epoch=1):
+        return self.codec.encode_delta({"stockId": "STK1", "seq": seq, "epoch": epoch, "trades": trades})
+
+    def test_deltas_are_applied_in_sequence(self):
+        self.subscriber.handle_message(self._snapshot(1, [self._trade("T1", 10.0)]))
+        self.subscriber.handle_message(self._delta(2, [self._trade("T2", 20.0)]))
+        self.subscriber.handle_message(self._delta(2, [self._trade("T2", 20.0)]))  # duplicate
+        self.assertEqual(self.subscriber.sequences["STK1"], 2)
+        self.assertEqual(len(TradeSnapShotRegistry.get("STK1").trades), 2)
+        self.assertAlmostEqual(StockRegistry.get("STK1").currentPrice, 15.0)
+
+    def test_gap_triggers_resync(self):
+        self.subscriber.handle_message(self._snapshot(1, [self._trade("T1", 10.0)]))
+        resync = {"stockId": "STK1", "snapshot_time": datetime.now(), "seq": 4,
+                  "trades": [self._trade("T1", 10.0), self._trade("T2", 30.0)]}
+        with patch.object(self.subscriber, "request_snapshot", return_value=resync) as request:
+            self.subscriber.handle_message(self._delta(4, [self._trade("T4", 50.0)]))
+        request.assert_called_once_with("STK1")
+        self.assertEqual(self.subscriber.sequences["STK1"], 4)
+        self.assertNotIn("STK1", self.subscriber.stale)
+
+    def test_failed_resync_waits_for_full_snapshot(self):
+        self.subscriber.handle_message(self._snapshot(1, [self._trade("T1", 10.0)]))
+        with patch.object(self.subscriber, "request_snapshot", return_value=None):
+            self.subscriber.handle_message(self._delta(3, [self._trade("T3", 50.0)]))
+            self.subscriber.handle_message(self._delta(4, [self._trade("T4", 50.0)]))
+        self.assertIn("STK1", self.subscriber.stale)
+        self.assertEqual(self.subscriber.sequences["STK1"], 1)
+        self.subscriber.handle_message(self._snapshot(5, [self._trade("T5", 40.0)]))
+        self.assertNotIn("STK1", self.subscriber.stale)
+        self.assertEqual(self.subscriber.sequences["STK1"], 5)
+
+    def test_publisher_restart_resets_the_sequence(self):
+        self.subscriber.handle_message(self._snapshot(1, [self._trade("T1", 10.0)]))
+        for seq in range(2, 50):
+            self.subscriber.handle_message(self._delta(seq, [self._trade(f"T{seq}", 10.0)]))
+        self.assertEqual(self.subscriber.sequences["STK1"], 49)
+        # the trade consumer restarts: numbering starts again at 1, with a full snapshot
+        self.subscriber.handle_message(self._snapshot(1, [self._trade("T50", 30.0)], epoch=2))
+        self.subscriber.handle_message(self._delta(2, [self._trade("T51", 30.0)], epoch=2))
+        self.assertEqual((self.subscriber.sequences["STK1"], self.subscriber.epochs["STK1"]), (2, 2))
+        self.assertEqual([t.tradeId for t in TradeSnapShotRegistry.get("STK1").trades][-2:], ["T50", "T51"])
+        # a restarted publisher's delta seen before its snapshot resyncs instead of being dropped
+        resync = {"stockId": "STK1", "snapshot_time": datetime.now(), "seq": 1, "epoch": 3,
+                  "trades": [self._trade("T52", 40.0)]}
+        with patch.object(self.subscriber, "request_snapshot", return_value=resync) as request:
+            self.subscriber.handle_message(self._delta(3, [self._trade("T53", 40.0)], epoch=3))
+        request.assert_called_once_with("STK1")
+        self.assertEqual((self.subscriber.sequences["STK1"], self.subscriber.epochs["STK1"]), (1, 3))
+        self.assertNotIn("STK1", self.subscriber.stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import zmq
+
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.services.consumer.trade_sub import TradeSubscriber
+from ssmts.utility.codec import BinaryCodec, TextCodec, topic
+from ssmts.utility.metrics import metrics
+
+
+class TestTradeSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.subscriber = TradeSubscriber(address="inproc://test-trades", snapShotPubAddress="inproc://test-snapshots",
+                                          snapShotSyncAddress="inproc://test-sync", resync_interval=3)
+        self.codec = BinaryCodec()
+
+    def tearDown(self):
+        self.subscriber.shutdown()
+        TradeSnapShotRegistry.register()
+
+    def _payload(self, trade_id, stock_id, price=10.0, quantity=5):
+        return self.codec.encode_trade({"tradeId": trade_id, "stockId": stock_id, "timestamp": datetime.now(),
+                                        "indicator": "BUY", "price": price, "quantity": quantity})
+
+    def test_process_batch_discards_invalid_trades(self):
+        payloads = [self._payload("T1", "STK1"), b"not a trade", self._payload("T2", "STK2")]
+        self.assertEqual(self.subscriber.process_batch(payloads), 2)
+        self.assertEqual(len(self.subscriber.trade_store.get_all()), 2)
+
+    def test_quantities_the_store_can_not_hold_are_rejected(self):
+        text = TextCodec()
+        trade = {"tradeId": "T1", "stockId": "STK1", "timestamp": datetime.now().isoformat(), "indicator": "BUY",
+                 "price": 10.0, "quantity": 5}
+        payloads = [text.encode_trade(dict(trade, quantity=5.5)), text.encode_trade(dict(trade, quantity=2 ** 32)),
+                    text.encode_trade(dict(trade, price="10")), text.encode_trade(trade)]
+        self.assertEqual(self.subscriber.process_batch(payloads), 1)
+        self.assertEqual(len(TradeSnapShotRegistry.get("STK1").trades), 1)
+
+    def test_bad_trades_are_not_retried(self):
+        with patch.object(self.subscriber.trade_store, "add", side_effect=OverflowError("quantity")) as add, \
+                patch("ssmts.services.consumer.trade_sub.time.sleep") as sleep:
+            self.assertEqual(self.subscriber.process_batch([self._payload("T1", "STK1")]), 0)
+        add.assert_called_once()
+        sleep.assert_not_called()
+        self.assertNotIn("STK1", TradeSnapShotRegistry.get_all())  # not stored, so not in the snapshot either
+
+    def test_ingest_stages_are_timed(self):
+        metrics.reset()
+        payloads = [self._payload("T1", "STK1"), self._payload("T2", "STK1", price=-1.0)]
+        self.subscriber.process_batch(payloads)
+        snapshot = metrics.snapshot()
+        for stage in ("decode", "validate", "snapshot"):
+            self.assertEqual(snapshot["histograms"][f"trade_sub.{stage}"]["count"], 2 if stage != "snapshot" else 1)
+        self.assertEqual(snapshot["histograms"]["trade_sub.store"]["count"], 1)
+        self.assertEqual(snapshot["counters"]["trade_sub.accepted"], 1)
+        self.assertEqual(snapshot["counters"]["trade_sub.rejected"], 1)
+        self.assertEqual(snapshot["gauges"]["trade_store.trades"], 1)
+        metrics.reset()
+
+    def test_flush_conflates_updates_per_stock(self):
+        payloads = [self._payload(f"T{i}", "STK1" if i % 4 else "STK2") for i in range(8)]
+        self.subscriber.process_batch(payloads)
+        with patch.object(self.subscriber, "publish_update") as publish:
+            self.subscriber.flush_updates()
+        self.assertEqual(publish.call_count, 2)
+        published = {call.args[0]: len(call.args[1]) for call in publish.call_args_list}
+        self.assertEqual(published, {"STK1": 6, "STK2": 2})
+        self.assertEqual(self.subscriber.conflation_stats, {"updates": 8, "published": 2, "coalesced": 6})
+        self.assertIsNone(self.subscriber.flush_due_in())
+
+    def test_publish_update_sends_periodic_full_snapshots(self):
+        self.subscriber.process_batch([self._payload("T1", "STK1")])
+        with patch.object(self.subscriber.codec, "encode_snapshot", return_value=b"s") as full, \
+                patch.object(self.subscriber.codec, "encode_delta", return_value=b"d") as delta:
+            for _ in range(5):
+                self.subscriber.publish_update("STK1", [])
+        self.assertEqual(self.subscriber.sequences["STK1"], 5)
+        self.assertEqual(full.call_count, 2)  # first update, then after 3 deltas
+        self.assertEqual(delta.call_count, 3)
+
+    def test_failed_update_leaves_no_sequence_gap(self):
+        self.subscriber.process_batch([self._payload("T1", "STK1")])
+        self.subscriber.publish_update("STK1", [])
+        with patch.object(self.subscriber.codec, "encode_delta", side_effect=ValueError("too big")):
+            with self.assertRaises(ValueError):
+                self.subscriber.publish_update("STK1", [])
+        self.assertEqual(self.subscriber.sequences["STK1"], 1)
+
+    def test_shuts_down_when_interrupted_in_either_mode(self):
+        for drain in (False, True):
+            subscriber = TradeSubscriber(address="inproc://interrupted-trades", drain=drain,
+                                         snapShotPubAddress="inproc://interrupted-snapshots",
+                                         snapShotSyncAddress="inproc://interrupted-sync")
+            with patch.object(subscriber.poller, "poll", side_effect=KeyboardInterrupt), \
+                    patch("ssmts.services.consumer.trade_sub.time.sleep"):
+                subscriber.consume_trades()
+            self.assertTrue(subscriber.socket.closed)
+            self.assertTrue(subscriber.snapShotSocket.closed)
+            subscriber.shutdown()  # already done: does nothing
+
+    def test_journaled_trades_are_recovered_by_the_next_subscriber(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        addresses = {"address": "inproc://journal-trades", "snapShotPubAddress": "inproc://journal-snapshots",
+                     "snapShotSyncAddress": "inproc://journal-sync"}
+        first = TradeSubscriber(journal_dir=directory, fsync="always", **addresses)
+        first.process_batch([self._payload("T1", "STK1", price=10.0), self._payload("T2", "STK1", price=20.0)])
+        first.shutdown()
+
+        TradeSnapShotRegistry.register()
+        second = TradeSubscriber(journal_dir=directory, **addresses)
+        self.addCleanup(second.shutdown)
+        self.assertEqual(second.recovery_stats["trades"], 2)
+        self.assertEqual(set(second.trade_store.get_all()), {"T1", "T2"})
+        self.assertAlmostEqual(TradeSnapShotRegistry.get_vwsp("STK1"), 15.0)
+        with patch.object(second, "publish_update") as publish:
+            second.flush_updates()
+        self.assertEqual(publish.call_args.args[0], "STK1")  # recovered stocks are published
+
+
+class TestTradeSubscriberTopics(unittest.TestCase):
+
+    def setUp(self):
+        self.context = zmq.Context()
+        self.publisher = self.context.socket(zmq.PUB)
+        self.publisher.bind("inproc://test-topic-trades")
+        self.subscriber = TradeSubscriber(address="inproc://test-topic-trades", snapShotPubAddress="inproc://test-topic-snapshots",
+                                          snapShotSyncAddress="inproc://test-topic-sync", context=self.context,
+                                          symbols=["STK1"], prefixes=["GB"])
+        self.codec = BinaryCodec()
+
+    def tearDown(self):
+        self.subscriber.shutdown()
+        self.publisher.close(linger=0)
+        self.context.term()
+        TradeSnapShotRegistry.register()
+
+    def _send(self, trade_id, stock_id):
+        self.publisher.send_multipart([topic(stock_id), self.codec.encode_trade(
+            {"tradeId": trade_id, "stockId": stock_id, "timestamp": datetime.now(),
+             "indicator": "BUY", "price": 10.0, "quantity": 5})])
+
+    def test_only_subscribed_symbols_are_received(self):
+        for i, stock_id in enumerate(["STK1", "STK10", "GBX", "STK2", "STK1"]):
+            self._send(f"T{i}", stock_id)
+        self.assertTrue(self.subscriber.socket.poll(1000))
+        self.subscriber.process_batch(self.subscriber.receive_batch())
+        received = sorted(trade.stockId for trade in self.subscriber.trade_store.get_all().values())
+        self.assertEqual(received, ["GBX", "STK1", "STK1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
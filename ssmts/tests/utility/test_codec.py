@@ -0,0 +1,144 @@
+import unittest
+from datetime import datetime
+
+from ssmts.models.trade import Trade
+from ssmts.models.trade_snapshot import TradeSnapShot
+from ssmts.utility.codec import BinaryCodec, MessageType, TextCodec, decode_any, get_codec, subscriptions, topic, topic_stock_id
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.timestamp = datetime(2024, 5, 1, 9, 30, 15, 123456)
+        self.trade = {
+            "tradeId": "1714552215-abc",
+            "stockId": "STK2",
+            "timestamp": self.timestamp.isoformat(),
+            "indicator": "SELL",
+            "price": 101.25,
+            "quantity": 40,
+        }
+        self.codec = BinaryCodec(stock_ids=["STK1", "STK2", "STK3"])
+
+    def test_binary_trade_round_trip(self):
+        payload = self.codec.encode_trade(self.trade)
+        msg_type, decoded = self.codec.decode(payload)
+        self.assertEqual(msg_type, MessageType.TRADE)
+        self.assertEqual(decoded["timestamp"], self.timestamp)
+        self.assertEqual(decoded["stockId"], "STK2")
+        self.assertEqual(decoded["tradeId"], "1714552215-abc")
+        self.assertEqual(decoded["price"], 101.25)
+        self.assertEqual(decoded["quantity"], 40)
+        self.assertEqual(decoded["indicator"], "SELL")
+        # decoded frames feed straight into the model without re-parsing the timestamp
+        self.assertEqual(Trade.from_dict(decoded).timeStamp, self.timestamp)
+
+    def test_binary_integer_trade_ids(self):
+        trade = dict(self.trade, tradeId=2 ** 62 + 7)
+        payload = self.codec.encode_trade(trade)
+        self.assertEqual(self.codec.decode(payload)[1]["tradeId"], 2 ** 62 + 7)
+        self.assertLess(len(payload), len(self.codec.encode_trade(dict(trade, tradeId=str(2 ** 62 + 7)))))
+        unknown = self.codec.encode_trade(dict(trade, stockId="NEW1"))
+        self.assertEqual(self.codec.stock_id(unknown), "NEW1")
+        self.assertEqual(self.codec.decode(unknown)[1]["tradeId"], 2 ** 62 + 7)
+
+    def test_binary_unknown_stock_is_sent_inline(self):
+        trade = dict(self.trade, stockId="NEW1")
+        _, decoded = self.codec.decode(self.codec.encode_trade(trade))
+        self.assertEqual(decoded["stockId"], "NEW1")
+
+    def test_binary_snapshot_round_trip(self):
+        trades = [Trade.from_dict(dict(self.trade, tradeId=f"T{i}")) for i in range(3)]
+        snapshot = TradeSnapShot("STK2", self.timestamp, trades)
+        msg_type, decoded = self.codec.decode(self.codec.encode_snapshot(snapshot.to_dict()))
+        self.assertEqual(msg_type, MessageType.SNAPSHOT)
+        rebuilt = TradeSnapShot.from_dict(decoded)
+        self.assertEqual(rebuilt.stockId, "STK2")
+        self.assertEqual([t.tradeId for t in rebuilt.trades], ["T0", "T1", "T2"])
+
+    def test_binary_delta_round_trip(self):
+        delta = {"stockId": "STK9", "seq": 42, "epoch": 1_700_000_000_123_456_789,
+                 "trades": [self.trade, dict(self.trade, tradeId="T2")]}
+        msg_type, decoded = self.codec.decode(self.codec.encode_delta(delta))
+        self.assertEqual(msg_type, MessageType.DELTA)
+        self.assertEqual((decoded["seq"], decoded["epoch"]), (42, 1_700_000_000_123_456_789))
+        self.assertEqual(decoded["stockId"], "STK9")
+        self.assertEqual([t["tradeId"] for t in decoded["trades"]], ["1714552215-abc", "T2"])
+
+    def test_binary_delta_beyond_65535_trades(self):
+        trade = {"tradeId": "T", "stockId": "STK1", "timestamp": self.timestamp, "indicator": "BUY",
+                 "price": 1.5, "quantity": 1}
+        for count in (65_535, 65_536, 70_000):
+            delta = {"stockId": "STK1", "seq": 1, "trades": [trade] * count}
+            _, decoded = self.codec.decode(self.codec.encode_delta(delta))
+            self.assertEqual(len(decoded["trades"]), count)
+        snapshot = {"stockId": "STK1", "snapshot_time": self.timestamp, "seq": 1, "trades": [trade] * 65_536}
+        self.assertEqual(len(self.codec.decode(self.codec.encode_snapshot(snapshot))[1]["trades"]), 65_536)
+
+    def test_stock_id_without_decoding(self):
+        delta = {"stockId": "STK9", "seq": 1, "trades": [self.trade]}
+        self.assertEqual(self.codec.stock_id(self.codec.encode_trade(self.trade)), "STK2")
+        self.assertEqual(self.codec.stock_id(self.codec.encode_trade(dict(self.trade, stockId="NEW1"))), "NEW1")
+        self.assertEqual(self.codec.stock_id(self.codec.encode_delta(delta)), "STK9")
+        self.assertEqual(TextCodec().stock_id(TextCodec().encode_trade(self.trade)), "STK2")
+
+    def test_text_message_types(self):
+        codec = TextCodec()
+        delta = {"stockId": "STK1", "seq": 1, "trades": [self.trade]}
+        snapshot = dict(delta, snapshot_time=self.timestamp.isoformat())
+        self.assertEqual(codec.decode(codec.encode_delta(delta))[0], MessageType.DELTA)
+        self.assertEqual(codec.decode(codec.encode_snapshot(snapshot))[0], MessageType.SNAPSHOT)
+
+    def test_binary_trace_round_trip(self):
+        traced = dict(self.trade, traceId=2**62 + 5, sendTs=123_456_789)
+        plain_payload = self.codec.encode_trade(self.trade)
+        payload = self.codec.encode_trade(traced)
+        self.assertEqual(len(payload), len(plain_payload) + 24)
+        msg_type, decoded = self.codec.decode(payload)
+        self.assertEqual(msg_type, MessageType.TRADE)
+        self.assertEqual((decoded["traceId"], decoded["sendTs"]), (2**62 + 5, 123_456_789))
+        self.assertNotIn("publishTs", decoded)
+        self.assertNotIn("traceId", self.codec.decode(plain_payload)[1])
+        self.assertEqual(self.codec.stock_id(payload), "STK2")
+        delta = {"stockId": "STK9", "seq": 4, "trades": [self.trade], "traceId": 7, "sendTs": 10, "publishTs": 20}
+        msg_type, decoded = self.codec.decode(self.codec.encode_delta(delta))
+        self.assertEqual(msg_type, MessageType.DELTA)
+        self.assertEqual((decoded["traceId"], decoded["sendTs"], decoded["publishTs"]), (7, 10, 20))
+        self.assertEqual(decoded["trades"][0]["tradeId"], "1714552215-abc")
+
+    def test_binary_rejects_other_versions(self):
+        payload = bytearray(self.codec.encode_trade(self.trade))
+        payload[1] = 99
+        with self.assertRaises(ValueError):
+            self.codec.decode(bytes(payload))
+
+    def test_binary_rejects_another_stock_table(self):
+        payload = self.codec.encode_trade(self.trade)
+        for stock_ids in (["STK2", "STK1", "STK3"], ["STK1", "STK2"]):  # other order, other universe
+            with self.assertRaisesRegex(ValueError, "Stock table mismatch"):
+                BinaryCodec(stock_ids=stock_ids).decode(payload)
+        self.assertEqual(BinaryCodec(stock_ids=["STK1", "STK2", "STK3"]).decode(payload)[1]["stockId"], "STK2")
+
+    def test_text_fallback(self):
+        payload = TextCodec().encode_trade(self.trade)
+        self.assertEqual(payload, f"{self.trade}".encode("utf-8"))
+        self.assertEqual(decode_any(payload), (MessageType.TRADE, self.trade))
+
+    def test_topics(self):
+        self.assertEqual(topic_stock_id(topic("STK1")), "STK1")
+        self.assertEqual(subscriptions(), [b""])
+        filters = subscriptions(symbols=["STK1"], prefixes=["GB"])
+        matches = lambda stock_id: any(topic(stock_id).startswith(f) for f in filters)
+        self.assertTrue(matches("STK1"))
+        self.assertFalse(matches("STK10"))  # a symbol is not a prefix
+        self.assertTrue(matches("GBP1"))
+        self.assertFalse(matches("STK2"))
+
+    def test_get_codec(self):
+        self.assertIsInstance(get_codec("text"), TextCodec)
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import urllib.request
+
+from ssmts.utility.metrics import BUCKETS, LatencyHistogram, Metrics, bucket_bounds, metrics, serve_metrics
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_buckets_cover_every_latency_in_order(self):
+        lower = 0
+        for index in range(BUCKETS):
+            low, high = bucket_bounds(index)
+            self.assertEqual(low, lower)
+            self.assertGreater(high, low)
+            lower = high
+        for ns in (0, 1, 3, 4, 7, 8, 1000, 123_456_789):
+            histogram = LatencyHistogram("h")
+            histogram.record(ns)
+            index = histogram.counts.index(1)
+            low, high = bucket_bounds(index)
+            self.assertTrue(low <= ns < high, (ns, index))
+
+    def test_percentiles_are_within_a_bucket(self):
+        histogram = LatencyHistogram("h")
+        for ns in range(1, 10_001):
+            histogram.record(ns * 1000)
+        for quantile in (0.5, 0.9, 0.99):
+            true = quantile * 10_000 * 1000
+            self.assertLessEqual(abs(histogram.percentile(quantile) - true) / true, 0.12)
+        self.assertEqual(histogram.percentile(1.0), 10_000_000)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 10_000)
+        self.assertEqual(summary["max_ns"], 10_000_000)
+        self.assertLessEqual(summary["p50"], summary["p99"])
+
+    def test_percentiles_are_within_12_percent_anywhere_in_a_bucket(self):
+        for ns in (4, 5, 6, 7, 1000, 1249, 1250, 1279, 2047, 2048, 123_456_789):
+            histogram = LatencyHistogram("h")
+            histogram.record(ns)
+            histogram.record(2 ** 40)  # so the quantile is not capped at the max
+            self.assertLessEqual(abs(histogram.percentile(0.5) - ns) / ns, 0.12, ns)
+
+    def test_empty_histogram(self):
+        self.assertEqual(LatencyHistogram("h").percentile(0.99), 0)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_stopwatch_records_each_stage(self):
+        registry = Metrics(enabled=True)
+        first, second = registry.histogram("a"), registry.histogram("b")
+        watch = registry.stopwatch()
+        watch.lap(first)
+        watch.lap(second)
+        self.assertEqual((first.count, second.count), (1, 1))
+        self.assertIs(registry.histogram("a"), first)
+
+    def test_disabled_metrics_record_nothing(self):
+        registry = Metrics(enabled=False)
+        histogram = registry.histogram("a")
+        registry.stopwatch().lap(histogram)
+        registry.observe("a", 10)
+        registry.incr("events")
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(registry.snapshot()["counters"], {})
+        registry.control("enable")
+        registry.observe("a", 10)
+        self.assertEqual(histogram.count, 1)
+
+    def test_reset_keeps_histograms_usable(self):
+        registry = Metrics(enabled=True)
+        histogram = registry.histogram("a")
+        histogram.record(100)
+        registry.incr("events", 3)
+        self.assertTrue(registry.control("reset"))
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(registry.snapshot()["counters"], {})
+        histogram.record(100)
+        self.assertEqual(registry.snapshot()["histograms"]["a"]["count"], 1)
+        self.assertFalse(registry.control("explode"))
+
+    def test_render(self):
+        registry = Metrics(enabled=True)
+        registry.observe("trade_sub.decode", 2000)
+        registry.incr("trade_sub.accepted", 2)
+        registry.gauges("trade_store", lambda: {"trades": 5, "name": "ignored"})
+        text = registry.render()
+        self.assertIn('ssmts_latency_seconds{name="trade_sub.decode",quantile="0.99"} 1.915e-06', text)  # midpoint of [1792, 2048)
+        self.assertIn('ssmts_latency_seconds_count{name="trade_sub.decode"} 1', text)
+        self.assertIn('ssmts_events_total{name="trade_sub.accepted"} 2', text)
+        self.assertIn('ssmts_gauge{name="trade_store.trades"} 5', text)
+        self.assertNotIn("ignored", text)
+
+    def test_served_over_http(self):
+        server = serve_metrics(0, host="127.0.0.1")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        metrics.incr("test.served")
+        with urllib.request.urlopen(url) as response:
+            self.assertIn('ssmts_events_total{name="test.served"}', response.read().decode())
+        with urllib.request.urlopen(urllib.request.Request(url + "/reset", method="POST")) as response:
+            self.assertEqual(response.status, 200)
+        self.assertNotIn("test.served", metrics.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from ssmts.data.store.data_version import DataVersion
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.stock import Stock
+from ssmts.utility.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_entries_are_valid_for_one_version(self):
+        cache = ResponseCache(max_entries=10)
+        entry = cache.put("/stocks", 1, b"[]")
+        self.assertEqual(cache.get("/stocks", 1), entry)
+        self.assertIsNone(cache.get("/stocks", 2))
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_etag_follows_the_body(self):
+        cache = ResponseCache(max_entries=10)
+        first = cache.put("/stock/STK1", 1, b'{"price": 1}')
+        self.assertEqual(cache.put("/stock/STK1", 2, b'{"price": 1}').etag, first.etag)
+        self.assertNotEqual(cache.put("/stock/STK1", 3, b'{"price": 2}').etag, first.etag)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("/stock/STK1", 1, b"1")
+        cache.put("/stock/STK2", 1, b"2")
+        cache.get("/stock/STK1", 1)
+        cache.put("/stock/STK3", 1, b"3")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("/stock/STK2", 1))
+        self.assertIsNotNone(cache.get("/stock/STK1", 1))
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_older_version_does_not_replace_newer_entry(self):
+        cache = ResponseCache(max_entries=10)
+        cache.put("/stocks", 5, b"new")
+        cache.put("/stocks", 4, b"old")
+        self.assertEqual(cache.get("/stocks", 5).body, b"new")
+
+    def test_disabled_cache(self):
+        cache = ResponseCache(max_entries=0)
+        self.assertEqual(cache.put("/stocks", 1, b"[]").body, b"[]")
+        self.assertEqual(len(cache), 0)
+
+
+class TestDataVersion(unittest.TestCase):
+
+    def tearDown(self):
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    def test_registry_writes_bump_the_version(self):
+        StockRegistry.register()
+        StockRegistry.add("STK1", Stock(stockId="STK1", currentPrice=100.0))
+        version = DataVersion.current()
+        StockRegistry.get("STK1")
+        self.assertEqual(DataVersion.current(), version)
+
+        StockRegistry.update_stock_price("STK1", 101.0)
+        self.assertGreater(DataVersion.current(), version)
+
+        version = DataVersion.current()
+        TradeSnapShotRegistry.register()
+        TradeSnapShotRegistry.add_trades("STK1", [])
+        self.assertGreater(DataVersion.current(), version)
+
+
+if __name__ == '__main__':
+    unittest.main()
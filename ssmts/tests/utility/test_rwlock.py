@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from ssmts.utility.rwlock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def test_readers_share_the_lock(self):
+        inside = threading.Barrier(3, timeout=2)
+
+        def reader():
+            with self.lock.read:
+                inside.wait()  # only passes if all three readers hold the lock at once
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(inside.broken)
+
+    def test_writer_excludes_readers(self):
+        events = []
+
+        def reader():
+            with self.lock.read:
+                events.append("read")
+
+        with self.lock.write:
+            thread = threading.Thread(target=reader)
+            thread.start()
+            time.sleep(0.05)
+            events.append("write done")
+        thread.join()
+        self.assertEqual(events, ["write done", "read"])
+
+    def test_reentrancy(self):
+        with self.lock.write:
+            with self.lock.write:
+                with self.lock.read:
+                    pass
+        with self.lock.read:
+            with self.lock.read:
+                pass
+        # fully released: another thread can write
+
+        def writer():
+            with self.lock.write:
+                pass
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_upgrade_is_rejected(self):
+        with self.lock.read:
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+
+
+if __name__ == '__main__':
+    unittest.main()
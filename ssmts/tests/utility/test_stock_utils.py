@@ -1,10 +1,14 @@
 import math
 import unittest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 from ssmts.data.loaders.stock_loader import StockLoader
 from ssmts.utility.stock_utils import StockUtils
 from ssmts.config.constants import StockType
 from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.data.store.trade_snapshot_registry import TradeSnapShotRegistry
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
 
 
 class TestStockUtils(unittest.TestCase):
@@ -73,9 +77,9 @@ class TestStockUtils(unittest.TestCase):
 
     def test_calculate_all_share_index(self):
         # Update current prices to test variations
-        StockRegistry.get("STK1").set_current_price(150)
-        StockRegistry.get("STK2").set_current_price(250)
-        StockRegistry.get("STK3").set_current_price(350)
+        StockRegistry.update_stock_price("STK1", 150)
+        StockRegistry.update_stock_price("STK2", 250)
+        StockRegistry.update_stock_price("STK3", 350)
 
         result = StockUtils.calculate_all_share_index()
         expected_result = math.prod([150, 250, 350])
@@ -97,5 +101,66 @@ class TestStockUtils(unittest.TestCase):
             StockUtils._geometric_mean([100, -200, 300])
 
 
+class TestStockUtilsBulk(unittest.TestCase):
+
+    def setUp(self):
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+        for data in TestStockUtils.MOCK_DATA:
+            StockRegistry.add(data["stockId"], Stock.from_dict(data))
+        TradeSnapShotRegistry.update_trade("STK1", Trade("T1", "STK1", datetime.now(), 10, 50.0, "BUY"))
+
+    def tearDown(self):
+        StockRegistry.register()
+        TradeSnapShotRegistry.register()
+
+    def test_bulk_matches_single_calculations(self):
+        results = StockUtils.calculate_metrics_bulk([("STK1", 100), ("STK2", 100), ("STK1", 0)])
+        self.assertEqual(results[0]["dividend_yield"], StockUtils.calculate_dividend_yield("STK1", 100))
+        self.assertEqual(results[0]["pe_ratio"], StockUtils.calculate_pe_ratio("STK1", 100))
+        self.assertEqual(results[0]["vwsp"], StockUtils.calculate_vwsp("STK1"))
+        self.assertEqual(results[0]["errors"], {})
+        self.assertEqual(results[1]["dividend_yield"], StockUtils.calculate_dividend_yield("STK2", 100))
+        self.assertIsNone(results[1]["vwsp"])
+        self.assertIn("vwsp", results[1]["errors"])
+        self.assertIsNone(results[2]["dividend_yield"])
+        self.assertEqual(results[2]["errors"], {"dividend_yield": "Stock price cannot be zero."})
+        self.assertEqual(results[2]["pe_ratio"], 0.0)
+
+    def test_bulk_reports_per_item_errors(self):
+        results = StockUtils.calculate_metrics_bulk([("NOPE", 100), ("STK3", "abc"), ("STK3", 150)])
+        self.assertIn("error", results[0])
+        self.assertIn("error", results[1])
+        self.assertEqual(results[2]["pe_ratio"], 10.0)
+
+    def test_grid_over_the_universe(self):
+        grid = StockUtils.calculate_metrics_grid([50, 100])
+        self.assertEqual(grid["prices"], [50, 100])
+        rows = {row["stockId"]: row for row in grid["stocks"]}
+        self.assertEqual(set(rows), {"STK1", "STK2", "STK3"})
+        self.assertEqual(rows["STK1"]["dividend_yield"], [0.2, 0.1])
+        self.assertEqual(rows["STK3"]["pe_ratio"], [50 / 15, 100 / 15])
+        self.assertEqual(rows["STK1"]["vwsp"], 50.0)
+        with self.assertRaises(ValueError):
+            StockUtils.calculate_metrics_grid(["abc"])
+
+    def test_reference_data_follows_registry_changes(self):
+        self.assertEqual(len(StockRegistry.reference_data()), 3)
+        StockRegistry.add("STK4", Stock(stockId="STK4", stockType=StockType.COMMON.value, lastDivident=1.0))
+        self.assertEqual(StockUtils.calculate_metrics_grid([10], ["STK4"])["stocks"][0]["dividend_yield"], [0.1])
+
+    def test_bulk_sees_attributes_changed_in_place(self):
+        self.assertEqual(StockUtils.calculate_metrics_bulk([("STK1", 100)])[0]["dividend_yield"], 0.1)
+        StockRegistry.get("STK1").lastDivident = 20.0
+        self.assertEqual(StockUtils.calculate_dividend_yield("STK1", 100), 0.2)
+        self.assertEqual(StockUtils.calculate_metrics_bulk([("STK1", 100)])[0]["dividend_yield"], 0.2)
+        self.assertEqual(StockUtils.calculate_metrics_grid([100], ["STK1"])["stocks"][0]["dividend_yield"], [0.2])
+
+    def test_bulk_reports_unhashable_ids_per_item(self):
+        results = StockUtils.calculate_metrics_bulk([(["STK1"], 100), ("STK1", 100)])
+        self.assertIn("error", results[0])
+        self.assertEqual(results[1]["dividend_yield"], 0.1)
+
+
 if __name__ == '__main__':
     unittest.main()
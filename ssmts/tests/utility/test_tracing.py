@@ -0,0 +1,75 @@
+import contextlib
+import io
+import unittest
+
+from ssmts.data.store.stock_registry import StockRegistry
+from ssmts.models.stock import Stock
+from ssmts.models.trade import Trade
+from ssmts.utility import tracing
+from ssmts.utility.codec import BinaryCodec
+from ssmts.utility.metrics import metrics
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        metrics.enable()
+        metrics.reset()
+        StockRegistry.register()
+        StockRegistry.add("STK1", Stock(stockId="STK1", stockType="common", lastDivident=8.0, parValue=100.0,
+                                        currentPrice=100.0))
+        self.codec = BinaryCodec(stock_ids=["STK1"])
+
+    def tearDown(self):
+        metrics.reset()
+        StockRegistry.register()
+
+    def test_sampler_stamps_one_trade_in_n(self):
+        sampler = tracing.TraceSampler(sample=3)
+        trades = [{} for _ in range(9)]
+        for trade in trades:
+            sampler.stamp(trade)
+        self.assertEqual([bool(trade) for trade in trades], [False, False, True] * 3)
+        self.assertEqual(len({trade["traceId"] for trade in trades if trade}), 3)
+        off = {}
+        tracing.TraceSampler(sample=0).stamp(off)
+        self.assertEqual(off, {})
+
+    def test_trace_is_carried_to_the_served_price(self):
+        trade_data = {"tradeId": "T1", "stockId": "STK1", "timestamp": 1_700_000_000_000_000_000,
+                      "indicator": "BUY", "price": 10.0, "quantity": 5}
+        tracing.TraceSampler(sample=1).stamp(trade_data)
+        _, decoded = self.codec.decode(self.codec.encode_trade(trade_data))
+
+        # trade consumer
+        trade = Trade.from_dict(decoded)
+        trade.trace = tracing.received(decoded)
+        delta = {"stockId": "STK1", "seq": 1, "trades": [trade.to_dict()], **tracing.published([trade])}
+        # snapshot consumer
+        _, message = self.codec.decode(self.codec.encode_delta(delta))
+        trace = tracing.snapshot_received(message)
+        self.assertEqual(trace[:2], (trade_data["traceId"], trade_data["sendTs"]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            StockRegistry.update_stock_price("STK1", 10.0, trace=trace)
+        tracing.price_updated(trace)
+        # market metrics
+        self.assertEqual(StockRegistry.take_traces(["STK2"]), [])
+        tracing.served(StockRegistry.take_traces(["STK1"]))
+        self.assertEqual(StockRegistry.take_traces(), [])
+
+        hops = tracing.parse_traces(metrics.render())
+        for hop, _ in tracing.HOPS + ((tracing.END_TO_END, ""),):
+            self.assertEqual(hops[hop]["count"], 1, hop)
+        self.assertGreaterEqual(hops["end_to_end"]["sum"], hops["query"]["sum"])
+        report = tracing.format_budget(hops)
+        self.assertIn("producer -> served (end to end)", report)
+        self.assertIn("100%", report)
+
+    def test_untraced_messages_record_nothing(self):
+        self.assertIsNone(tracing.received({"tradeId": "T1"}))
+        self.assertEqual(tracing.published([Trade("T1", "STK1", None, 1, 1.0, "BUY")]), {})
+        self.assertEqual(tracing.parse_traces(metrics.render()), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from ssmts.utility import trade_utils
+from ssmts.utility.trade_utils import (ID_EPOCH_MS, MAX_SEQUENCE, SnowflakeIdGenerator, format_id,
+                                       generate_unique_id, parse_id, require_node_id, trade_id_key)
+
+
+class TestSnowflakeIdGenerator(unittest.TestCase):
+
+    def test_ids_are_unique_and_increasing(self):
+        generator = SnowflakeIdGenerator(node_id=7)
+        ids = [generator.next_id() for _ in range(20_000)]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertLess(ids[-1], 1 << 63)
+        self.assertTrue(all(parse_id(trade_id)["node_id"] == 7 for trade_id in ids))
+
+    def test_ids_carry_their_creation_time(self):
+        now_ms = time.time_ns() // 1_000_000
+        parts = parse_id(SnowflakeIdGenerator(node_id=1).next_id())
+        self.assertLess(abs(parts["timestamp_ms"] - now_ms), 1000)
+
+    def test_exhausted_sequence_and_clock_steps_back_borrow_the_next_millisecond(self):
+        generator = SnowflakeIdGenerator(node_id=0)
+        clock = (ID_EPOCH_MS + 1000) * 1_000_000
+        with patch.object(trade_utils, "time_ns", return_value=clock):
+            ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 2)]
+        self.assertEqual(parse_id(ids[MAX_SEQUENCE])["sequence"], MAX_SEQUENCE)
+        self.assertEqual(parse_id(ids[-1]), {"timestamp_ms": ID_EPOCH_MS + 1001, "node_id": 0, "sequence": 0})
+        with patch.object(trade_utils, "time_ns", return_value=clock - 5_000_000):
+            self.assertGreater(generator.next_id(), ids[-1])
+
+    def test_unique_across_threads(self):
+        generator = SnowflakeIdGenerator(node_id=3)
+        results = [[] for _ in range(4)]
+        threads = [threading.Thread(target=lambda out: out.extend(generator.next_id() for _ in range(5000)), args=(out,))
+                   for out in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ids = [trade_id for out in results for trade_id in out]
+        self.assertEqual(len(set(ids)), len(ids))
+        for out in results:
+            self.assertEqual(out, sorted(out))
+
+    def test_nodes_keep_processes_apart(self):
+        with patch.object(trade_utils, "time_ns", return_value=(ID_EPOCH_MS + 5) * 1_000_000):
+            first, second = SnowflakeIdGenerator(node_id=1).next_id(), SnowflakeIdGenerator(node_id=2).next_id()
+        self.assertNotEqual(first, second)
+        with self.assertRaises(ValueError):
+            SnowflakeIdGenerator(node_id=1024)
+
+    def test_forked_child_takes_a_node_id_from_its_pid(self):
+        generator = SnowflakeIdGenerator()
+        with patch.object(trade_utils.os, "getpid", return_value=generator.node_id + 1):
+            generator._after_fork()
+        with self.assertLogs(trade_utils.logger, "WARNING"):  # pid derived node ids can collide
+            self.assertEqual(generator.node_id, parse_id(generator.next_id())["node_id"])
+        with self.assertNoLogs(trade_utils.logger, "WARNING"):
+            generator.next_id()
+
+    def test_forked_child_refuses_a_fixed_node_id(self):
+        fixed = SnowflakeIdGenerator(node_id=5)
+        fixed.next_id()
+        fixed._after_fork()
+        with self.assertRaises(RuntimeError):
+            fixed.next_id()
+        fixed.set_node(6)
+        self.assertEqual(parse_id(fixed.next_id())["node_id"], 6)
+
+    def test_producers_require_a_node_id(self):
+        with patch.object(trade_utils, "_generator", SnowflakeIdGenerator()):
+            with self.assertRaises(ValueError):  # derived from the pid, it may be another producer's
+                require_node_id()
+            self.assertEqual(require_node_id(7), 7)
+            self.assertEqual(require_node_id(), 7)
+            self.assertEqual(parse_id(trade_utils.next_trade_id())["node_id"], 7)
+
+    def test_trade_id_key(self):
+        trade_id = 2 ** 62 + 3
+        self.assertEqual(trade_id_key(format_id(trade_id)), trade_id)
+        self.assertEqual(trade_id_key(trade_id), trade_id)
+        self.assertEqual(trade_id_key("T1"), "T1")
+        self.assertEqual(trade_id_key("9" * 19), "9" * 19)  # beyond 63 bits
+        self.assertEqual(trade_id_key(-1), "-1")
+
+    def test_string_form_sorts_like_the_ids(self):
+        ids = [1, 10, 2 ** 40, 2 ** 62]
+        strings = [format_id(trade_id) for trade_id in ids]
+        self.assertEqual(sorted(strings), strings)
+        self.assertEqual([int(value) for value in strings], ids)
+        self.assertEqual(len(generate_unique_id()), 19)
+        self.assertLess(generate_unique_id(), generate_unique_id())
+
+
+if __name__ == '__main__':
+    unittest.main()
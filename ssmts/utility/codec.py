@@ -0,0 +1,392 @@
+"""
+Wire codecs for the trade and snapshot sockets.
+
+Two formats are supported:
+    * "binary": fixed-layout struct frames with a versioned header, epoch-nanosecond
+      timestamps and integer stock ids (default).
+    * "text": the original python literal format (``f'{trade}'``), kept as a fallback.
+
+Traced messages (see ssmts.utility.tracing) also carry ``traceId`` and ``sendTs``, and snapshot
+and delta messages ``publishTs``; both formats pass them through.
+
+Consumers should decode with ``decode_any`` so that either format is accepted on the wire.
+"""
+
+import ast
+import enum
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from ssmts.config.constants import TRADE_SIDE_INDEX, TRADE_SIDES, WIRE_CODEC
+
+
+class MessageType(enum.IntEnum):
+    TRADE = 1
+    SNAPSHOT = 2  # full snapshot of a stock, with the sequence number (and publisher epoch) it is current as of
+    DELTA = 3  # trades added to a stock's snapshot since the previous sequence number of the same epoch
+
+
+WIRE_MAGIC = 0xA7
+WIRE_VERSION = 7
+TOPIC_END = b"\x00"  # terminates the stock id in the topic frame of multipart messages
+
+_HEADER = struct.Struct("<BBBI")  # magic, version, message type, stock table hash
+_TRACED = 0x80  # message type flag: a _TRACE block follows the header
+_TRACE = struct.Struct("<Qqq")  # trace id, producer send ns, consumer publish ns (monotonic clock)
+_TRADE = struct.Struct("<qIIdB")  # timestamp ns, stock index, quantity, price, side
+_SNAPSHOT = struct.Struct("<qIIQQ")  # snapshot time ns, stock index, trade count, sequence, epoch
+_DELTA = struct.Struct("<IIQQ")  # stock index, trade count, sequence, epoch
+_LENGTH = struct.Struct("<H")
+_INT_ID = struct.Struct("<Hq")  # _INT_ID_LENGTH, then an integer trade id
+
+_UNKNOWN_STOCK = 0xFFFFFFFF  # stock id not in the table, sent inline as a string instead
+_INT_ID_LENGTH = 0xFFFF  # in place of a trade id's string length: the id is an integer, sent as <q
+
+
+def to_epoch_ns(value) -> int:
+    """
+    Convert a datetime (or its ISO string form) into integer nanoseconds since the epoch.
+    Integers are taken to be nanoseconds already.
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp()) * 1_000_000_000 + value.microsecond * 1000
+
+
+def from_epoch_ns(value: int) -> datetime:
+    """
+    Convert integer nanoseconds since the epoch back into a (naive, local) datetime.
+    """
+    seconds, nanos = divmod(value, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanos // 1000)
+
+
+class BaseCodec(ABC):
+    """
+    BaseCodec defines the interface every wire codec implements.
+    Messages are plain dicts, in the same shape as ``Trade.to_dict`` / ``TradeSnapShot.to_dict``.
+    """
+    NAME: str = None
+
+    @abstractmethod
+    def encode(self, msg_type: MessageType, data: dict) -> bytes:
+        """ Must be implemented by subclasses to serialize a message. """
+        pass
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> tuple[MessageType, dict]:
+        """ Must be implemented by subclasses to deserialize a message. """
+        pass
+
+    def encode_trade(self, trade: dict) -> bytes:
+        return self.encode(MessageType.TRADE, trade)
+
+    def encode_snapshot(self, snapshot: dict) -> bytes:
+        return self.encode(MessageType.SNAPSHOT, snapshot)
+
+    def encode_delta(self, delta: dict) -> bytes:
+        return self.encode(MessageType.DELTA, delta)
+
+    def stock_id(self, payload) -> str:
+        """
+        The stock a message is about. Codecs override this to avoid decoding the whole message.
+        """
+        return self.decode(payload)[1]["stockId"]
+
+
+class TextCodec(BaseCodec):
+    """
+    The original python literal format. Slow, but human readable.
+    """
+    NAME = "text"
+
+    def encode(self, msg_type: MessageType, data: dict) -> bytes:
+        return f'{data}'.encode("utf-8")
+
+    def decode(self, payload) -> tuple[MessageType, dict]:
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        data = ast.literal_eval(payload)
+        if not isinstance(data, dict):
+            raise ValueError("Text message must be a dictionary.")
+        if "trades" not in data:
+            return MessageType.TRADE, data
+        return (MessageType.SNAPSHOT if "snapshot_time" in data else MessageType.DELTA), data
+
+
+class BinaryCodec(BaseCodec):
+    """
+    Fixed-layout struct frames.
+
+    Every frame starts with a 7 byte header (magic, version, message type, stock table hash).
+    Stocks are sent as indexes into the stock table, so a frame is only decoded by a codec whose
+    table hashes the same; any other frame is rejected rather than decoded to the wrong stocks.
+    A trade body is ``<qIIdB`` (timestamp ns, stock index, quantity, price, side) followed by
+    the trade id: integer ids (see ssmts.utility.trade_utils) as ``<Hq`` (0xFFFF, id), any other
+    id as a length prefixed string. A snapshot is ``<qIIQQ`` (snapshot time ns, stock index, count,
+    sequence, epoch) and a delta ``<IIQQ`` (stock index, count, sequence, epoch), each followed by
+    ``count`` trade bodies. Stocks missing from the stock table are sent inline, as a length prefixed
+    string after the fixed part. Traced messages set the high bit of the message type and follow
+    the header with ``<Qqq`` (trace id, send ns, publish ns).
+    """
+    NAME = "binary"
+
+    def __init__(self, stock_ids: list[str] = None):
+        """
+        :param stock_ids: Ordered stock ids shared by both ends of the socket.
+                          Defaults to the stock reference data used by StockLoader.
+        """
+        self._stock_ids = list(stock_ids) if stock_ids is not None else None
+        self._stock_index = None
+        self._table_hash = None
+
+    def _table(self):
+        if self._stock_index is None:
+            if self._stock_ids is None:
+                from ssmts.data.loaders.stock_loader import StockLoader
+                self._stock_ids = [entity["stockId"] for entity in StockLoader.getEntities()]
+            self._table_hash = zlib.crc32("\n".join(self._stock_ids).encode("utf-8"))
+            self._stock_index = {stock_id: idx for idx, stock_id in enumerate(self._stock_ids)}
+        return self._stock_index
+
+    @property
+    def table_hash(self) -> int:
+        """
+        crc32 of the ordered stock ids, sent in every frame header.
+        """
+        self._table()
+        return self._table_hash
+
+    @staticmethod
+    def _pack_str(value: str) -> bytes:
+        raw = value.encode("utf-8")
+        return _LENGTH.pack(len(raw)) + raw
+
+    @staticmethod
+    def _unpack_str(payload, offset: int) -> tuple[str, int]:
+        (length,) = _LENGTH.unpack_from(payload, offset)
+        offset += _LENGTH.size
+        return bytes(payload[offset:offset + length]).decode("utf-8"), offset + length
+
+    @classmethod
+    def _pack_trade_id(cls, trade_id) -> bytes:
+        if type(trade_id) is int:
+            return _INT_ID.pack(_INT_ID_LENGTH, trade_id)
+        return cls._pack_str(str(trade_id))
+
+    @classmethod
+    def _unpack_trade_id(cls, payload, offset: int) -> tuple:
+        if _LENGTH.unpack_from(payload, offset)[0] == _INT_ID_LENGTH:
+            return _INT_ID.unpack_from(payload, offset)[1], offset + _INT_ID.size
+        return cls._unpack_str(payload, offset)
+
+    def _encode_trade_body(self, trade: dict, parts: list) -> None:
+        stock_id = trade["stockId"]
+        stock_idx = self._table().get(stock_id, _UNKNOWN_STOCK)
+        parts.append(_TRADE.pack(to_epoch_ns(trade["timestamp"]), stock_idx, trade["quantity"],
+                                 trade["price"], TRADE_SIDE_INDEX[trade["indicator"]]))
+        parts.append(self._pack_trade_id(trade["tradeId"]))
+        if stock_idx == _UNKNOWN_STOCK:
+            parts.append(self._pack_str(stock_id))
+
+    def _decode_trade_body(self, payload, offset: int) -> tuple[dict, int]:
+        timestamp, stock_idx, quantity, price, side = _TRADE.unpack_from(payload, offset)
+        trade_id, offset = self._unpack_trade_id(payload, offset + _TRADE.size)
+        stock_id, offset = self._stock_id(stock_idx, payload, offset)
+        return {
+            "tradeId": trade_id,
+            "stockId": stock_id,
+            "timestamp": from_epoch_ns(timestamp),
+            "quantity": quantity,
+            "price": price,
+            "indicator": TRADE_SIDES[side],
+        }, offset
+
+    def _stock_id(self, stock_idx: int, payload, offset: int) -> tuple[str, int]:
+        if stock_idx == _UNKNOWN_STOCK:
+            return self._unpack_str(payload, offset)
+        self._table()
+        return self._stock_ids[stock_idx], offset
+
+    def _decode_trades(self, payload, offset: int, count: int) -> list[dict]:
+        trades = []
+        for _ in range(count):
+            trade, offset = self._decode_trade_body(payload, offset)
+            trades.append(trade)
+        return trades
+
+    def encode(self, msg_type: MessageType, data: dict) -> bytes:
+        trace_id = data.get("traceId")
+        if trace_id:
+            parts = [_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, msg_type | _TRACED, self.table_hash),
+                     _TRACE.pack(trace_id, data["sendTs"], data.get("publishTs", 0))]
+        else:
+            parts = [_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, msg_type, self.table_hash)]
+        if msg_type == MessageType.TRADE:
+            self._encode_trade_body(data, parts)
+            return b"".join(parts)
+        if msg_type not in (MessageType.SNAPSHOT, MessageType.DELTA):
+            raise ValueError(f"Unsupported message type {msg_type}.")
+        stock_id = data["stockId"]
+        stock_idx = self._table().get(stock_id, _UNKNOWN_STOCK)
+        trades = data.get("trades", [])
+        if msg_type == MessageType.SNAPSHOT:
+            parts.append(_SNAPSHOT.pack(to_epoch_ns(data["snapshot_time"]), stock_idx, len(trades), data.get("seq", 0),
+                                        data.get("epoch", 0)))
+        else:
+            parts.append(_DELTA.pack(stock_idx, len(trades), data["seq"], data.get("epoch", 0)))
+        if stock_idx == _UNKNOWN_STOCK:
+            parts.append(self._pack_str(stock_id))
+        for trade in trades:
+            self._encode_trade_body(trade, parts)
+        return b"".join(parts)
+
+    def _unpack_header(self, payload) -> tuple[int, int]:
+        """
+        :return: The message type and the offset of the message body (past the trace block, if any).
+        """
+        magic, version, msg_type, table_hash = _HEADER.unpack_from(payload, 0)
+        if magic != WIRE_MAGIC:
+            raise ValueError("Not a binary wire frame.")
+        if version != WIRE_VERSION:
+            raise ValueError(f"Unsupported wire version {version}, expected {WIRE_VERSION}.")
+        if table_hash != self.table_hash:
+            raise ValueError(f"Stock table mismatch: the frame was encoded with table {table_hash:08x}, this end has "
+                             f"{self.table_hash:08x}. Both ends must load the same stock universe, in the same order.")
+        if msg_type & _TRACED:
+            return msg_type & ~_TRACED, _HEADER.size + _TRACE.size
+        return msg_type, _HEADER.size
+
+    @staticmethod
+    def _add_trace(payload, message: dict) -> dict:
+        trace_id, send_ts, publish_ts = _TRACE.unpack_from(payload, _HEADER.size)
+        message["traceId"] = trace_id
+        message["sendTs"] = send_ts
+        if publish_ts:
+            message["publishTs"] = publish_ts
+        return message
+
+    def stock_id(self, payload) -> str:
+        """
+        Read only the stock of a message, without decoding its trades.
+        """
+        msg_type, offset = self._unpack_header(payload)
+        if msg_type == MessageType.TRADE:
+            stock_idx = _TRADE.unpack_from(payload, offset)[1]
+            if stock_idx == _UNKNOWN_STOCK:
+                _, offset = self._unpack_trade_id(payload, offset + _TRADE.size)  # skip the trade id
+        elif msg_type == MessageType.SNAPSHOT:
+            stock_idx = _SNAPSHOT.unpack_from(payload, offset)[1]
+            offset += _SNAPSHOT.size
+        elif msg_type == MessageType.DELTA:
+            stock_idx = _DELTA.unpack_from(payload, offset)[0]
+            offset += _DELTA.size
+        else:
+            raise ValueError(f"Unsupported message type {msg_type}.")
+        return self._stock_id(stock_idx, payload, offset)[0]
+
+    def decode(self, payload) -> tuple[MessageType, dict]:
+        msg_type, offset = self._unpack_header(payload)
+        if msg_type == MessageType.TRADE:
+            message, _ = self._decode_trade_body(payload, offset)
+        elif msg_type == MessageType.SNAPSHOT:
+            snapshot_time, stock_idx, count, seq, epoch = _SNAPSHOT.unpack_from(payload, offset)
+            stock_id, offset = self._stock_id(stock_idx, payload, offset + _SNAPSHOT.size)
+            message = {
+                "stockId": stock_id,
+                "snapshot_time": from_epoch_ns(snapshot_time),
+                "seq": seq,
+                "epoch": epoch,
+                "trades": self._decode_trades(payload, offset, count),
+            }
+        elif msg_type == MessageType.DELTA:
+            stock_idx, count, seq, epoch = _DELTA.unpack_from(payload, offset)
+            stock_id, offset = self._stock_id(stock_idx, payload, offset + _DELTA.size)
+            message = {
+                "stockId": stock_id,
+                "seq": seq,
+                "epoch": epoch,
+                "trades": self._decode_trades(payload, offset, count),
+            }
+        else:
+            raise ValueError(f"Unsupported message type {msg_type}.")
+        if payload[2] & _TRACED:
+            self._add_trace(payload, message)
+        return MessageType(msg_type), message
+
+
+CODECS = {
+    TextCodec.NAME: TextCodec,
+    BinaryCodec.NAME: BinaryCodec,
+}
+
+_instances: dict[str, BaseCodec] = {}
+
+
+def get_codec(name: str = None) -> BaseCodec:
+    """
+    Return the (shared) codec registered under ``name``, defaulting to ``WIRE_CODEC``.
+    """
+    name = name or WIRE_CODEC
+    if name not in CODECS:
+        raise ValueError(f"Unknown wire codec '{name}'. Available: {', '.join(CODECS)}.")
+    if name not in _instances:
+        _instances[name] = CODECS[name]()
+    return _instances[name]
+
+
+def topic(stock_id: str) -> bytes:
+    """
+    First frame of every published trade and snapshot message: the stock id, ended by TOPIC_END.
+    Subscribers filter on it inside zmq, before anything is decoded.
+    """
+    return stock_id.encode("utf-8") + TOPIC_END
+
+
+def topic_stock_id(frame: bytes) -> str:
+    """
+    The stock id carried by a topic frame.
+    """
+    return frame.rstrip(TOPIC_END).decode("utf-8")
+
+
+def subscriptions(symbols=None, prefixes=None) -> list[bytes]:
+    """
+    zmq SUBSCRIBE filters for a list of exact symbols and/or symbol prefixes.
+    A symbol filter includes TOPIC_END, so "STK1" does not also match "STK10".
+    With neither, subscribe to everything.
+    """
+    filters = [topic(symbol) for symbol in symbols or ()]
+    filters += [prefix.encode("utf-8") for prefix in prefixes or ()]
+    return filters or [b""]
+
+
+def recv_payload(socket, flags: int = 0) -> bytes:
+    """
+    Receive one message and return its payload, the last frame (after the topic frame, if any).
+    Cheaper than recv_multipart: it checks for more frames on the frame instead of the socket.
+    """
+    frame = socket.recv(flags, copy=False)
+    while frame.more:
+        frame = socket.recv(copy=False)
+    return frame.bytes
+
+
+def codec_for(payload) -> BaseCodec:
+    """
+    The codec a message was encoded with, told apart by the header magic.
+    """
+    if payload[:1] == bytes([WIRE_MAGIC]):
+        return get_codec(BinaryCodec.NAME)
+    return get_codec(TextCodec.NAME)
+
+
+def decode_any(payload) -> tuple[MessageType, dict]:
+    """
+    Decode a message in whichever format it was sent, using the header magic to tell them apart.
+    """
+    return codec_for(payload).decode(payload)
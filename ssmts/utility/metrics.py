@@ -0,0 +1,307 @@
+"""
+Low overhead latency histograms and counters, rendered as text for a /metrics endpoint.
+
+Latencies are recorded in nanoseconds into log buckets: four buckets per power of two, in 176
+integers per histogram (up to ~4.9 hours). A bucket spans at most a factor of 1.25, and a
+percentile is read as the geometric midpoint of its bucket, so it is within 12% (sqrt(1.25) - 1)
+of the true value. Recording is a few integer operations and no lock: the increments rely on the
+GIL, so two threads recording into the same bucket at the same instant may, rarely, lose a count.
+
+Stages are timed with a stopwatch, one lap per stage::
+
+    watch = metrics.stopwatch()
+    payload = receive()
+    watch.lap(RECEIVE)          # RECEIVE = metrics.histogram("trade_sub.receive")
+    trade = decode(payload)
+    watch.lap(DECODE)
+
+With metrics disabled (SSMTS_METRICS=0, or disable() at runtime), stopwatch() hands out a shared
+no-op stopwatch and observe()/incr() return at once.
+
+Text format (Prometheus style)::
+
+    ssmts_latency_seconds{name="trade_sub.decode",quantile="0.99"} 4.1e-06
+    ssmts_latency_seconds_count{name="trade_sub.decode"} 1200
+    ssmts_latency_seconds_sum{name="trade_sub.decode"} 0.0031
+    ssmts_events_total{name="trade_sub.accepted"} 1200
+    ssmts_gauge{name="trade_store.bytes"} 542400
+"""
+
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter_ns
+
+from ssmts.config.constants import METRICS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKETS = 4  # buckets per power of two
+BUCKETS = 176  # up to 2^44 ns; longer latencies go to the last bucket
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """
+    [lower, upper) nanoseconds of a bucket.
+    """
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift, mantissa = divmod(index, SUB_BUCKETS)
+    return (mantissa + SUB_BUCKETS) << (shift - 1), (mantissa + SUB_BUCKETS + 1) << (shift - 1)
+
+
+class LatencyHistogram:
+    """
+    Log bucketed histogram of latencies in nanoseconds.
+    """
+    __slots__ = ('name', 'counts', 'total', 'max')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.total = 0
+        self.max = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def record(self, ns: int) -> None:
+        if ns >= SUB_BUCKETS:
+            shift = ns.bit_length() - 3
+            index = (shift << 2) + (ns >> shift)  # shift * SUB_BUCKETS + the top three bits
+            if index >= BUCKETS:
+                index = BUCKETS - 1
+        else:
+            index = ns if ns > 0 else 0
+        self.counts[index] += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, quantile: float) -> int:
+        """
+        Geometric midpoint of the bucket holding the quantile (capped at the largest value recorded), in ns.
+        """
+        count = self.count
+        if not count:
+            return 0
+        rank = quantile * count
+        if rank >= count:
+            return self.max
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                lower, upper = bucket_bounds(index)
+                return min(math.isqrt(lower * upper), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        count, sum_ns, max_ns and p50/p90/p99/p999 in ns.
+        """
+        summary = {"count": self.count, "sum_ns": self.total, "max_ns": self.max}
+        for key, quantile in QUANTILES.items():
+            summary[key] = self.percentile(quantile)
+        return summary
+
+
+class Stopwatch:
+    """
+    Times consecutive stages: each lap() records the time since the previous one (or since start).
+    """
+    __slots__ = ('last',)
+
+    def __init__(self):
+        self.last = perf_counter_ns()
+
+    def lap(self, histogram: LatencyHistogram) -> None:
+        now = perf_counter_ns()
+        ns = now - self.last
+        self.last = now
+        # LatencyHistogram.record, inlined: a lap is on the hot path of every trade
+        if ns >= SUB_BUCKETS:
+            shift = ns.bit_length() - 3
+            index = (shift << 2) + (ns >> shift)
+            if index >= BUCKETS:
+                index = BUCKETS - 1
+        else:
+            index = ns if ns > 0 else 0
+        histogram.counts[index] += 1
+        histogram.total += ns
+        if ns > histogram.max:
+            histogram.max = ns
+
+    def restart(self) -> None:
+        self.last = perf_counter_ns()
+
+
+class _NoStopwatch:
+    __slots__ = ()
+
+    def lap(self, histogram) -> None:
+        pass
+
+    def restart(self) -> None:
+        pass
+
+
+_NO_STOPWATCH = _NoStopwatch()
+
+
+def _escape(name: str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class Metrics:
+    """
+    The histograms, counters and gauges of one process.
+    """
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()  # guards creating metrics, not recording them
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}  # prefix -> callable returning {name: number}
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """
+        The histogram of that name, created on first use. Hot paths should look it up once and keep it.
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram(name))
+        return histogram
+
+    def stopwatch(self):
+        return Stopwatch() if self.enabled else _NO_STOPWATCH
+
+    def observe(self, name: str, ns: int) -> None:
+        if self.enabled:
+            self.histogram(name).record(ns)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            counters = self._counters
+            counters[name] = counters.get(name, 0) + value
+
+    def gauges(self, prefix: str, read) -> None:
+        """
+        Report the numbers returned by ``read()`` (a dict) as gauges named prefix.key, read when rendering.
+        """
+        with self._lock:
+            self._gauges[prefix] = read
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Zero every histogram and counter; histograms held by callers stay valid.
+        """
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.reset()
+            self._counters = {}
+
+    def snapshot(self) -> dict:
+        """
+        {"histograms": {name: summary}, "counters": {name: value}, "gauges": {name: value}}
+        """
+        with self._lock:
+            histograms = list(self._histograms.values())
+            gauges = list(self._gauges.items())
+        values = {}
+        for prefix, read in gauges:
+            try:
+                values.update((f"{prefix}.{key}", value) for key, value in read().items()
+                              if isinstance(value, (int, float)))
+            except Exception as e:
+                logger.warning(f"Could not read the {prefix} gauges: {e}")
+        return {"histograms": {histogram.name: histogram.summary() for histogram in histograms if histogram.count},
+                "counters": dict(self._counters), "gauges": values}
+
+    def render(self) -> str:
+        """
+        Everything in the text format of the module docstring.
+        """
+        snapshot = self.snapshot()
+        lines = [f"# metrics {'enabled' if self.enabled else 'disabled'}",
+                 "# TYPE ssmts_latency_seconds summary"]
+        for name, summary in sorted(snapshot["histograms"].items()):
+            label = f'name="{_escape(name)}"'
+            for key, quantile in QUANTILES.items():
+                lines.append(f'ssmts_latency_seconds{{{label},quantile="{quantile}"}} {summary[key] / 1e9:.9g}')
+            lines.append(f"ssmts_latency_seconds_count{{{label}}} {summary['count']}")
+            lines.append(f"ssmts_latency_seconds_sum{{{label}}} {summary['sum_ns'] / 1e9:.9g}")
+            lines.append(f"ssmts_latency_seconds_max{{{label}}} {summary['max_ns'] / 1e9:.9g}")
+        lines.append("# TYPE ssmts_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'ssmts_events_total{{name="{_escape(name)}"}} {value}')
+        lines.append("# TYPE ssmts_gauge gauge")
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines.append(f'ssmts_gauge{{name="{_escape(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def control(self, action: str) -> bool:
+        """
+        Apply a /metrics/<action> request: "reset", "enable" or "disable".
+
+        :return: False for an unknown action.
+        """
+        handlers = {"reset": self.reset, "enable": self.enable, "disable": self.disable}
+        if action not in handlers:
+            return False
+        handlers[action]()
+        return True
+
+
+metrics = Metrics()  # the metrics of this process
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            return self._reply(404, "Not found\n")
+        self._reply(200, metrics.render())
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if not path.startswith("/metrics/") or not metrics.control(path[len("/metrics/"):]):
+            return self._reply(404, "Not found\n")
+        self._reply(200, "OK\n")
+
+    def _reply(self, status: int, text: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics, POST /metrics/reset, /metrics/enable and /metrics/disable from a daemon
+    thread, for processes without a web server of their own (the trade consumer).
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
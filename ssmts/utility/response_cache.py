@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from ssmts.config.constants import RESPONSE_CACHE_SIZE
+
+
+class CachedResponse(NamedTuple):
+    version: int  # DataVersion the body was built at
+    body: bytes
+    etag: str  # content hash, so an unchanged body keeps its ETag across versions
+
+
+class ResponseCache:
+    """
+    Serialized responses of the read endpoints, keyed by request path and valid for one data version.
+
+    An entry built at an older version is a miss and is replaced when the response is rebuilt.
+    The cache holds at most ``max_entries`` responses (one per stock for /stock/<id>), evicting the
+    least recently used one.
+    """
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+    def get(self, key: str, version: int):
+        """
+        The cached response for ``key`` if it was built at ``version``, else None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, version: int, body: bytes) -> CachedResponse:
+        """
+        Cache a response body built at ``version``.
+
+        :return: The cached entry (returned uncached if the cache is disabled).
+        """
+        previous = self._entries.get(key)
+        # same body as before: keep the ETag without hashing again
+        etag = previous.etag if previous is not None and previous.body == body else self.etag(body)
+        entry = CachedResponse(version, body, etag)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.version > version:
+                return entry  # a newer response was cached meanwhile, keep it
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,100 @@
+import threading
+
+
+class _Guard:
+    """
+    Reusable context manager around an acquire/release pair, e.g. ``with lock.read:``.
+    """
+    __slots__ = ('_acquire', '_release')
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release()
+        return False
+
+
+class ReadWriteLock:
+    """
+    Writer preferring reader/writer lock.
+
+    Any number of threads may hold the read side at once; the write side is exclusive. Waiting
+    writers block new readers so updates are not starved by a steady stream of reads.
+    Both sides are reentrant for the owning thread, and a thread holding the write side may also
+    take the read side. Upgrading a held read lock to a write lock is not supported.
+
+    Usage:
+        with lock.read:
+            ...
+        with lock.write:
+            ...
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0  # threads holding the read side
+        self._writer = None  # ident of the thread holding the write side
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+        self.read = _Guard(self.acquire_read, self.release_read)
+        self.write = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        local = self._local
+        if self._writer == threading.get_ident():
+            local.nested_in_write = getattr(local, 'nested_in_write', 0) + 1
+            return
+        depth = getattr(local, 'read_depth', 0)
+        if depth:
+            local.read_depth = depth + 1
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        local.read_depth = 1
+
+    def release_read(self):
+        local = self._local
+        if getattr(local, 'nested_in_write', 0):
+            local.nested_in_write -= 1
+            return
+        local.read_depth -= 1
+        if local.read_depth == 0:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, 'read_depth', 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        if self._writer != threading.get_ident():
+            raise RuntimeError("Cannot release a write lock held by another thread.")
+        self._write_depth -= 1
+        if self._write_depth == 0:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
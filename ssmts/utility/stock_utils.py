@@ -111,34 +111,163 @@ class StockUtils:
     @staticmethod
     def calculate_all_share_index() -> float:
         """
-        Calculate the All Share Index (ASI) based on a list of stock prices.
+        Calculate the All Share Index (ASI), the geometric mean of the prices of all stocks.
+        StockRegistry maintains the sum of the log prices as prices change, so this is O(1).
 
-        :param prices: A list of stock prices.
         :return: The All Share Index.
         """
-        prices = list(map(lambda stock_id: StockRegistry.get(stock_id).currentPrice, StockRegistry.get_all()))
-        return StockUtils._geometric_mean(prices)
+        return StockRegistry.all_share_index()
     
     @staticmethod
     def calculate_vwsp(stock_id: str) -> float:
         """
-        Calculate the Volume Weighted Stock Price (VWSP) for a given stock ID based on the last 15 trades.
-        this should be updated in real-time based on the incoming trades and snapshot.
+        Calculate the Volume Weighted Stock Price (VWSP) for a given stock ID based on the trades
+        in the past 15 minutes (see VWSP_WINDOW_SECONDS).
+        The running sums are maintained by TradeSnapShotRegistry as trades arrive, so this is O(1).
 
         :param stock_id: The ID of the stock.
         :return: The VWSP.
         """
-        snapShot = TradeSnapShotRegistry.get(stock_id) ### Get the snapshot of the stock (having latest 15 trades)
-        trades = snapShot.trades if snapShot else []
-        
-        if not trades:
-            raise ValueError(f"No trades found for stock ID {stock_id}.")
+        return TradeSnapShotRegistry.get_vwsp(stock_id)
 
-        total_price = sum(trade.price * trade.quantity for trade in trades)
-        total_quantity = sum(trade.quantity for trade in trades)
-        
-        if total_quantity == 0:
-            raise ValueError("Total quantity cannot be zero.")
-        
-        return total_price / total_quantity
+    @staticmethod
+    def calculate_vwap_horizons(stock_ids: list = None) -> dict:
+        """
+        Calculate the volume weighted price of many stocks over every horizon of VWAP_HORIZONS
+        (1m, 5m, 15m and 1h by default). The per bucket sums are maintained by TradeSnapShotRegistry
+        as trades arrive, so this is O(1) per stock and horizon.
+
+        :param stock_ids: The stocks to include, defaults to all registered stocks.
+        :return: Stock ID -> horizon label -> VWAP (None for horizons without trades), or None for
+            stocks without trades.
+        """
+        stock_ids = list(StockRegistry.get_all()) if stock_ids is None else list(stock_ids)
+        return dict(zip(stock_ids, TradeSnapShotRegistry.get_vwap_horizons_many(stock_ids)))
+
+    @staticmethod
+    def _yield_dividend_error(stock_id: str, dividend: float):
+        if math.isnan(dividend):
+            return f"Dividend for stock ID {stock_id} not found."
+        if dividend < 0:
+            return "Dividend cannot be negative."
+        return None
+
+    @staticmethod
+    def _pe_dividend_error(stock_id: str, dividend: float):
+        if math.isnan(dividend):
+            return f"Dividend for stock ID {stock_id} not found."
+        if dividend < 0:
+            return "Dividend cannot be negative."
+        if dividend == 0:
+            return "Dividend cannot be zero."
+        return None
+
+    @staticmethod
+    def _yield_price_error(price: float):
+        if price < 0:
+            return "Stock price cannot be negative."
+        if price == 0:
+            return "Stock price cannot be zero."
+        return None
+
+    @staticmethod
+    def _pe_price_error(price: float):
+        return "Stock price cannot be negative." if price < 0 else None
+
+    @staticmethod
+    def calculate_metrics_bulk(pairs: list) -> list[dict]:
+        """
+        Calculate the dividend yield, P/E ratio and VWSP for many (stock ID, price) pairs in one pass
+        over the array backed reference data (see StockRegistry.reference_data).
+
+        :param pairs: A list of (stock_id, price) pairs.
+        :return: One result per pair, in order: stockId, price, dividend_yield, pe_ratio, vwsp and an
+            errors dict (metric -> reason) for the metrics that could not be calculated, which are None.
+            Pairs whose stock does not exist (or is not a string), or whose price is not a number,
+            only carry an error.
+        """
+        stock_ids = [stock_id if isinstance(stock_id, str) else None for stock_id, _ in pairs]
+        reference = StockRegistry.reference_data(stock_ids)
+        index, yield_dividends, pe_dividends = reference.index, reference.yield_dividends, reference.pe_dividends
+        vwsps = TradeSnapShotRegistry.get_vwsp_many(stock_ids)
+        results = []
+        for (stock_id, price), lookup_id, vwsp in zip(pairs, stock_ids, vwsps):
+            row = index.get(lookup_id)
+            if row is None:
+                results.append({"stockId": stock_id, "price": price,
+                                "error": f"Entity ID {stock_id} does not exist in {StockRegistry.STORE_NAME}."})
+                continue
+            if isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price):
+                results.append({"stockId": stock_id, "price": price, "error": "Stock price must be a number."})
+                continue
+            errors = {}
+            dividend_yield = pe_ratio = None
+            error = StockUtils._yield_dividend_error(stock_id, yield_dividends[row]) or StockUtils._yield_price_error(price)
+            if error:
+                errors["dividend_yield"] = error
+            else:
+                dividend_yield = yield_dividends[row] / price
+            error = StockUtils._pe_dividend_error(stock_id, pe_dividends[row]) or StockUtils._pe_price_error(price)
+            if error:
+                errors["pe_ratio"] = error
+            else:
+                pe_ratio = price / pe_dividends[row]
+            if vwsp is None:
+                errors["vwsp"] = f"No trades found for stock ID {stock_id}."
+            results.append({"stockId": stock_id, "price": price, "dividend_yield": dividend_yield,
+                            "pe_ratio": pe_ratio, "vwsp": vwsp, "errors": errors})
+        return results
 
+    @staticmethod
+    def calculate_metrics_grid(prices: list, stock_ids: list = None) -> dict:
+        """
+        Calculate the dividend yield and P/E ratio of every stock at every price of a price grid,
+        along with each stock's VWSP. Price checks are done once per price and dividend checks once
+        per stock, the cells are plain array arithmetic.
+
+        :param prices: The price grid, applied to every stock.
+        :param stock_ids: The stocks to include, defaults to all registered stocks.
+        :return: The prices, and per stock: stockId, vwsp, one dividend_yield and pe_ratio per price
+            (None where it can not be calculated) and an errors dict (metric -> reason).
+        """
+        if any(isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price) for price in prices):
+            raise ValueError("Prices must be numbers.")
+        reference = StockRegistry.reference_data(stock_ids)
+        stock_ids = reference.stock_ids if stock_ids is None else list(stock_ids)
+        vwsps = TradeSnapShotRegistry.get_vwsp_many(stock_ids)
+        yield_price_errors = [StockUtils._yield_price_error(price) for price in prices]
+        pe_price_errors = [StockUtils._pe_price_error(price) for price in prices]
+        first_yield_price_error = next((error for error in yield_price_errors if error), None)
+        first_pe_price_error = next((error for error in pe_price_errors if error), None)
+        stocks = []
+        for stock_id, vwsp in zip(stock_ids, vwsps):
+            row = reference.index.get(stock_id)
+            if row is None:
+                stocks.append({"stockId": stock_id, "error": f"Entity ID {stock_id} does not exist in {StockRegistry.STORE_NAME}."})
+                continue
+            errors = {}
+            dividend = reference.yield_dividends[row]
+            error = StockUtils._yield_dividend_error(stock_id, dividend)
+            if error:
+                errors["dividend_yield"] = error
+                dividend_yield = [None] * len(prices)
+            else:
+                dividend_yield = [None if price_error else dividend / price
+                                  for price, price_error in zip(prices, yield_price_errors)]
+                if first_yield_price_error:
+                    errors["dividend_yield"] = first_yield_price_error
+            dividend = reference.pe_dividends[row]
+            error = StockUtils._pe_dividend_error(stock_id, dividend)
+            if error:
+                errors["pe_ratio"] = error
+                pe_ratio = [None] * len(prices)
+            else:
+                pe_ratio = [None if price_error else price / dividend
+                            for price, price_error in zip(prices, pe_price_errors)]
+                if first_pe_price_error:
+                    errors["pe_ratio"] = first_pe_price_error
+            if vwsp is None:
+                errors["vwsp"] = f"No trades found for stock ID {stock_id}."
+            stocks.append({"stockId": stock_id, "vwsp": vwsp, "dividend_yield": dividend_yield,
+                           "pe_ratio": pe_ratio, "errors": errors})
+        return {"prices": list(prices), "stocks": stocks}
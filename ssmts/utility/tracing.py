@@ -0,0 +1,228 @@
+"""
+End-to-end latency tracing of sampled trades, from the producer to the query serving a price
+that includes them.
+
+A producer stamps one trade in TRACE_SAMPLE with a trace id and its send time on the monotonic
+clock (``traceId``, ``sendTs``). The trace travels in the trade message, then in the snapshot
+update that carries the trade (which adds its publish time, ``publishTs``), then with the
+StockRegistry price update. Every hop records the time since the previous one in a
+``trace.<hop>`` histogram of ssmts.utility.metrics, in the process where the hop ends:
+
+    trade_wire      producer send -> trade consumer decoded the trade (zmq queues, shard routing)
+    trade_consumer  decoded -> snapshot update published (store, journal, conflation wait)
+    snapshot_wire   published -> snapshot consumer decoded the update
+    price_update    decoded -> StockRegistry price updated from the new VWSP
+    query           price updated -> first response serving that price
+    end_to_end      producer send -> first response serving that price
+
+A conflated update carries the trace of its oldest traced trade, so later hops see fewer traces
+than earlier ones. Send and publish times are compared across processes, which the monotonic
+clock allows on one host only.
+
+Report, under load::
+
+    python -m ssmts.utility.tracing --reset --wait 30 http://localhost:5000/metrics http://localhost:9100/metrics
+"""
+
+import argparse
+import logging
+import re
+import time
+import urllib.error
+import urllib.request
+from time import monotonic_ns
+
+from ssmts.config.constants import METRICS_PORT, TRACE_SAMPLE
+from ssmts.utility.metrics import metrics
+from ssmts.utility.trade_utils import next_trade_id
+
+logger = logging.getLogger(__name__)
+
+HOPS = (
+    ("trade_wire", "producer -> trade consumer"),
+    ("trade_consumer", "trade consumer -> snapshot published"),
+    ("snapshot_wire", "snapshot published -> snapshot consumer"),
+    ("price_update", "snapshot consumer -> price updated"),
+    ("query", "price updated -> served"),
+)
+END_TO_END = "end_to_end"
+
+TRADE_WIRE = metrics.histogram("trace.trade_wire")
+TRADE_CONSUMER = metrics.histogram("trace.trade_consumer")
+SNAPSHOT_WIRE = metrics.histogram("trace.snapshot_wire")
+PRICE_UPDATE = metrics.histogram("trace.price_update")
+QUERY = metrics.histogram("trace.query")
+TOTAL = metrics.histogram(f"trace.{END_TO_END}")
+
+
+class TraceSampler:
+    """
+    Producer side: stamps one trade in ``sample`` with a trace.
+    """
+    __slots__ = ('sample', 'countdown')
+
+    def __init__(self, sample: int = TRACE_SAMPLE):
+        """
+        :param sample: Trace one trade in this many; 1 traces every trade, 0 none.
+        """
+        self.sample = sample
+        self.countdown = sample
+
+    def stamp(self, trade: dict) -> None:
+        """
+        Call right before the trade is encoded and sent.
+        """
+        if not self.sample:
+            return
+        self.countdown -= 1
+        if self.countdown:
+            return
+        self.countdown = self.sample
+        trade["traceId"] = next_trade_id()
+        trade["sendTs"] = monotonic_ns()
+
+
+def received(message: dict):
+    """
+    Trade consumer: the trace of a trade message just decoded, as (trace id, send ns, received ns),
+    or None if the trade is not traced.
+    """
+    trace_id = message.get("traceId")
+    if not trace_id:
+        return None
+    now = monotonic_ns()
+    if metrics.enabled:
+        TRADE_WIRE.record(now - message["sendTs"])
+    return trace_id, message["sendTs"], now
+
+
+def published(trades) -> dict:
+    """
+    Trade consumer: the trace fields of a snapshot update about to be published, taken from its
+    oldest traced trade, or an empty dict.
+    """
+    for trade in trades:
+        trace = getattr(trade, "trace", None)
+        if trace is not None:
+            now = monotonic_ns()
+            if metrics.enabled:
+                TRADE_CONSUMER.record(now - trace[2])
+            return {"traceId": trace[0], "sendTs": trace[1], "publishTs": now}
+    return {}
+
+
+def snapshot_received(message: dict):
+    """
+    Snapshot consumer: the trace of a snapshot update just decoded, as (trace id, send ns,
+    received ns), or None.
+    """
+    trace_id = message.get("traceId")
+    if not trace_id:
+        return None
+    now = monotonic_ns()
+    if metrics.enabled and "publishTs" in message:
+        SNAPSHOT_WIRE.record(now - message["publishTs"])
+    return trace_id, message["sendTs"], now
+
+
+def price_updated(trace) -> None:
+    """
+    Snapshot consumer: the price including the trace was stored in the StockRegistry.
+    """
+    if metrics.enabled:
+        PRICE_UPDATE.record(monotonic_ns() - trace[2])
+
+
+def served(traces) -> None:
+    """
+    Market metrics: a response served the prices of these traces, as (trace id, send ns, price
+    updated ns), from StockRegistry.take_traces.
+    """
+    if not traces or not metrics.enabled:
+        return
+    now = monotonic_ns()
+    for _, send_ts, updated_ts in traces:
+        QUERY.record(now - updated_ts)
+        TOTAL.record(now - send_ts)
+
+
+_LINE = re.compile(r'^ssmts_latency_seconds(_count|_sum)?\{name="trace\.([^"]+)"(?:,quantile="([^"]+)")?\} (\S+)$')
+
+
+def parse_traces(text: str) -> dict:
+    """
+    The trace histograms of a /metrics page: {hop: {"count": .., "sum": .., quantile: seconds}}.
+    """
+    hops = {}
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        suffix, hop, quantile, value = match.groups()
+        key = quantile if quantile is not None else suffix.lstrip("_")
+        hops.setdefault(hop, {})[key] = float(value)
+    return hops
+
+
+def collect(urls) -> dict:
+    """
+    Merge the trace histograms of several /metrics pages; each hop is measured by one process.
+    Unreachable pages are skipped with a warning.
+    """
+    hops = {}
+    for url in urls:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                text = response.read().decode("utf-8")
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"Could not read {url}: {e}")
+            continue
+        for hop, values in parse_traces(text).items():
+            if values.get("count", 0) > hops.get(hop, {}).get("count", -1):
+                hops[hop] = values
+    return hops
+
+
+def reset(urls) -> None:
+    for url in urls:
+        try:
+            urllib.request.urlopen(urllib.request.Request(url.rstrip("/") + "/reset", method="POST"), timeout=5).close()
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"Could not reset {url}: {e}")
+
+
+def format_budget(hops: dict) -> str:
+    """
+    One line per hop: traces, p50/p90/p99 and mean in ms, and the share of the mean end-to-end
+    latency the hop's mean takes.
+    """
+    total = hops.get(END_TO_END, {})
+    total_mean = total["sum"] / total["count"] if total.get("count") else 0.0
+    lines = [f"{'hop':<42}{'traces':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'share':>8}"]
+    for hop, label in HOPS + ((END_TO_END, "producer -> served (end to end)"),):
+        values = hops.get(hop, {})
+        count = int(values.get("count", 0))
+        if not count:
+            lines.append(f"{label:<42}{0:>9}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{'-':>8}")
+            continue
+        mean = values["sum"] / count
+        share = f"{mean / total_mean:.0%}" if total_mean else "-"
+        lines.append(f"{label:<42}{count:>9}{values.get('0.5', 0) * 1e3:>10.3f}{values.get('0.9', 0) * 1e3:>10.3f}"
+                     f"{values.get('0.99', 0) * 1e3:>10.3f}{mean * 1e3:>10.3f}{share:>8}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    defaults = ["http://localhost:5000/metrics"] + ([f"http://localhost:{METRICS_PORT}/metrics"] if METRICS_PORT else [])
+    parser = argparse.ArgumentParser(description="Where the producer to query latency goes, per hop.")
+    parser.add_argument("urls", nargs="*", default=defaults,
+                        help="/metrics of the market metrics server and of the trade consumer (SSMTS_METRICS_PORT)")
+    parser.add_argument("--reset", action="store_true", help="reset the metrics first, to report on a fresh window")
+    parser.add_argument("--wait", type=float, default=0, help="seconds to let traces accumulate before reporting")
+    args = parser.parse_args()
+    if args.reset:
+        reset(args.urls)
+    if args.wait:
+        time.sleep(args.wait)
+    print(format_budget(collect(args.urls)))
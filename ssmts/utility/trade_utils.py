@@ -1,8 +1,183 @@
-import time
-import uuid
+"""
+Trade ids.
 
+Ids are snowflake style 63 bit integers, sortable by creation time::
 
-def generate_unique_id():
-    timestamp = str(int(time.time()))
-    unique_id = timestamp + '-' + str(uuid.uuid4())
-    return unique_id
\ No newline at end of file
+    | 41 bits: milliseconds since ID_EPOCH_MS | 10 bits: node id | 12 bits: sequence |
+
+The sequence counts the ids of one millisecond (4096 per node); when it runs out, or the clock
+steps back, the generator carries on from its last millisecond + 1 instead of waiting, so ids stay
+unique and increasing. The node id keeps processes apart: set SSMTS_TRADE_ID_NODE to a different
+value per process. Without it the node id is derived from the pid (and derived again in a forked
+child), with a warning on the first id: pids that are equal modulo 1024 share a node id. A fixed
+node id belongs to the process that set it, so a forked child refuses to generate ids until it is
+given its own (set_node_id). Processes publishing trades must have a node id set explicitly
+(require_node_id): two producers on one host could otherwise share one.
+
+Inside the system trade ids stay integers: the registries, the wire and the journal key and store
+them as such. The string form, the id in decimal zero padded to 19 digits (sorting like the ids),
+is for text edges such as JSON, where integers beyond 2**53 lose precision; trade_id_key turns it
+back into the integer.
+"""
+
+import logging
+import os
+import threading
+from time import time_ns
+
+from ssmts.config.constants import TRADE_ID_NODE
+
+ID_EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_DIGITS = 19
+MAX_ID = (1 << 63) - 1
+_TIMESTAMP_SHIFT = NODE_BITS + SEQUENCE_BITS
+
+logger = logging.getLogger(__name__)
+
+
+class SnowflakeIdGenerator:
+    """
+    Thread safe generator of increasing 64 bit trade ids.
+    """
+    def __init__(self, node_id: int = None, epoch_ms: int = ID_EPOCH_MS):
+        """
+        :param node_id: 0 to MAX_NODE, unique among the processes generating ids; defaults to
+            SSMTS_TRADE_ID_NODE, else to the pid (modulo MAX_NODE + 1).
+        """
+        node_id = int(TRADE_ID_NODE) if node_id is None and TRADE_ID_NODE is not None else node_id
+        self.epoch_ms = epoch_ms
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        if node_id is None:
+            self.fixed_node = False
+            self.node_id = os.getpid() & MAX_NODE
+            self.next_id = self._warn_pid_node  # until the first id; instance attribute, so no cost after it
+        else:
+            self.set_node(node_id)
+
+    def set_node(self, node_id: int) -> None:
+        """
+        Generate ids with this node id from now on, e.g. in a forked child.
+        """
+        if not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"Node id must be between 0 and {MAX_NODE}.")
+        self.fixed_node = True
+        self.node_id = node_id
+        self.__dict__.pop("next_id", None)
+
+    @property
+    def node_id(self) -> int:
+        return self._node_bits >> SEQUENCE_BITS
+
+    @node_id.setter
+    def node_id(self, node_id: int) -> None:
+        self._node_bits = node_id << SEQUENCE_BITS  # node id already in place, OR-ed into every id
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        if self.fixed_node:
+            self.next_id = self._refuse_parent_node  # the parent goes on generating ids with it
+        else:
+            self.node_id = os.getpid() & MAX_NODE
+
+    def _warn_pid_node(self) -> int:
+        del self.next_id
+        logger.warning(f"SSMTS_TRADE_ID_NODE is not set: trade ids use node id {self.node_id}, derived from pid "
+                       f"{os.getpid()}. Processes whose pids are equal modulo {MAX_NODE + 1} generate the same ids; "
+                       f"give every process that generates ids its own node id.")
+        return self.next_id()
+
+    def _refuse_parent_node(self) -> int:
+        raise RuntimeError(f"Trade id node {self.node_id} belongs to the parent process; this forked child would "
+                           f"generate the same ids. Give it its own node id with set_node_id().")
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = time_ns() // 1_000_000 - self.epoch_ms
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                sequence = self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                sequence = self._sequence = self._sequence + 1
+            else:  # sequence exhausted (or the clock stepped back): borrow the next millisecond
+                self._last_ms += 1
+                sequence = self._sequence = 0
+            return (self._last_ms << _TIMESTAMP_SHIFT) | self._node_bits | sequence
+
+
+def format_id(trade_id: int) -> str:
+    """
+    The string form of an id, sorting like the ids themselves.
+    """
+    return f"{trade_id:0{ID_DIGITS}d}"
+
+
+def parse_id(trade_id) -> dict:
+    """
+    Split an id (int or string form) into its creation time (epoch ms), node id and sequence.
+    """
+    trade_id = int(trade_id)
+    return {
+        "timestamp_ms": (trade_id >> _TIMESTAMP_SHIFT) + ID_EPOCH_MS,
+        "node_id": (trade_id >> SEQUENCE_BITS) & MAX_NODE,
+        "sequence": trade_id & MAX_SEQUENCE,
+    }
+
+
+_generator = SnowflakeIdGenerator()
+os.register_at_fork(after_in_child=_generator._after_fork)
+
+
+def require_node_id(node_id: int = None) -> int:
+    """
+    Make sure this process generates ids with a node id of its own, for the processes publishing
+    trades: ``node_id`` when given, else the one from SSMTS_TRADE_ID_NODE.
+
+    :return: The node id.
+    :raises ValueError: When neither is set: a node id derived from the pid may collide with the
+        one of another producer on the host.
+    """
+    if node_id is not None:
+        _generator.set_node(node_id)
+    elif not _generator.fixed_node:
+        raise ValueError(f"Trade producers need a node id (0-{MAX_NODE}) of their own: set SSMTS_TRADE_ID_NODE, "
+                         f"or pass one, to a different value for every producer.")
+    return _generator.node_id
+
+
+def set_node_id(node_id: int) -> None:
+    """
+    Set the node id of this process's trade ids, e.g. in a forked child (see SnowflakeIdGenerator.set_node).
+    """
+    _generator.set_node(node_id)
+
+
+def next_trade_id() -> int:
+    """
+    A new trade id, as an integer.
+    """
+    return _generator.next_id()
+
+
+def generate_unique_id() -> str:
+    """
+    A new trade id in its string form (19 digits, e.g. "0019237484539215872"), for text edges.
+    """
+    return format_id(_generator.next_id())
+
+
+def trade_id_key(trade_id):
+    """
+    The internal form of a trade id read from a text edge (JSON, CSV): integers, and strings of at
+    most 19 decimal digits (their string form), up to MAX_ID are integers; any other id is a string.
+    """
+    if isinstance(trade_id, str) and trade_id.isdecimal() and len(trade_id) <= ID_DIGITS:
+        trade_id = int(trade_id)
+    if isinstance(trade_id, int) and 0 <= trade_id <= MAX_ID:
+        return trade_id
+    return str(trade_id)